@@ -5,15 +5,30 @@ Augment 檔案理解增強器
 """
 
 import os
+import sys
 import json
-import ast
 import re
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 from pathlib import Path
-import hashlib
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 from datetime import datetime
 
+from augment_file_digest import FileDigestCache, content_digest
+from augment_python_ast import analyze_python_source
+from augment_tree_walker import walk_files, walk_order_key
+from augment_patterns import PATTERNS
+
+# 預編譯正則 (登記在共用正則表，統計每個模式的耗時和命中)
+IMPORT_PATTERN = PATTERNS.register('file.import', r'import\s+.*?\s+from\s+[\'"]([^\'"]+)[\'"]')
+EXPORT_PATTERN = PATTERNS.register('file.export', r'export\s+(?:default\s+)?(?:class|function|const|let|var)\s+(\w+)')
+FUNCTION_PATTERN = PATTERNS.register('file.function', r'(?:function\s+(\w+)|const\s+(\w+)\s*=\s*(?:async\s+)?\()')
+CLASS_PATTERN = PATTERNS.register('file.class', r'class\s+(\w+)')
+API_CALL_PATTERN = PATTERNS.register('file.api_call', r'(?:fetch|axios|api)\s*\(\s*[\'"]([^\'"]+)[\'"]')
+COMPONENT_PATTERN = PATTERNS.register('file.component', r'(?:export\s+default\s+)?(?:function|const)\s+(\w+)')
+TEST_ID_PATTERN = PATTERNS.register('file.test_id', r'data-testid=[\'"]([^\'"]+)[\'"]')
+TEST_CASE_PATTERN = PATTERNS.register('file.test_case', r'(?:test|it)\s*\(\s*[\'"]([^\'"]+)[\'"]')
+MARKDOWN_TITLE_PATTERN = PATTERNS.register('file.markdown_title', r'^#+\s+(.+)$', re.MULTILINE)
+
 @dataclass
 class FileAnalysis:
     """檔案分析結果"""
@@ -36,6 +51,121 @@ class FileAnalysis:
     security_notes: List[str]
     accessibility_notes: List[str]
     memory_science_notes: List[str]
+    content_hash: str = ""  # 分析時的內容摘要，重用結果前與當前摘要比對
+
+# 流式模式下總結中每個列表保留的樣本數 (計數仍然完整)
+SUMMARY_SAMPLE_LIMIT = 200
+
+class ProjectSummaryAggregator:
+    """在線匯總檔案分析結果，逐個 add 後由 summary() 生成項目總結
+
+    sample_limit 為 None 時保留所有列表項 (與一次性匯總相同)；
+    否則每個列表只保留前 sample_limit 項，完整數量記錄在 summary["counts"]。
+    """
+    
+    # 總結欄位 -> FileAnalysis 欄位
+    LIST_FIELDS = {
+        "key_components": "components",
+        "api_endpoints": "apis",
+        "test_coverage": "tests",
+        "memory_science_features": "memory_science_notes",
+        "accessibility_features": "accessibility_notes"
+    }
+    
+    def __init__(self, sample_limit: Optional[int] = None):
+        self.sample_limit = sample_limit
+        self.total_files = 0
+        self.file_types: Dict[str, int] = {}
+        self.complexity_distribution: Dict[int, int] = {}
+        self.samples: Dict[str, List[str]] = {key: [] for key in self.LIST_FIELDS}
+        self.counts: Dict[str, int] = {key: 0 for key in self.LIST_FIELDS}
+        self.dependencies = set()
+    
+    def add(self, analysis: FileAnalysis):
+        self.total_files += 1
+        
+        # 檔案類型和複雜度分布
+        self.file_types[analysis.type] = self.file_types.get(analysis.type, 0) + 1
+        complexity = analysis.complexity_score
+        self.complexity_distribution[complexity] = self.complexity_distribution.get(complexity, 0) + 1
+        
+        # 收集關鍵信息
+        for key, attribute in self.LIST_FIELDS.items():
+            values = getattr(analysis, attribute)
+            self.counts[key] += len(values)
+            sample = self.samples[key]
+            if self.sample_limit is None:
+                sample.extend(values)
+            elif len(sample) < self.sample_limit:
+                sample.extend(values[:self.sample_limit - len(sample)])
+        
+        if self.sample_limit is None:
+            self.dependencies.update(analysis.dependencies)
+        else:
+            for dependency in analysis.dependencies:
+                if len(self.dependencies) >= self.sample_limit:
+                    break
+                self.dependencies.add(dependency)
+    
+    def summary(self) -> Dict[str, Any]:
+        summary = {
+            "total_files": self.total_files,
+            "file_types": dict(self.file_types),
+            "complexity_distribution": dict(self.complexity_distribution),
+            **{key: list(sample) for key, sample in self.samples.items()},
+            "dependencies": list(self.dependencies),
+            "recommendations": []
+        }
+        if self.sample_limit is not None:
+            summary["counts"] = dict(self.counts)
+            summary["sample_limit"] = self.sample_limit
+        return summary
+
+def summary_count(summary: Dict[str, Any], key: str) -> int:
+    """列表欄位的完整數量 (流式總結中列表只是樣本)"""
+    return summary.get("counts", {}).get(key, len(summary[key]))
+
+class PreviousStreamReader:
+    """按遍歷順序讀取上次流式輸出的結果和檔案清單 (兩者逐行對應)，只持有當前一行
+    
+    本次遍歷與上次的輸出順序相同 (walk_order_key)，查找時只需向前推進，不需要索引。
+    """
+    
+    def __init__(self, results_path: Path, manifest_path: Path, root: str):
+        self.root = root
+        self.results = open(results_path, 'rb') if results_path.exists() else None
+        self.manifest = open(manifest_path, 'rb') if manifest_path.exists() else None
+        # (排序鍵, 路徑, (size, mtime_ns, digest), 結果行)
+        self.current: Optional[Tuple[Tuple, str, Tuple[int, int, str], bytes]] = None
+        self.advance()
+    
+    def advance(self):
+        self.current = None
+        if self.results is None or self.manifest is None:
+            return
+        for result_line, manifest_line in zip(self.results, self.manifest):
+            try:
+                file_path, size, mtime_ns, digest = json.loads(manifest_line)
+            except (ValueError, TypeError):
+                continue  # 中斷時寫了一半的行
+            key = walk_order_key(os.path.relpath(file_path, self.root))
+            self.current = (key, file_path, (size, mtime_ns, digest), result_line)
+            return
+    
+    def lookup(self, file_path: str) -> Optional[Tuple[Tuple[int, int, str], bytes]]:
+        """返回該路徑上次的 ((size, mtime_ns, digest), 結果行)；上次沒有時返回 None"""
+        
+        key = walk_order_key(os.path.relpath(file_path, self.root))
+        while self.current is not None and self.current[0] < key:
+            self.advance()
+        if self.current is not None and self.current[1] == file_path:
+            return self.current[2], self.current[3]
+        return None
+    
+    def close(self):
+        for stream in (self.results, self.manifest):
+            if stream is not None:
+                stream.close()
 
 class AugmentFileUnderstandingEnhancer:
     """Augment 檔案理解增強器"""
@@ -43,8 +173,18 @@ class AugmentFileUnderstandingEnhancer:
     def __init__(self, project_root: str):
         self.project_root = Path(project_root)
         self.analysis_cache = {}
+        self.file_digests = FileDigestCache()
         self.project_knowledge = {}
         self.load_project_knowledge()
+        
+        # 上次分析的檔案清單 (stat 未變的檔案不重新讀取內容) 和結果
+        self.manifest_file = self.project_root / "augment-file-manifest.json"
+        self.results_file = self.project_root / "augment-file-analysis-results.json"
+        
+        # 流式輸出: 每行一個檔案分析 (NDJSON)，檔案清單逐行寫入旁邊的 NDJSON，總結單獨保存
+        self.stream_file = self.project_root / "augment-file-analysis-results.ndjson"
+        self.stream_manifest_file = self.project_root / "augment-file-manifest.ndjson"
+        self.summary_file = self.project_root / "augment-file-analysis-summary.json"
     
     def load_project_knowledge(self):
         """載入項目知識庫"""
@@ -73,27 +213,88 @@ class AugmentFileUnderstandingEnhancer:
                 ]
             }
     
-    def analyze_file(self, file_path: str) -> FileAnalysis:
-        """深度分析單個檔案"""
-        path = Path(file_path)
+    def load_file_digests(self):
+        """載入檔案清單 (stat -> 內容摘要)，只用於跳過未變檔案的內容讀取"""
         
-        if not path.exists():
-            raise FileNotFoundError(f"檔案不存在: {file_path}")
+        if not self.manifest_file.exists():
+            return
+        
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
         
-        # 檢查緩存
-        file_hash = self.get_file_hash(path)
-        if file_hash in self.analysis_cache:
-            return self.analysis_cache[file_hash]
+        self.file_digests = FileDigestCache(
+            (file_path, size, mtime_ns, digest) for file_path, (size, mtime_ns, digest) in manifest.items()
+        )
+    
+    def load_previous_results(self):
+        """用上次一次性輸出的分析結果預熱緩存 (流式模式按需從 NDJSON 讀取，不調用)
+        
+        緩存以每條結果自帶的 content_hash 為鍵，
+        清單和結果由不同的運行寫入時也不會把舊結果配到新內容上。
+        """
+        
+        if not self.results_file.exists():
+            return
+        try:
+            with open(self.results_file, 'r', encoding='utf-8') as f:
+                previous_analyses = json.load(f).get("file_analyses", [])
+        except (OSError, ValueError):
+            return
+        
+        for data in previous_analyses:
+            try:
+                analysis = FileAnalysis(**data)
+            except TypeError:
+                continue
+            # 舊版結果沒有摘要，無法驗證，重新分析
+            if analysis.content_hash:
+                self.analysis_cache[f"{analysis.type}:{analysis.content_hash}"] = analysis
+    
+    def save_manifest(self, paths: Iterable[str]):
+        """保存本次分析的檔案清單 (已刪除的檔案自然不再出現)"""
+        
+        manifest = {}
+        for file_path in paths:
+            entry = self.file_digests.entries.get(file_path)
+            if entry is not None:
+                manifest[file_path] = list(entry)
+        
+        with open(self.manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+    
+    def analyze_file(self, file_path: str, stat: Optional[os.stat_result] = None,
+                     cache: bool = True, content_hash: Optional[str] = None) -> FileAnalysis:
+        """深度分析單個檔案
+        
+        stat / content_hash 由調用方提供時不再重複計算；cache=False 時結果不進緩存。
+        """
+        path = Path(file_path)
+        
+        if stat is None:
+            if not path.exists():
+                raise FileNotFoundError(f"檔案不存在: {file_path}")
+            stat = path.stat()
         
         # 基本檔案信息
-        stat = path.stat()
         file_type = self.determine_file_type(path)
+        last_modified = datetime.fromtimestamp(stat.st_mtime).isoformat()
+        
+        # 檢查緩存 (按類型 + 內容摘要，內容相同的檔案跨路徑、跨檢出共用分析結果)
+        if content_hash is None:
+            content_hash = self.get_file_hash(path, stat)
+        cache_key = f"{file_type}:{content_hash}"
+        cached_analysis = self.analysis_cache.get(cache_key)
+        if cached_analysis is not None:
+            return replace(cached_analysis, path=str(path), size=stat.st_size, last_modified=last_modified)
         
         analysis = FileAnalysis(
             path=str(path),
             type=file_type,
             size=stat.st_size,
-            last_modified=datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            last_modified=last_modified,
             complexity_score=0,
             dependencies=[],
             exports=[],
@@ -108,7 +309,8 @@ class AugmentFileUnderstandingEnhancer:
             performance_notes=[],
             security_notes=[],
             accessibility_notes=[],
-            memory_science_notes=[]
+            memory_science_notes=[],
+            content_hash=content_hash
         )
         
         # 讀取檔案內容
@@ -133,6 +335,8 @@ class AugmentFileUnderstandingEnhancer:
             self.analyze_markdown(content, analysis)
         elif file_type == "json":
             self.analyze_json_config(content, analysis)
+        elif file_type == "python":
+            self.analyze_python(content, analysis)
         
         # EduCreate 專用分析
         self.analyze_educreat_specific(content, analysis)
@@ -141,7 +345,8 @@ class AugmentFileUnderstandingEnhancer:
         analysis.complexity_score = self.calculate_complexity_score(analysis)
         
         # 緩存結果
-        self.analysis_cache[file_hash] = analysis
+        if cache:
+            self.analysis_cache[cache_key] = analysis
         
         return analysis
     
@@ -165,6 +370,8 @@ class AugmentFileUnderstandingEnhancer:
             return "markdown"
         elif suffix == '.json':
             return "json"
+        elif suffix == '.py':
+            return "python"
         elif suffix in ['.css', '.scss']:
             return "stylesheet"
         else:
@@ -174,41 +381,53 @@ class AugmentFileUnderstandingEnhancer:
         """分析 TypeScript/JavaScript 檔案"""
         
         # 提取 imports
-        import_pattern = r'import\s+.*?\s+from\s+[\'"]([^\'"]+)[\'"]'
-        analysis.imports = re.findall(import_pattern, content)
+        analysis.imports = IMPORT_PATTERN.findall(content)
         
         # 提取 exports
-        export_pattern = r'export\s+(?:default\s+)?(?:class|function|const|let|var)\s+(\w+)'
-        analysis.exports = re.findall(export_pattern, content)
+        analysis.exports = EXPORT_PATTERN.findall(content)
         
         # 提取函數
-        function_pattern = r'(?:function\s+(\w+)|const\s+(\w+)\s*=\s*(?:async\s+)?\()'
-        matches = re.findall(function_pattern, content)
+        matches = FUNCTION_PATTERN.findall(content)
         analysis.functions = [match[0] or match[1] for match in matches if match[0] or match[1]]
         
         # 提取類別
-        class_pattern = r'class\s+(\w+)'
-        analysis.classes = re.findall(class_pattern, content)
+        analysis.classes = CLASS_PATTERN.findall(content)
         
         # 提取 API 調用
-        api_pattern = r'(?:fetch|axios|api)\s*\(\s*[\'"]([^\'"]+)[\'"]'
-        analysis.apis = re.findall(api_pattern, content)
+        analysis.apis = API_CALL_PATTERN.findall(content)
+    
+    def analyze_python(self, content: str, analysis: FileAnalysis):
+        """分析 Python 檔案 (AST 一次遍歷)"""
+        
+        try:
+            info = analyze_python_source(content, analysis.path)
+        except (SyntaxError, ValueError, RecursionError):
+            analysis.documentation = "Python 語法錯誤或嵌套過深，無法解析結構"
+            return
+        
+        analysis.imports = info.imports
+        analysis.functions = [function['name'] for function in info.functions]
+        analysis.classes = [class_info['name'] for class_info in info.classes]
+        analysis.tests = [name for name in analysis.functions if name.startswith('test')]
+        
+        # 頂層公開名稱視為導出
+        top_level = [function['name'] for function in info.functions if function['top_level']]
+        top_level.extend(class_info['name'] for class_info in info.classes if class_info['top_level'])
+        analysis.exports = [name for name in top_level if not name.startswith('_')]
     
     def analyze_react_component(self, content: str, analysis: FileAnalysis):
         """分析 React 組件"""
         self.analyze_typescript_javascript(content, analysis)
         
         # 提取組件名稱
-        component_pattern = r'(?:export\s+default\s+)?(?:function|const)\s+(\w+)'
-        analysis.components = re.findall(component_pattern, content)
+        analysis.components = COMPONENT_PATTERN.findall(content)
         
         # 檢查無障礙設計
         if 'aria-' in content or 'role=' in content or 'data-testid' in content:
             analysis.accessibility_notes.append("包含無障礙設計屬性")
         
         # 檢查測試 ID
-        testid_pattern = r'data-testid=[\'"]([^\'"]+)[\'"]'
-        test_ids = re.findall(testid_pattern, content)
+        test_ids = TEST_ID_PATTERN.findall(content)
         if test_ids:
             analysis.tests.extend(test_ids)
     
@@ -234,8 +453,7 @@ class AugmentFileUnderstandingEnhancer:
         """分析測試檔案"""
         
         # 提取測試描述
-        test_pattern = r'(?:test|it)\s*\(\s*[\'"]([^\'"]+)[\'"]'
-        analysis.tests = re.findall(test_pattern, content)
+        analysis.tests = TEST_CASE_PATTERN.findall(content)
         
         # 檢查測試類型
         if 'playwright' in content.lower():
@@ -251,8 +469,7 @@ class AugmentFileUnderstandingEnhancer:
         """分析 Markdown 文檔"""
         
         # 提取標題
-        title_pattern = r'^#+\s+(.+)$'
-        titles = re.findall(title_pattern, content, re.MULTILINE)
+        titles = MARKDOWN_TITLE_PATTERN.findall(content)
         analysis.documentation = f"包含 {len(titles)} 個標題: {', '.join(titles[:5])}"
         
         # 檢查是否為架構文檔
@@ -321,45 +538,52 @@ class AugmentFileUnderstandingEnhancer:
         
         return min(score, 10)
     
-    def get_file_hash(self, path: Path) -> str:
-        """獲取檔案哈希值用於緩存"""
-        stat = path.stat()
-        content = f"{path}:{stat.st_size}:{stat.st_mtime}"
-        return hashlib.md5(content.encode()).hexdigest()
+    def get_file_hash(self, path: Path, stat: Optional[os.stat_result] = None) -> str:
+        """獲取檔案內容摘要用於緩存 (stat 未變時不重新讀取內容)"""
+        return self.file_digests.digest(path, stat)
     
-    def analyze_project(self) -> Dict[str, Any]:
-        """分析整個項目"""
+    def analyze_project(self, stream: bool = False) -> Dict[str, Any]:
+        """分析整個項目 (stream=True 時逐行寫出 NDJSON，內存不隨項目大小增長)"""
         
         print("🔍 開始分析 EduCreate 項目...")
         
-        # 要分析的檔案模式
-        patterns = [
-            "**/*.ts", "**/*.tsx", "**/*.js", "**/*.jsx",
-            "**/*.md", "**/*.json"
-        ]
-        
-        all_files = []
-        for pattern in patterns:
-            all_files.extend(self.project_root.glob(pattern))
+        # 要分析的檔案類型
+        extensions = [".ts", ".tsx", ".js", ".jsx", ".md", ".json", ".py"]
         
-        # 過濾掉不需要的檔案
-        exclude_patterns = [
+        # 不進入的目錄
+        exclude_dirs = [
             "node_modules", ".next", "dist", "build", 
             ".git", "coverage", "test-results"
         ]
         
-        filtered_files = []
-        for file_path in all_files:
-            if not any(exclude in str(file_path) for exclude in exclude_patterns):
-                filtered_files.append(file_path)
+        # 本工具自己的輸出檔案不參與分析
+        output_files = {str(self.results_file), str(self.manifest_file), str(self.summary_file),
+                        str(self.stream_file), str(self.stream_manifest_file)}
+        
+        # 一次遍歷，排除目錄和 .gitignore 忽略的目錄在下降前剪掉
+        # (流式模式按名稱排序遍歷並逐個消費，不把檔案列表放進內存)
+        files = (
+            (path, entry)
+            for path, entry in walk_files(str(self.project_root), extensions, exclude_dirs, sort_entries=stream)
+            if path not in output_files
+        )
+        
+        if stream:
+            project_summary = self.analyze_files_streaming(files)
+            print("✅ 項目分析完成！")
+            return project_summary
         
+        filtered_files = list(files)
         print(f"📁 找到 {len(filtered_files)} 個檔案需要分析")
         
+        self.load_file_digests()
+        self.load_previous_results()
+        
         # 分析每個檔案
         analyses = []
-        for i, file_path in enumerate(filtered_files):
+        for i, (file_path, entry) in enumerate(filtered_files):
             try:
-                analysis = self.analyze_file(str(file_path))
+                analysis = self.analyze_file(file_path, entry.stat())
                 analyses.append(analysis)
                 
                 if (i + 1) % 50 == 0:
@@ -371,47 +595,105 @@ class AugmentFileUnderstandingEnhancer:
         # 生成項目總結
         project_summary = self.generate_project_summary(analyses)
         
-        # 保存分析結果
+        # 保存分析結果和檔案清單
         self.save_analysis_results(analyses, project_summary)
+        self.save_manifest(analysis.path for analysis in analyses)
         
         print("✅ 項目分析完成！")
         return project_summary
     
+    def analyze_files_streaming(self, files: Iterable[Tuple[str, os.DirEntry]]) -> Dict[str, Any]:
+        """逐個分析並立即寫出一行 NDJSON，總結由在線匯總器生成
+        
+        每行寫完即刷新，下游工具可以 tail 部分結果。檔案清單 (路徑、stat、內容摘要) 同步逐行寫出。
+        上次的結果和清單與本次遍歷順序相同，合併讀取：stat 未變的檔案不讀內容，
+        內容摘要與上次記錄相同的檔案直接重用上次的結果行。內存中只保留匯總器。
+        """
+        
+        # 上次的輸出先移開，本次直接寫到正式路徑
+        previous_results = self.stream_file.with_name(self.stream_file.name + ".prev")
+        previous_manifest = self.stream_manifest_file.with_name(self.stream_manifest_file.name + ".prev")
+        for current_file, previous_file in ((self.stream_file, previous_results),
+                                            (self.stream_manifest_file, previous_manifest)):
+            if current_file.exists():
+                os.replace(current_file, previous_file)
+        
+        previous = PreviousStreamReader(previous_results, previous_manifest, os.path.normpath(str(self.project_root)))
+        aggregator = ProjectSummaryAggregator(sample_limit=SUMMARY_SAMPLE_LIMIT)
+        total = 0
+        reused = 0
+        
+        try:
+            with open(self.stream_file, 'w', encoding='utf-8', buffering=1) as output, \
+                 open(self.stream_manifest_file, 'w', encoding='utf-8', buffering=1) as manifest:
+                for file_path, entry in files:
+                    try:
+                        stat = entry.stat()
+                        previous_entry = previous.lookup(file_path)
+                        
+                        # stat 未變時沿用上次的內容摘要
+                        if previous_entry is not None and previous_entry[0][:2] == (stat.st_size, stat.st_mtime_ns):
+                            digest = previous_entry[0][2]
+                        else:
+                            digest = content_digest(file_path)
+                        
+                        analysis = None
+                        if previous_entry is not None:
+                            analysis = self.reuse_streamed_analysis(previous_entry[1], file_path, digest, stat)
+                        if analysis is not None:
+                            reused += 1
+                        else:
+                            analysis = self.analyze_file(file_path, stat, cache=False, content_hash=digest)
+                        
+                        # 先寫結果再寫清單，中斷時清單不會多出沒有結果的行
+                        output.write(json.dumps(asdict(analysis), ensure_ascii=False) + "\n")
+                        manifest.write(json.dumps([file_path, stat.st_size, stat.st_mtime_ns, digest],
+                                                  ensure_ascii=False) + "\n")
+                        aggregator.add(analysis)
+                        total += 1
+                        
+                        if total % 50 == 0:
+                            print(f"   已分析 {total} 個檔案")
+                            
+                    except Exception as e:
+                        print(f"   ⚠️ 分析檔案失敗 {file_path}: {e}")
+        finally:
+            previous.close()
+            for previous_file in (previous_results, previous_manifest):
+                if previous_file.exists():
+                    previous_file.unlink()
+        
+        summary = aggregator.summary()
+        summary["recommendations"] = self.generate_recommendations(summary)
+        
+        with open(self.summary_file, 'w', encoding='utf-8') as f:
+            json.dump({"timestamp": datetime.now().isoformat(), "project_summary": summary},
+                      f, indent=2, ensure_ascii=False)
+        
+        print(f"📊 分析結果已逐行寫入: {self.stream_file} ({total} 個檔案，重用 {reused} 個)")
+        print(f"📊 項目總結已保存到: {self.summary_file}")
+        return summary
+    
+    def reuse_streamed_analysis(self, line: bytes, file_path: str, digest: str,
+                                stat: os.stat_result) -> Optional[FileAnalysis]:
+        """解析上次的結果行；路徑或內容摘要與當前不同時返回 None"""
+        
+        try:
+            analysis = FileAnalysis(**json.loads(line))
+        except (ValueError, TypeError):
+            return None
+        if analysis.path != file_path or analysis.content_hash != digest:
+            return None
+        return replace(analysis, size=stat.st_size,
+                       last_modified=datetime.fromtimestamp(stat.st_mtime).isoformat())
+    
     def generate_project_summary(self, analyses: List[FileAnalysis]) -> Dict[str, Any]:
         """生成項目總結"""
         
-        summary = {
-            "total_files": len(analyses),
-            "file_types": {},
-            "complexity_distribution": {},
-            "key_components": [],
-            "api_endpoints": [],
-            "test_coverage": [],
-            "memory_science_features": [],
-            "accessibility_features": [],
-            "dependencies": set(),
-            "recommendations": []
-        }
-        
+        aggregator = ProjectSummaryAggregator()
         for analysis in analyses:
-            # 檔案類型統計
-            file_type = analysis.type
-            summary["file_types"][file_type] = summary["file_types"].get(file_type, 0) + 1
-            
-            # 複雜度分布
-            complexity = analysis.complexity_score
-            summary["complexity_distribution"][complexity] = summary["complexity_distribution"].get(complexity, 0) + 1
-            
-            # 收集關鍵信息
-            summary["key_components"].extend(analysis.components)
-            summary["api_endpoints"].extend(analysis.apis)
-            summary["test_coverage"].extend(analysis.tests)
-            summary["memory_science_features"].extend(analysis.memory_science_notes)
-            summary["accessibility_features"].extend(analysis.accessibility_notes)
-            summary["dependencies"].update(analysis.dependencies)
-        
-        # 轉換 set 為 list
-        summary["dependencies"] = list(summary["dependencies"])
+            aggregator.add(analysis)
+        summary = aggregator.summary()
         
         # 生成建議
         summary["recommendations"] = self.generate_recommendations(summary)
@@ -430,15 +712,15 @@ class AugmentFileUnderstandingEnhancer:
         # 測試覆蓋率建議
         test_files = summary["file_types"].get("test", 0)
         total_files = summary["total_files"]
-        if test_files / total_files < 0.3:
+        if total_files and test_files / total_files < 0.3:
             recommendations.append("測試覆蓋率偏低，建議增加更多測試")
         
         # 記憶科學功能建議
-        if len(summary["memory_science_features"]) < 10:
+        if summary_count(summary, "memory_science_features") < 10:
             recommendations.append("記憶科學功能實現較少，建議加強相關功能")
         
         # 無障礙設計建議
-        if len(summary["accessibility_features"]) < 5:
+        if summary_count(summary, "accessibility_features") < 5:
             recommendations.append("無障礙設計功能較少，建議加強 WCAG 合規性")
         
         return recommendations
@@ -453,7 +735,7 @@ class AugmentFileUnderstandingEnhancer:
             "file_analyses": [asdict(analysis) for analysis in analyses]
         }
         
-        output_file = self.project_root / "augment-file-analysis-results.json"
+        output_file = self.results_file
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(results, f, indent=2, ensure_ascii=False)
         
@@ -463,17 +745,20 @@ def main():
     """主函數"""
     project_root = "C:/Users/Administrator/Desktop/EduCreate"
     
+    # --stream: 逐行寫出 NDJSON，適合大型項目或需要邊分析邊讀取結果的場景
+    stream = "--stream" in sys.argv[1:]
+    
     enhancer = AugmentFileUnderstandingEnhancer(project_root)
-    summary = enhancer.analyze_project()
+    summary = enhancer.analyze_project(stream=stream)
     
     print("\n📊 項目分析總結:")
     print(f"   總檔案數: {summary['total_files']}")
     print(f"   檔案類型: {summary['file_types']}")
-    print(f"   關鍵組件: {len(summary['key_components'])} 個")
-    print(f"   API 端點: {len(summary['api_endpoints'])} 個")
-    print(f"   測試覆蓋: {len(summary['test_coverage'])} 個測試")
-    print(f"   記憶科學功能: {len(summary['memory_science_features'])} 個")
-    print(f"   無障礙功能: {len(summary['accessibility_features'])} 個")
+    print(f"   關鍵組件: {summary_count(summary, 'key_components')} 個")
+    print(f"   API 端點: {summary_count(summary, 'api_endpoints')} 個")
+    print(f"   測試覆蓋: {summary_count(summary, 'test_coverage')} 個測試")
+    print(f"   記憶科學功能: {summary_count(summary, 'memory_science_features')} 個")
+    print(f"   無障礙功能: {summary_count(summary, 'accessibility_features')} 個")
     
     if summary['recommendations']:
         print("\n💡 改進建議:")
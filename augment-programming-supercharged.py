@@ -5,25 +5,56 @@ Augment 編程能力超級增強器
 """
 
 import os
+import sys
 import json
-import ast
 import re
 import time
 import hashlib
 import sqlite3
+import bisect
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Any, Optional, Tuple, Iterator, Set
+from dataclasses import dataclass, asdict, field
 from datetime import datetime
 import concurrent.futures
 import threading
-from collections import defaultdict, deque
+import atexit
+from collections import defaultdict, deque, OrderedDict, Counter
 import logging
 
+from augment_file_digest import FileDigestCache
+from augment_python_ast import analyze_python_source
+from augment_index_watcher import watch_project
+from augment_tree_walker import walk_files
+from augment_patterns import PATTERNS
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
 # 設置日誌
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 項目分析時排除的目錄
+PROJECT_EXCLUDE_DIRS = {'node_modules', '.git', 'dist', 'build', '.next', 'coverage'}
+
+# 副檔名 -> 語言
+LANGUAGE_BY_EXTENSION = {
+    '.ts': 'typescript',
+    '.tsx': 'typescript',
+    '.js': 'javascript', 
+    '.jsx': 'javascript',
+    '.py': 'python',
+    '.html': 'html',
+    '.css': 'css',
+    '.scss': 'css',
+    '.json': 'json',
+    '.md': 'markdown'
+}
+
 @dataclass
 class CodeAnalysis:
     """代碼分析結果"""
@@ -44,21 +75,404 @@ class CodeAnalysis:
     security_notes: List[str]
     best_practices_score: int
 
+class SQLiteConnectionPool:
+    """SQLite 連接池 (每個線程一個持久連接，使用 WAL 日誌)"""
+    
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.connections: List[sqlite3.Connection] = []
+        self.lock = threading.Lock()
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """獲取當前線程的連接 (首次使用時創建)"""
+        conn = getattr(self.local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+    
+    def close_all(self):
+        """關閉所有線程的連接"""
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections.clear()
+        self.local = threading.local()
+
+@dataclass
+class SourceScan:
+    """單遍掃描產生的事件，供各分析器共用"""
+    imports: List[str] = field(default_factory=list)
+    exports: List[str] = field(default_factory=list)
+    functions: List[Dict[str, Any]] = field(default_factory=list)
+    classes: List[Dict[str, Any]] = field(default_factory=list)
+    tokens: Counter = field(default_factory=Counter)  # 關注的標記 -> 出現次數
+    flags: Set[str] = field(default_factory=set)      # 檢測到的結構 (嵌套循環、單例等)
+
+# 掃描用的預編譯正則，每個都以字面量開頭，讓 re 用快速前綴搜索定位候選位置
+# (實測 CPython re 對多分支交替正則逐字符嘗試，比多個字面量前綴正則慢約 5 倍)
+IMPORT_PATTERNS = (
+    PATTERNS.register('scan.import_from', r'import\s+.*?\s+from\s+[\'"]([^\'"]+)[\'"]'),
+    PATTERNS.register('scan.dynamic_import', r'import\s*\(\s*[\'"]([^\'"]+)[\'"]\s*\)'),
+    PATTERNS.register('scan.require', r'require\s*\(\s*[\'"]([^\'"]+)[\'"]\s*\)')
+)
+EXPORT_PATTERNS = (
+    PATTERNS.register('scan.export_declaration', r'export\s+(?:default\s+)?(?:class|function|const|let|var)\s+(\w+)'),
+    PATTERNS.register('scan.export_list', r'export\s*\{\s*([^}]+)\s*\}'),
+    PATTERNS.register('scan.module_exports', r'module\.exports\s*=\s*(\w+)')
+)
+FUNCTION_DECLARATION_PATTERN = PATTERNS.register('scan.function_declaration', r'function\s+(\w+)\s*\(([^)]*)\)\s*\{')
+CONST_ARROW_PATTERN = PATTERNS.register('scan.const_arrow', r'const\s+(\w+)\s*=\s*(async\s+)?\(([^)]*)\)\s*=>\s*\{')
+# 從冒號開始匹配，屬性名再向前取；原來以 (\w+) 開頭的寫法會在每個字符處回溯
+PROPERTY_ARROW_PATTERN = PATTERNS.register('scan.property_arrow', r':\s*(async\s+)?\(([^)]*)\)\s*=>\s*\{')
+PROPERTY_NAME_PATTERN = PATTERNS.register('scan.property_name', r'(\w+)\s*$')
+ASYNC_PREFIX_PATTERN = PATTERNS.register('scan.async_prefix', r'async\s+$')
+CLASS_DECLARATION_PATTERN = PATTERNS.register('scan.class_declaration', r'class\s+(\w+)(?:\s+extends\s+(\w+))?\s*\{')
+
+# 結構特徵: 標記名 -> 正則 (只需判斷是否出現)
+SCAN_FLAG_PATTERNS = {
+    'singleton': PATTERNS.register('flag.singleton', r'class\s+\w+\s*\{[^}]*static\s+instance'),
+    'factory': PATTERNS.register('flag.factory', r'function\s+create\w+|class\s+\w+Factory'),
+    'nested_loop': PATTERNS.register('flag.nested_loop', r'for\s*\([^)]*\)\s*\{[^}]*for\s*\('),
+    'map_filter': PATTERNS.register('flag.map_filter', r'\.map\([^)]*\)\.filter\([^)]*\)'),
+    'document_write': PATTERNS.register('flag.document_write', r'document\.write\s*\('),
+    'type_definitions': PATTERNS.register('flag.type_definitions', r'interface\s+\w+|type\s+\w+\s*='),
+    'generics': PATTERNS.register('flag.generics', r'<[A-Z]\w*>'),
+    'comment': PATTERNS.register('flag.comment', r'//.*|/\*.*\*/'),
+}
+
+# 分析器關注的字面量標記 (區分大小寫)
+SCAN_TOKENS = (
+    'useState', 'useEffect', 'useMemo', 'useCallback', 'createContext',
+    'addEventListener', 'on(', 'memo(', 'React.memo', 'lazy(', 'import(', 'debounce', 'throttle',
+    'innerHTML', 'dependencies', 'eval(', 'localStorage', 'JSON.parse',
+    'validate', 'sanitize', 'escape', 'any', 'class', 'extends Component',
+    '[]', '!', 'as '
+)
+
+# 不區分大小寫的標記，在小寫內容上檢查
+SCAN_LOWERCASE_TOKENS = ('react', 'jsx', 'input')
+
+def scan_source(content: str, structure: bool = True) -> SourceScan:
+    """掃描檔案內容一次，產生各分析器共用的 import/export/函數/類別/標記事件
+    
+    structure=False 時只收集標記和結構特徵 (非 JS/TS 檔案不需要提取函數和類別)。
+    """
+    
+    scan = SourceScan()
+    tokens = scan.tokens
+    
+    for token in SCAN_TOKENS:
+        if token in content:
+            tokens[token] = 1
+    tokens['querySelector'] = content.count('querySelector')
+    
+    lowered = content.lower()
+    for token in SCAN_LOWERCASE_TOKENS:
+        if token in lowered:
+            tokens[token] = 1
+    
+    for flag, pattern in SCAN_FLAG_PATTERNS.items():
+        if pattern.search(content):
+            scan.flags.add(flag)
+    
+    if not structure:
+        return scan
+    
+    for pattern in IMPORT_PATTERNS:
+        scan.imports.extend(pattern.findall(content))
+    
+    for pattern in EXPORT_PATTERNS:
+        scan.exports.extend(m for m in pattern.findall(content) if m)
+    
+    # 函數 (按出現位置排序，每個定義只記錄一次)
+    functions = []
+    for match in FUNCTION_DECLARATION_PATTERN.finditer(content):
+        start = match.start()
+        is_async = ASYNC_PREFIX_PATTERN.search(content, max(0, start - 16), start) is not None
+        functions.append({
+            'name': match.group(1), 'async': is_async, 'parameters': match.group(2),
+            'start': start, 'body_start': match.end() - 1
+        })
+    
+    for match in CONST_ARROW_PATTERN.finditer(content):
+        functions.append({
+            'name': match.group(1), 'async': bool(match.group(2)), 'parameters': match.group(3),
+            'start': match.start(), 'body_start': match.end() - 1
+        })
+    
+    for match in PROPERTY_ARROW_PATTERN.finditer(content):
+        name = PROPERTY_NAME_PATTERN.search(content, max(0, match.start() - 64), match.start())
+        if name:
+            functions.append({
+                'name': name.group(1), 'async': bool(match.group(1)), 'parameters': match.group(2),
+                'start': name.start(), 'body_start': match.end() - 1
+            })
+    
+    functions.sort(key=lambda function: function['start'])
+    scan.functions = functions
+    
+    for match in CLASS_DECLARATION_PATTERN.finditer(content):
+        scan.classes.append({
+            'name': match.group(1), 'extends': match.group(2),
+            'start': match.start(), 'body_start': match.end() - 1
+        })
+    
+    return scan
+
+# 花括號配對: 一次遍歷括號、字符串和註釋 (字符串/註釋內的括號不計)
+BRACE_TOKEN_PATTERN = PATTERNS.register(
+    'span.brace_token',
+    r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`|[{}]',
+    re.S
+)
+CONTROL_FLOW_PATTERN = PATTERNS.register('span.control_flow', r'\b(?:if|else|for|while|switch|case|catch)\b')
+METHOD_SIGNATURE_PATTERN = PATTERNS.register('span.method_signature', r'\([^)]*\)\s*\{')
+NON_METHOD_NAMES = {'if', 'for', 'while', 'switch', 'catch', 'function', 'return'}
+
+# Python 按縮進劃分代碼塊
+PYTHON_DEFINITION_PATTERN = PATTERNS.register('python.definition', r'^([ \t]*)(?:(async)[ \t]+)?(def|class)[ \t]+(\w+)', re.M)
+PYTHON_PARAMETERS_PATTERN = PATTERNS.register('python.parameters', r'\s*\(([^)]*)\)')
+PYTHON_LINE_PATTERN = PATTERNS.register('python.line', r'^([ \t]*)(\S)', re.M)
+PYTHON_TRIPLE_QUOTED_PATTERN = PATTERNS.register('python.triple_quoted', r'\'\'\'.*?\'\'\'|""".*?"""', re.S)
+PYTHON_CONTROL_FLOW_PATTERN = PATTERNS.register('python.control_flow', r'\b(?:if|elif|else|for|while|except|case)\b')
+PYTHON_IMPORT_PATTERNS = (
+    PATTERNS.register('python.import', r'import\s+(\w+)'),
+    PATTERNS.register('python.from_import', r'from\s+(\w+)\s+import'),
+    PATTERNS.register('python.import_as', r'import\s+(\w+)\s+as\s+\w+')
+)
+
+# Web 組件和 CSS
+WEB_COMPONENT_PATTERN = PATTERNS.register(
+    'web.component', r'(?:function|const)\s+(\w+)\s*(?:\([^)]*\))?\s*(?::\s*\w+)?\s*=>\s*\{'
+)
+CSS_SELECTOR_PATTERN = PATTERNS.register('css.selector', r'([.#]?[\w-]+)\s*\{')
+
+def match_braces(content: str) -> Dict[int, Tuple[int, int]]:
+    """配對所有花括號，返回 {開括號位置: (閉括號位置, 深度)}；未閉合的延伸到檔案末尾"""
+    
+    pairs = {}
+    stack = []
+    for match in BRACE_TOKEN_PATTERN.finditer(content):
+        token = match.group()
+        if token == '{':
+            stack.append(match.start())
+        elif token == '}' and stack:
+            open_pos = stack.pop()
+            pairs[open_pos] = (match.start(), len(stack))
+    
+    for depth, open_pos in enumerate(stack):
+        pairs[open_pos] = (len(content), depth)
+    
+    return pairs
+
+def count_positions(positions: List[int], start: int, end: int) -> int:
+    """統計有序位置列表中落在 [start, end) 的數量"""
+    return bisect.bisect_left(positions, end) - bisect.bisect_left(positions, start)
+
+def python_block_spans(content: str) -> List[Dict[str, Any]]:
+    """按縮進一次計算所有 def/class 塊的範圍
+    
+    返回按出現順序排列的塊: kind, name, async, parameters, start, end, parent (父塊索引或 None)。
+    三引號字符串內的行和多行簽名的續行不參與縮進判斷。
+    """
+    
+    definitions = {match.start(): match for match in PYTHON_DEFINITION_PATTERN.finditer(content)}
+    strings = [(match.start(), match.end()) for match in PYTHON_TRIPLE_QUOTED_PATTERN.finditer(content)]
+    
+    blocks: List[Dict[str, Any]] = []
+    stack: List[Tuple[int, int]] = []  # (縮進寬度, 塊索引)
+    string_index = 0
+    skip_until = 0
+    last_line_end = 0
+    
+    for line in PYTHON_LINE_PATTERN.finditer(content):
+        pos = line.start()
+        
+        # 跳過字符串內部和簽名續行
+        while string_index < len(strings) and strings[string_index][1] <= pos:
+            string_index += 1
+        if string_index < len(strings) and strings[string_index][0] < pos:
+            continue
+        if pos < skip_until or line.group(2) == '#':
+            continue
+        
+        indent = len(line.group(1).expandtabs())
+        while stack and indent <= stack[-1][0]:
+            blocks[stack.pop()[1]]['end'] = last_line_end
+        
+        definition = definitions.get(pos)
+        if definition is not None:
+            kind = definition.group(3)
+            parameters = None
+            header_end = definition.end()
+            if kind == 'def':
+                signature = PYTHON_PARAMETERS_PATTERN.match(content, definition.end())
+                if signature:
+                    parameters = signature.group(1)
+                    header_end = signature.end()
+            
+            blocks.append({
+                'kind': kind,
+                'name': definition.group(4),
+                'async': definition.group(2) is not None,
+                'parameters': parameters,
+                'start': pos,
+                'end': len(content),
+                'parent': stack[-1][1] if stack else None
+            })
+            stack.append((indent, len(blocks) - 1))
+            skip_until = header_end
+        
+        line_end = content.find('\n', pos)
+        last_line_end = len(content) if line_end == -1 else line_end
+    
+    while stack:
+        blocks[stack.pop()[1]]['end'] = len(content)
+    
+    return blocks
+
+class LRUCache:
+    """按字節計量的 LRU 緩存 (線程安全)，超出容量或系統記憶體緊張時淘汰最久未用的項目"""
+    
+    def __init__(self, max_bytes: int, memory_pressure_percent: float = 90.0,
+                 pressure_check_interval: int = 256):
+        self.max_bytes = max_bytes
+        self.memory_pressure_percent = memory_pressure_percent
+        self.pressure_check_interval = pressure_check_interval
+        self.entries: OrderedDict = OrderedDict()  # key -> (value, size)
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pressure_evictions = 0
+        self.puts_since_check = 0
+    
+    def get(self, key: Any) -> Any:
+        """命中時把項目移到最近使用端；未命中返回 None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: Any, value: Any, size: int):
+        """放入項目，size 為估算的字節數"""
+        if size > self.max_bytes:
+            return
+        
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self.entries[key] = (value, size)
+            self.current_bytes += size
+            
+            while self.current_bytes > self.max_bytes:
+                self.evict_oldest()
+            
+            self.puts_since_check += 1
+            if self.puts_since_check >= self.pressure_check_interval:
+                self.puts_since_check = 0
+                self.relieve_memory_pressure()
+    
+    def evict_oldest(self):
+        """淘汰最久未使用的項目 (調用方持有鎖)"""
+        _, (_, size) = self.entries.popitem(last=False)
+        self.current_bytes -= size
+        self.evictions += 1
+    
+    def relieve_memory_pressure(self):
+        """系統記憶體使用率過高時把緩存縮減到一半 (調用方持有鎖，需要 psutil)"""
+        if not PSUTIL_AVAILABLE or not self.entries:
+            return
+        if psutil.virtual_memory().percent < self.memory_pressure_percent:
+            return
+        
+        target = self.current_bytes // 2
+        while self.entries and self.current_bytes > target:
+            self.evict_oldest()
+            self.pressure_evictions += 1
+    
+    def pop(self, key: Any):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+    
+    def discard_where(self, predicate: Callable[[Any, Any], bool]) -> int:
+        """刪除 predicate(key, value) 為真的所有項目，返回刪除數量"""
+        with self.lock:
+            keys = [key for key, (value, _) in self.entries.items() if predicate(key, value)]
+            for key in keys:
+                self.current_bytes -= self.entries.pop(key)[1]
+            return len(keys)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __contains__(self, key: Any) -> bool:
+        return key in self.entries
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'pressure_evictions': self.pressure_evictions
+        }
+
 class SuperchargedAugmentAnalyzer:
     """超級增強的 Augment 分析器"""
     
-    def __init__(self, max_workers: int = 32, cache_size_gb: int = 16):
+    def __init__(self, max_workers: int = 32, cache_size_gb: int = 16, use_database: bool = True):
         self.max_workers = max_workers
         self.cache_size_bytes = cache_size_gb * 1024 * 1024 * 1024
         
-        # 初始化大容量緩存
-        self.analysis_cache = {}
-        self.pattern_cache = {}
+        # 初始化大容量緩存 (按字節計量的 LRU)
+        # 值為 (檔案路徑, 分析結果 JSON)，命中時解碼為新對象，調用方修改結果不會影響緩存
+        self.analysis_cache = LRUCache(int(self.cache_size_bytes * 0.8))
         self.dependency_graph = defaultdict(set)
-        self.code_metrics_cache = {}
         
-        # 初始化數據庫
-        self.init_analysis_database()
+        # 初始化數據庫 (工作進程只做純分析，不需要數據庫)
+        self.db_path = "augment_analysis.db"
+        self.db_pool = SQLiteConnectionPool(self.db_path)
+        
+        # 緩存寫入緩衝區，批量在一個交易中提交
+        self.pending_cache_writes: Dict[str, Tuple] = {}
+        self.cache_write_lock = threading.Lock()
+        self.cache_write_batch_size = 500
+        
+        # 檔案內容摘要 (stat 未變時不重新讀取內容)
+        self.file_digests = FileDigestCache()
+        
+        if use_database:
+            self.init_analysis_database()
+            self.load_file_digests()
+            atexit.register(self.flush_cache_writes)
+        
+        # 最近一次項目分析的統計
+        self.last_project_stats = {}
         
         # 載入編程模式和最佳實踐
         self.load_programming_patterns()
@@ -72,8 +486,7 @@ class SuperchargedAugmentAnalyzer:
     
     def init_analysis_database(self):
         """初始化分析數據庫"""
-        self.db_path = "augment_analysis.db"
-        conn = sqlite3.connect(self.db_path)
+        conn = self.db_pool.get_connection()
         cursor = conn.cursor()
         
         # 代碼分析表
@@ -128,6 +541,16 @@ class SuperchargedAugmentAnalyzer:
             )
         ''')
         
+        # 檔案內容摘要表 (stat 預檢用)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_digests (
+                file_path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            )
+        ''')
+        
         # 創建索引
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_path ON code_analysis(file_path)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_hash ON code_analysis(file_hash)')
@@ -135,10 +558,15 @@ class SuperchargedAugmentAnalyzer:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_patterns_file ON code_patterns(file_path)')
         
         conn.commit()
-        conn.close()
         
         logger.info("📊 分析數據庫初始化完成")
     
+    def load_file_digests(self):
+        """載入上次運行記住的檔案摘要"""
+        cursor = self.db_pool.get_connection().cursor()
+        cursor.execute('SELECT file_path, size, mtime_ns, content_hash FROM file_digests')
+        self.file_digests = FileDigestCache(cursor.fetchall())
+    
     def load_programming_patterns(self):
         """載入編程模式和最佳實踐"""
         
@@ -237,12 +665,22 @@ class SuperchargedAugmentAnalyzer:
         if cached_analysis:
             return cached_analysis
         
+        analysis = self.analyze_file_uncached(path)
+        
+        # 緩存結果
+        self.cache_analysis(analysis, file_hash)
+        
+        return analysis
+    
+    def analyze_file_uncached(self, path: Path) -> CodeAnalysis:
+        """讀取並分析檔案 (不經過緩存，可在工作進程中執行)"""
+        
         # 讀取檔案內容
         try:
             with open(path, 'r', encoding='utf-8') as f:
                 content = f.read()
         except UnicodeDecodeError:
-            return self.create_binary_file_analysis(file_path)
+            return self.create_binary_file_analysis(str(path))
         
         # 確定語言
         language = self.detect_language(path)
@@ -267,9 +705,12 @@ class SuperchargedAugmentAnalyzer:
             best_practices_score=0
         )
         
+        # 只掃描一次，所有分析器共用同一份事件
+        scan = scan_source(content, structure=language in ['typescript', 'javascript'])
+        
         # 根據語言進行專門分析
         if language in ['typescript', 'javascript']:
-            self.analyze_typescript_javascript_deep(content, analysis)
+            self.analyze_typescript_javascript_deep(content, analysis, scan)
         elif language == 'python':
             self.analyze_python_deep(content, analysis)
         elif language in ['html', 'jsx', 'tsx']:
@@ -280,197 +721,333 @@ class SuperchargedAugmentAnalyzer:
             self.analyze_json_config_deep(content, analysis)
         
         # 通用分析
-        self.analyze_patterns(content, analysis)
-        self.analyze_performance(content, analysis)
-        self.analyze_security(content, analysis)
-        self.analyze_best_practices(content, analysis)
+        self.analyze_patterns(content, analysis, scan)
+        self.analyze_performance(content, analysis, scan)
+        self.analyze_security(content, analysis, scan)
+        self.analyze_best_practices(content, analysis, scan)
         self.calculate_scores(analysis)
         
-        # 緩存結果
-        self.cache_analysis(analysis, file_hash)
-        
         return analysis
     
-    def analyze_typescript_javascript_deep(self, content: str, analysis: CodeAnalysis):
+    def collect_project_files(self, root: str) -> List[Tuple[str, os.stat_result]]:
+        """收集項目中可分析的檔案和 stat (在下降前排除目錄和 .gitignore 忽略的目錄)"""
+        
+        files = []
+        for file_path, entry in walk_files(root, LANGUAGE_BY_EXTENSION, PROJECT_EXCLUDE_DIRS):
+            try:
+                files.append((file_path, entry.stat()))
+            except OSError:
+                continue
+        
+        return files
+    
+    def analyze_project(self, root: str = ".", chunk_size: int = 16) -> Iterator[CodeAnalysis]:
+        """並行分析整個項目，按完成順序串流返回分析結果
+        
+        正則分析器是 CPU 密集型，因此未命中緩存的檔案分批送到進程池，
+        避免 GIL 限制線程池的擴展性。
+        """
+        
+        start_time = time.time()
+        files = self.collect_project_files(root)
+        removed_count = self.prune_removed_files([file_path for file_path, _ in files])
+        
+        # 先在主進程檢查緩存，只把未命中的檔案送到進程池
+        cached_results = []
+        pending = []
+        for file_path, stat in files:
+            try:
+                file_hash = self.get_file_hash(Path(file_path), stat)
+            except OSError as e:
+                logger.warning(f"讀取檔案狀態失敗 {file_path}: {e}")
+                continue
+            
+            cached_analysis = self.get_cached_analysis(file_path, file_hash)
+            if cached_analysis:
+                cached_results.append(cached_analysis)
+            else:
+                pending.append((file_path, file_hash))
+        
+        process_workers = max(1, min(self.max_workers, os.cpu_count() or 1))
+        logger.info(f"📁 找到 {len(files)} 個檔案，{len(cached_results)} 個命中緩存，"
+                    f"{len(pending)} 個交給 {process_workers} 個進程分析")
+        
+        analyzed_count = 0
+        failed_count = 0
+        
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=process_workers, initializer=_init_analysis_worker
+        ) as pool:
+            futures = {}
+            for i in range(0, len(pending), chunk_size):
+                chunk = dict(pending[i:i + chunk_size])
+                futures[pool.submit(_analyze_files_in_worker, list(chunk))] = chunk
+            
+            # 進程池工作時先返回緩存結果
+            for cached_analysis in cached_results:
+                analyzed_count += 1
+                yield cached_analysis
+            
+            for future in concurrent.futures.as_completed(futures):
+                file_hashes = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    failed_count += len(file_hashes)
+                    logger.warning(f"分析批次失敗: {e}")
+                    continue
+                
+                for file_path, analysis, error in results:
+                    if error:
+                        failed_count += 1
+                        logger.warning(f"分析檔案失敗 {file_path}: {error}")
+                        continue
+                    
+                    self.cache_analysis(analysis, file_hashes[file_path])
+                    analyzed_count += 1
+                    yield analysis
+        
+        self.flush_cache_writes()
+        
+        elapsed = time.time() - start_time
+        files_per_second = analyzed_count / elapsed if elapsed > 0 else 0.0
+        self.last_project_stats = {
+            'total_files': len(files),
+            'analyzed_files': analyzed_count,
+            'cached_files': len(cached_results),
+            'removed_files': removed_count,
+            'failed_files': failed_count,
+            'process_workers': process_workers,
+            'elapsed_seconds': round(elapsed, 3),
+            'files_per_second': round(files_per_second, 1)
+        }
+        
+        logger.info(f"✅ 項目分析完成: {analyzed_count} 個檔案，耗時 {elapsed:.2f} 秒 "
+                    f"({files_per_second:.1f} 檔案/秒)")
+    
+    def prune_removed_files(self, files: List[str]) -> int:
+        """刪除已不存在的檔案的分析結果和摘要記錄 (file_digests 即上次分析的清單)"""
+        
+        current = set(files)
+        removed = [file_path for file_path in self.file_digests.entries
+                   if file_path not in current and not os.path.exists(file_path)]
+        return self.forget_files(removed)
+    
+    def forget_files(self, removed: List[str]) -> int:
+        """刪除指定檔案的分析結果和摘要記錄"""
+        
+        if not removed:
+            return 0
+        
+        removed_set = set(removed)
+        with self.cache_write_lock:
+            for file_path in removed:
+                self.file_digests.forget(file_path)
+            self.pending_cache_writes = {
+                cache_id: row for cache_id, row in self.pending_cache_writes.items()
+                if row[1] not in removed_set
+            }
+        self.analysis_cache.discard_where(lambda cache_id, entry: entry[0] in removed_set)
+        
+        conn = self.db_pool.get_connection()
+        with conn:
+            rows = [(file_path,) for file_path in removed]
+            conn.executemany('DELETE FROM code_analysis WHERE file_path = ?', rows)
+            conn.executemany('DELETE FROM file_digests WHERE file_path = ?', rows)
+        
+        logger.info(f"🗑️ 已移除 {len(removed)} 個已刪除檔案的分析結果")
+        return len(removed)
+    
+    def refresh_files(self, changed_paths: List[str], removed_paths: List[str]) -> int:
+        """重新分析變更的檔案並移除已刪除檔案的結果 (監聽模式的批次回調)
+        
+        變更的檔案在當前進程分析並立即提交，之後的 analyze_file_deep 直接命中緩存。
+        """
+        
+        self.forget_files([file_path for file_path in removed_paths if file_path in self.file_digests.entries])
+        
+        refreshed = 0
+        for file_path in changed_paths:
+            if self.detect_language(Path(file_path)) == 'unknown':
+                continue
+            try:
+                self.analyze_file_deep(file_path)
+                refreshed += 1
+            except Exception as e:
+                logger.warning(f"分析檔案失敗 {file_path}: {e}")
+        
+        self.flush_cache_writes()
+        return refreshed
+    
+    def analyze_typescript_javascript_deep(self, content: str, analysis: CodeAnalysis,
+                                           scan: Optional[SourceScan] = None):
         """深度分析 TypeScript/JavaScript"""
         
-        # 提取 imports
-        import_patterns = [
-            r'import\s+.*?\s+from\s+[\'"]([^\'"]+)[\'"]',
-            r'import\s*\(\s*[\'"]([^\'"]+)[\'"]\s*\)',
-            r'require\s*\(\s*[\'"]([^\'"]+)[\'"]\s*\)'
-        ]
-        
-        for pattern in import_patterns:
-            matches = re.findall(pattern, content)
-            analysis.imports.extend(matches)
-        
-        # 提取 exports
-        export_patterns = [
-            r'export\s+(?:default\s+)?(?:class|function|const|let|var)\s+(\w+)',
-            r'export\s*\{\s*([^}]+)\s*\}',
-            r'module\.exports\s*=\s*(\w+)'
-        ]
-        
-        for pattern in export_patterns:
-            matches = re.findall(pattern, content)
-            analysis.exports.extend([m for m in matches if m])
-        
-        # 提取函數
-        function_patterns = [
-            r'function\s+(\w+)\s*\([^)]*\)\s*\{',
-            r'const\s+(\w+)\s*=\s*(?:async\s+)?\([^)]*\)\s*=>\s*\{',
-            r'(\w+)\s*:\s*(?:async\s+)?\([^)]*\)\s*=>\s*\{',
-            r'async\s+function\s+(\w+)\s*\([^)]*\)\s*\{'
-        ]
-        
-        for pattern in function_patterns:
-            matches = re.findall(pattern, content)
-            for match in matches:
-                if match:
-                    # 分析函數複雜度
-                    func_complexity = self.calculate_function_complexity(content, match)
-                    analysis.functions.append({
-                        'name': match,
-                        'complexity': func_complexity,
-                        'async': 'async' in content,
-                        'parameters': self.extract_function_parameters(content, match)
-                    })
+        if scan is None:
+            scan = scan_source(content)
         
-        # 提取類別
-        class_pattern = r'class\s+(\w+)(?:\s+extends\s+(\w+))?\s*\{'
-        class_matches = re.findall(class_pattern, content)
-        for match in class_matches:
+        # imports / exports
+        analysis.imports.extend(scan.imports)
+        analysis.exports.extend(scan.exports)
+        
+        # 函數體和類別體由花括號配對一次定位，複雜度按函數體範圍統計
+        braces = match_braces(content) if scan.functions or scan.classes else {}
+        control_flow = [match.start() for match in CONTROL_FLOW_PATTERN.finditer(content)] if scan.functions else []
+        
+        # 函數
+        for function in scan.functions:
+            body_start = function['body_start']
+            body_end = braces.get(body_start, (body_start, 0))[0]
+            analysis.functions.append({
+                'name': function['name'],
+                'complexity': 1 + count_positions(control_flow, body_start, body_end),
+                'async': function['async'],
+                'parameters': self.parse_parameters(function['parameters'])
+            })
+        
+        # 類別
+        for class_info in scan.classes:
             analysis.classes.append({
-                'name': match[0],
-                'extends': match[1] if match[1] else None,
-                'methods': self.extract_class_methods(content, match[0])
+                'name': class_info['name'],
+                'extends': class_info['extends'],
+                'methods': self.extract_class_methods(content, class_info['body_start'], braces)
             })
         
         # TypeScript 特定分析
         if analysis.language == 'typescript':
-            self.analyze_typescript_specific(content, analysis)
+            self.analyze_typescript_specific(content, analysis, scan)
     
-    def analyze_patterns(self, content: str, analysis: CodeAnalysis):
+    def analyze_patterns(self, content: str, analysis: CodeAnalysis, scan: Optional[SourceScan] = None):
         """分析代碼模式"""
         
+        if scan is None:
+            scan = scan_source(content)
+        tokens = scan.tokens
+        
         detected_patterns = []
         
         # React 模式檢測
-        if 'react' in content.lower() or 'jsx' in content.lower():
-            if 'useState' in content:
-                detected_patterns.append("React Hooks - useState")
-            if 'useEffect' in content:
-                detected_patterns.append("React Hooks - useEffect")
-            if 'useMemo' in content:
-                detected_patterns.append("React Hooks - useMemo")
-            if 'useCallback' in content:
-                detected_patterns.append("React Hooks - useCallback")
-            if 'createContext' in content:
+        if 'react' in tokens or 'jsx' in tokens:
+            for hook in ('useState', 'useEffect', 'useMemo', 'useCallback'):
+                if hook in tokens:
+                    detected_patterns.append(f"React Hooks - {hook}")
+            if 'createContext' in tokens:
                 detected_patterns.append("React Context Pattern")
         
         # 設計模式檢測
-        if re.search(r'class\s+\w+\s*\{[^}]*static\s+instance', content):
+        if 'singleton' in scan.flags:
             detected_patterns.append("Singleton Pattern")
         
-        if re.search(r'function\s+create\w+|class\s+\w+Factory', content):
+        if 'factory' in scan.flags:
             detected_patterns.append("Factory Pattern")
         
-        if 'addEventListener' in content or 'on(' in content:
+        if 'addEventListener' in tokens or 'on(' in tokens:
             detected_patterns.append("Observer Pattern")
         
         # 性能模式檢測
-        if 'memo(' in content or 'React.memo' in content:
+        if 'memo(' in tokens or 'React.memo' in tokens:
             detected_patterns.append("Memoization Pattern")
         
-        if 'lazy(' in content or 'import(' in content:
+        if 'lazy(' in tokens or 'import(' in tokens:
             detected_patterns.append("Lazy Loading Pattern")
         
-        if 'debounce' in content or 'throttle' in content:
+        if 'debounce' in tokens or 'throttle' in tokens:
             detected_patterns.append("Debounce/Throttle Pattern")
         
         analysis.patterns = detected_patterns
     
-    def analyze_performance(self, content: str, analysis: CodeAnalysis):
+    def analyze_performance(self, content: str, analysis: CodeAnalysis, scan: Optional[SourceScan] = None):
         """分析性能相關問題"""
         
+        if scan is None:
+            scan = scan_source(content)
+        tokens = scan.tokens
+        
         performance_notes = []
         
         # 檢查潛在性能問題
-        if re.search(r'for\s*\([^)]*\)\s*\{[^}]*for\s*\(', content):
+        if 'nested_loop' in scan.flags:
             performance_notes.append("檢測到嵌套循環，可能影響性能")
         
-        if content.count('querySelector') > 5:
+        if tokens['querySelector'] > 5:
             performance_notes.append("大量 DOM 查詢，建議緩存選擇器")
         
-        if 'innerHTML' in content:
+        if 'innerHTML' in tokens:
             performance_notes.append("使用 innerHTML 可能導致 XSS 風險和性能問題")
         
-        if re.search(r'\.map\([^)]*\)\.filter\([^)]*\)', content):
+        if 'map_filter' in scan.flags:
             performance_notes.append("連續的 map 和 filter 操作，建議合併")
         
         # 檢查優化機會
-        if 'useEffect' in content and not 'dependencies' in content:
+        if 'useEffect' in tokens and 'dependencies' not in tokens:
             performance_notes.append("useEffect 缺少依賴數組，可能導致不必要的重渲染")
         
         analysis.performance_notes = performance_notes
     
-    def analyze_security(self, content: str, analysis: CodeAnalysis):
+    def analyze_security(self, content: str, analysis: CodeAnalysis, scan: Optional[SourceScan] = None):
         """分析安全相關問題"""
         
+        if scan is None:
+            scan = scan_source(content)
+        tokens = scan.tokens
+        
         security_notes = []
         
         # 檢查安全問題
-        if 'eval(' in content:
+        if 'eval(' in tokens:
             security_notes.append("使用 eval() 存在安全風險")
         
-        if 'innerHTML' in content:
+        if 'innerHTML' in tokens:
             security_notes.append("innerHTML 可能導致 XSS 攻擊")
         
-        if re.search(r'document\.write\s*\(', content):
+        if 'document_write' in scan.flags:
             security_notes.append("document.write 存在安全風險")
         
-        if 'localStorage' in content and not 'JSON.parse' in content:
+        if 'localStorage' in tokens and 'JSON.parse' not in tokens:
             security_notes.append("localStorage 使用需要注意數據驗證")
         
         # 檢查輸入驗證
-        if 'input' in content.lower() and not any(keyword in content for keyword in ['validate', 'sanitize', 'escape']):
+        if 'input' in tokens and not any(keyword in tokens for keyword in ['validate', 'sanitize', 'escape']):
             security_notes.append("輸入處理缺少驗證和清理")
         
         analysis.security_notes = security_notes
     
-    def analyze_best_practices(self, content: str, analysis: CodeAnalysis):
+    def analyze_best_practices(self, content: str, analysis: CodeAnalysis, scan: Optional[SourceScan] = None):
         """分析最佳實踐遵循情況"""
         
+        if scan is None:
+            scan = scan_source(content)
+        tokens = scan.tokens
+        
         score = 100
         suggestions = []
         
         # TypeScript 最佳實踐
         if analysis.language == 'typescript':
-            if 'any' in content:
+            if 'any' in tokens:
                 score -= 10
                 suggestions.append("避免使用 any 類型，使用具體類型")
             
-            if not re.search(r'interface\s+\w+|type\s+\w+\s*=', content) and len(content) > 500:
+            if 'type_definitions' not in scan.flags and len(content) > 500:
                 score -= 15
                 suggestions.append("大型檔案建議定義接口或類型")
         
         # React 最佳實踐
-        if 'react' in content.lower():
-            if 'class' in content and 'extends Component' in content:
+        if 'react' in tokens:
+            if 'class' in tokens and 'extends Component' in tokens:
                 score -= 20
                 suggestions.append("建議使用函數組件替代類組件")
             
-            if 'useEffect' in content and '[]' not in content:
+            if 'useEffect' in tokens and '[]' not in tokens:
                 score -= 10
                 suggestions.append("useEffect 應該包含依賴數組")
         
         # 通用最佳實踐
-        if not re.search(r'//.*|/\*.*\*/', content) and len(content) > 200:
+        if 'comment' not in scan.flags and len(content) > 200:
             score -= 15
             suggestions.append("代碼缺少註釋，建議添加說明")
         
-        if len(content.split('\n')) > 300:
+        if content.count('\n') + 1 > 300:
             score -= 10
             suggestions.append("檔案過大，建議拆分為更小的模組")
         
@@ -512,139 +1089,85 @@ class SuperchargedAugmentAnalyzer:
         else:
             analysis.test_coverage_estimate = 0.3
     
-    def get_file_hash(self, path: Path) -> str:
-        """獲取檔案哈希值"""
-        stat = path.stat()
-        content = f"{path}:{stat.st_size}:{stat.st_mtime}"
-        return hashlib.md5(content.encode()).hexdigest()
+    def get_file_hash(self, path: Path, stat: Optional[os.stat_result] = None) -> str:
+        """獲取檔案內容摘要 (stat 未變時直接使用記住的摘要)"""
+        return self.file_digests.digest(path, stat)
     
     def detect_language(self, path: Path) -> str:
         """檢測檔案語言"""
-        suffix = path.suffix.lower()
-        name = path.name.lower()
-        
-        language_map = {
-            '.ts': 'typescript',
-            '.tsx': 'typescript',
-            '.js': 'javascript', 
-            '.jsx': 'javascript',
-            '.py': 'python',
-            '.html': 'html',
-            '.css': 'css',
-            '.scss': 'css',
-            '.json': 'json',
-            '.md': 'markdown'
-        }
-        
-        return language_map.get(suffix, 'unknown')
-    
-    def calculate_function_complexity(self, content: str, func_name: str) -> int:
-        """計算函數複雜度"""
-        # 簡化的複雜度計算
-        func_pattern = rf'function\s+{func_name}.*?\{{(.*?)\}}'
-        match = re.search(func_pattern, content, re.DOTALL)
-        
-        if not match:
-            return 1
-        
-        func_body = match.group(1)
-        
-        # 計算控制流語句
-        complexity = 1  # 基礎複雜度
-        complexity += func_body.count('if')
-        complexity += func_body.count('else')
-        complexity += func_body.count('for')
-        complexity += func_body.count('while')
-        complexity += func_body.count('switch')
-        complexity += func_body.count('case')
-        complexity += func_body.count('catch')
-        
-        return complexity
+        return LANGUAGE_BY_EXTENSION.get(path.suffix.lower(), 'unknown')
     
-    def extract_function_parameters(self, content: str, func_name: str) -> List[str]:
-        """提取函數參數"""
-        func_pattern = rf'function\s+{func_name}\s*\(([^)]*)\)'
-        match = re.search(func_pattern, content)
-        
-        if not match:
-            return []
-        
-        params_str = match.group(1)
-        if not params_str.strip():
+    def parse_parameters(self, params_str: Optional[str], skip: Tuple[str, ...] = ()) -> List[str]:
+        """解析參數列表字符串"""
+        if not params_str or not params_str.strip():
             return []
         
         # 簡單的參數解析
         params = [p.strip().split(':')[0].strip() for p in params_str.split(',')]
-        return [p for p in params if p]
+        return [p for p in params if p and p not in skip]
     
-    def extract_class_methods(self, content: str, class_name: str) -> List[str]:
-        """提取類別方法"""
-        class_pattern = rf'class\s+{class_name}.*?\{{(.*?)\}}'
-        match = re.search(class_pattern, content, re.DOTALL)
-        
-        if not match:
+    def extract_class_methods(self, content: str, body_start: int,
+                              braces: Dict[int, Tuple[int, int]]) -> List[str]:
+        """提取類別方法 (只取類別體直接包含的成員)"""
+        if body_start not in braces:
             return []
         
-        class_body = match.group(1)
-        method_pattern = r'(\w+)\s*\([^)]*\)\s*\{'
-        methods = re.findall(method_pattern, class_body)
+        body_end, depth = braces[body_start]
+        methods = []
+        for match in METHOD_SIGNATURE_PATTERN.finditer(content, body_start + 1, body_end):
+            member_brace = braces.get(match.end() - 1)
+            if member_brace is None or member_brace[1] != depth + 1:
+                continue
+            name = PROPERTY_NAME_PATTERN.search(content, max(body_start + 1, match.start() - 64), match.start())
+            if name and name.group(1) not in NON_METHOD_NAMES:
+                methods.append(name.group(1))
         
         return methods
     
-    def analyze_typescript_specific(self, content: str, analysis: CodeAnalysis):
+    def analyze_typescript_specific(self, content: str, analysis: CodeAnalysis,
+                                    scan: Optional[SourceScan] = None):
         """TypeScript 特定分析"""
         
+        if scan is None:
+            scan = scan_source(content)
+        
         # 檢查類型定義
-        if re.search(r'interface\s+\w+|type\s+\w+\s*=', content):
+        if 'type_definitions' in scan.flags:
             analysis.patterns.append("TypeScript Type Definitions")
         
         # 檢查泛型使用
-        if re.search(r'<[A-Z]\w*>', content):
+        if 'generics' in scan.flags:
             analysis.patterns.append("TypeScript Generics")
         
         # 檢查嚴格模式特性
-        if '!' in content:  # 非空斷言
+        if '!' in scan.tokens:  # 非空斷言
             analysis.potential_issues.append("使用非空斷言操作符，需要確保安全性")
         
-        if 'as ' in content:  # 類型斷言
+        if 'as ' in scan.tokens:  # 類型斷言
             analysis.potential_issues.append("使用類型斷言，建議使用類型守衛")
 
     def analyze_python_deep(self, content: str, analysis: CodeAnalysis):
         """深度分析 Python"""
 
-        # 提取 imports
-        import_patterns = [
-            r'import\s+(\w+)',
-            r'from\s+(\w+)\s+import',
-            r'import\s+(\w+)\s+as\s+\w+'
-        ]
-
-        for pattern in import_patterns:
-            matches = re.findall(pattern, content)
-            analysis.imports.extend(matches)
-
-        # 提取函數
-        function_pattern = r'def\s+(\w+)\s*\([^)]*\):'
-        functions = re.findall(function_pattern, content)
-
-        for func_name in functions:
-            func_complexity = self.calculate_function_complexity(content, func_name)
-            analysis.functions.append({
-                'name': func_name,
-                'complexity': func_complexity,
-                'async': 'async def' in content,
-                'parameters': self.extract_python_function_parameters(content, func_name)
-            })
-
-        # 提取類別
-        class_pattern = r'class\s+(\w+)(?:\([^)]*\))?:'
-        classes = re.findall(class_pattern, content)
-
-        for class_name in classes:
-            analysis.classes.append({
-                'name': class_name,
-                'methods': self.extract_python_class_methods(content, class_name)
-            })
+        # 優先用 AST 一次遍歷提取結構；語法錯誤 (如 Python 2 源碼) 或嵌套過深時回退到正則 + 縮進分析
+        try:
+            info = analyze_python_source(content, analysis.file_path)
+        except (SyntaxError, ValueError, RecursionError):
+            self.analyze_python_regex(content, analysis)
+        else:
+            analysis.imports.extend(info.imports)
+            for function in info.functions:
+                analysis.functions.append({
+                    'name': function['name'],
+                    'complexity': function['complexity'],
+                    'async': function['async'],
+                    'parameters': function['parameters']
+                })
+            for class_info in info.classes:
+                analysis.classes.append({
+                    'name': class_info['name'],
+                    'methods': class_info['methods'][:10]  # 最多返回10個方法
+                })
 
         # Python 特定檢查
         if '__name__ == "__main__"' in content:
@@ -656,12 +1179,43 @@ class SuperchargedAugmentAnalyzer:
         if 'typing' in content:
             analysis.patterns.append("Python Type Hints")
 
+    def analyze_python_regex(self, content: str, analysis: CodeAnalysis):
+        """無法解析為 AST 時的 Python 結構提取"""
+
+        # 提取 imports
+        for pattern in PYTHON_IMPORT_PATTERNS:
+            analysis.imports.extend(pattern.findall(content))
+
+        # 按縮進一次劃分 def/class 塊，複雜度按塊範圍統計
+        blocks = python_block_spans(content)
+        control_flow = [match.start() for match in PYTHON_CONTROL_FLOW_PATTERN.finditer(content)] if blocks else []
+        class_methods = defaultdict(list)
+
+        for block in blocks:
+            if block['kind'] != 'def':
+                continue
+            analysis.functions.append({
+                'name': block['name'],
+                'complexity': 1 + count_positions(control_flow, block['start'], block['end']),
+                'async': block['async'],
+                'parameters': self.parse_parameters(block['parameters'], skip=('self',))
+            })
+            if block['parent'] is not None and blocks[block['parent']]['kind'] == 'class':
+                class_methods[block['parent']].append(block['name'])
+
+        # 提取類別
+        for index, block in enumerate(blocks):
+            if block['kind'] == 'class':
+                analysis.classes.append({
+                    'name': block['name'],
+                    'methods': class_methods[index][:10]  # 最多返回10個方法
+                })
+
     def analyze_web_component_deep(self, content: str, analysis: CodeAnalysis):
         """深度分析 Web 組件"""
 
         # JSX/TSX 組件分析
-        component_pattern = r'(?:function|const)\s+(\w+)\s*(?:\([^)]*\))?\s*(?::\s*\w+)?\s*=>\s*\{'
-        components = re.findall(component_pattern, content)
+        components = WEB_COMPONENT_PATTERN.findall(content)
 
         for comp_name in components:
             analysis.components.append({
@@ -683,8 +1237,7 @@ class SuperchargedAugmentAnalyzer:
         """深度分析 CSS"""
 
         # CSS 選擇器分析
-        selector_pattern = r'([.#]?[\w-]+)\s*\{'
-        selectors = re.findall(selector_pattern, content)
+        selectors = CSS_SELECTOR_PATTERN.findall(content)
 
         analysis.patterns.extend([f"CSS Selector: {sel}" for sel in selectors[:10]])
 
@@ -724,36 +1277,6 @@ class SuperchargedAugmentAnalyzer:
         except json.JSONDecodeError:
             analysis.potential_issues.append("Invalid JSON format")
 
-    def extract_python_function_parameters(self, content: str, func_name: str) -> List[str]:
-        """提取 Python 函數參數"""
-        func_pattern = rf'def\s+{func_name}\s*\(([^)]*)\):'
-        match = re.search(func_pattern, content)
-
-        if not match:
-            return []
-
-        params_str = match.group(1)
-        if not params_str.strip():
-            return []
-
-        # 簡單的參數解析
-        params = [p.strip().split(':')[0].strip() for p in params_str.split(',')]
-        return [p for p in params if p and p != 'self']
-
-    def extract_python_class_methods(self, content: str, class_name: str) -> List[str]:
-        """提取 Python 類別方法"""
-        class_pattern = rf'class\s+{class_name}.*?:'
-        class_start = re.search(class_pattern, content)
-
-        if not class_start:
-            return []
-
-        # 簡單的方法提取
-        method_pattern = r'def\s+(\w+)\s*\('
-        methods = re.findall(method_pattern, content[class_start.end():])
-
-        return methods[:10]  # 最多返回10個方法
-    
     def create_binary_file_analysis(self, file_path: str) -> CodeAnalysis:
         """創建二進制檔案分析"""
         return CodeAnalysis(
@@ -776,50 +1299,149 @@ class SuperchargedAugmentAnalyzer:
         )
     
     def get_cached_analysis(self, file_path: str, file_hash: str) -> Optional[CodeAnalysis]:
-        """獲取緩存的分析結果"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """獲取緩存的分析結果 (記憶體 LRU -> 寫入緩衝區 -> SQLite)"""
+        
+        cache_id = hashlib.md5(f"{file_path}{file_hash}".encode()).hexdigest()
+        cached_entry = self.analysis_cache.get(cache_id)
+        if cached_entry is not None:
+            return self.decode_analysis(cached_entry[1])
+        
+        # 再查找尚未寫入的緩衝區
+        with self.cache_write_lock:
+            pending_row = self.pending_cache_writes.get(cache_id)
+        
+        if pending_row:
+            analysis_data = pending_row[7]
+        else:
+            cursor = self.db_pool.get_connection().cursor()
+            cursor.execute('''
+                SELECT analysis_data FROM code_analysis 
+                WHERE file_path = ? AND file_hash = ?
+            ''', (file_path, file_hash))
+            
+            row = cursor.fetchone()
+            if not row:
+                return self.get_cached_analysis_by_content(file_path, file_hash)
+            analysis_data = row[0]
+        
+        analysis = self.decode_analysis(analysis_data)
+        if analysis is None:
+            return None
         
+        # 以 JSON 長度估算佔用的字節數
+        self.analysis_cache.put(cache_id, (file_path, analysis_data), len(analysis_data))
+        return analysis
+    
+    @staticmethod
+    def decode_analysis(analysis_data: str) -> Optional[CodeAnalysis]:
+        """把緩存的 JSON 解碼為新的 CodeAnalysis"""
+        try:
+            return CodeAnalysis(**json.loads(analysis_data))
+        except (ValueError, TypeError):
+            return None
+    
+    def get_cached_analysis_by_content(self, file_path: str, file_hash: str) -> Optional[CodeAnalysis]:
+        """按內容摘要查找其他路徑的分析結果 (重命名、複製或切換分支後內容相同的檔案)"""
+        
+        cursor = self.db_pool.get_connection().cursor()
         cursor.execute('''
             SELECT analysis_data FROM code_analysis 
-            WHERE file_path = ? AND file_hash = ?
-        ''', (file_path, file_hash))
+            WHERE file_hash = ? AND language = ?
+            LIMIT 1
+        ''', (file_hash, self.detect_language(Path(file_path))))
         
         row = cursor.fetchone()
-        conn.close()
+        if not row:
+            return None
         
-        if row:
-            try:
-                data = json.loads(row[0])
-                return CodeAnalysis(**data)
-            except:
-                pass
+        analysis = self.decode_analysis(row[0])
+        if analysis is None:
+            return None
         
-        return None
+        # 分數與路徑有關 (測試檔案、路徑長度)，換路徑後重新計算
+        analysis.file_path = file_path
+        self.calculate_scores(analysis)
+        self.cache_analysis(analysis, file_hash)
+        return analysis
     
     def cache_analysis(self, analysis: CodeAnalysis, file_hash: str):
-        """緩存分析結果"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """緩存分析結果 (寫入緩衝區，達到批量大小時提交)"""
         
         now = datetime.now().isoformat()
         analysis_data = json.dumps(asdict(analysis))
+        cache_id = hashlib.md5(f"{analysis.file_path}{file_hash}".encode()).hexdigest()
+        self.analysis_cache.put(cache_id, (analysis.file_path, analysis_data), len(analysis_data))
+        
+        with self.cache_write_lock:
+            self.pending_cache_writes[cache_id] = (
+                cache_id, analysis.file_path, file_hash, analysis.language,
+                analysis.complexity_score, analysis.maintainability_score,
+                analysis.best_practices_score, analysis_data, now, now
+            )
+            should_flush = len(self.pending_cache_writes) >= self.cache_write_batch_size
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO code_analysis 
-            (id, file_path, file_hash, language, complexity_score, 
-             maintainability_score, best_practices_score, analysis_data, 
-             created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            hashlib.md5(f"{analysis.file_path}{file_hash}".encode()).hexdigest(),
-            analysis.file_path, file_hash, analysis.language,
-            analysis.complexity_score, analysis.maintainability_score,
-            analysis.best_practices_score, analysis_data, now, now
-        ))
-        
-        conn.commit()
-        conn.close()
+        if should_flush:
+            self.flush_cache_writes()
+    
+    def flush_cache_writes(self):
+        """在一個寫入交易中提交所有緩衝的分析結果"""
+        
+        with self.cache_write_lock:
+            rows = list(self.pending_cache_writes.values())
+            self.pending_cache_writes = {}
+            digest_rows = self.file_digests.take_dirty_rows()
+        
+        if not rows and not digest_rows:
+            return
+        
+        conn = self.db_pool.get_connection()
+        with conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO code_analysis 
+                (id, file_path, file_hash, language, complexity_score, 
+                 maintainability_score, best_practices_score, analysis_data, 
+                 created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.executemany('''
+                INSERT OR REPLACE INTO file_digests (file_path, size, mtime_ns, content_hash)
+                VALUES (?, ?, ?, ?)
+            ''', digest_rows)
+    
+    def get_cache_statistics(self) -> Dict[str, Dict[str, Any]]:
+        """各記憶體緩存的命中、未命中和淘汰統計"""
+        return {
+            'analysis_cache': self.analysis_cache.get_statistics()
+        }
+    
+    def get_pattern_statistics(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """各正則的調用次數、命中次數和累計耗時 (當前進程，按耗時排序)"""
+        return PATTERNS.get_statistics(limit)
+    
+    def close(self):
+        """提交緩衝的寫入並釋放資源"""
+        self.flush_cache_writes()
+        self.executor.shutdown(wait=False)
+        self.db_pool.close_all()
+
+# 進程池工作者使用的分析器 (每個進程一個)
+_worker_analyzer: Optional[SuperchargedAugmentAnalyzer] = None
+
+def _init_analysis_worker():
+    """初始化工作進程的分析器"""
+    global _worker_analyzer
+    logger.setLevel(logging.WARNING)
+    _worker_analyzer = SuperchargedAugmentAnalyzer(max_workers=1, cache_size_gb=0, use_database=False)
+
+def _analyze_files_in_worker(file_paths: List[str]) -> List[Tuple[str, Optional[CodeAnalysis], Optional[str]]]:
+    """在工作進程中分析一批檔案"""
+    results = []
+    for file_path in file_paths:
+        try:
+            results.append((file_path, _worker_analyzer.analyze_file_uncached(Path(file_path)), None))
+        except Exception as e:
+            results.append((file_path, None, str(e)))
+    return results
 
 def main():
     """測試超級增強分析器"""
@@ -853,6 +1475,34 @@ def main():
                 print(f"   優化建議: {len(analysis.optimization_suggestions)}")
             except Exception as e:
                 print(f"   ❌ 分析失敗: {e}")
+    
+    # 正則耗時排行 (只統計當前進程，進程池中的分析各自計數)
+    pattern_stats = analyzer.get_pattern_statistics(limit=5)
+    if pattern_stats:
+        print("\n⏱️ 正則耗時排行:")
+        for row in pattern_stats:
+            print(f"   {row['name']:28s} {row['total_ms']:8.2f} ms  {row['calls']} 次  "
+                  f"命中 {row['hits']}  ({row['share']:.0%})")
+    
+    # 整個項目並行分析
+    if '--project' in sys.argv:
+        arg_index = sys.argv.index('--project') + 1
+        project_root = sys.argv[arg_index] if arg_index < len(sys.argv) else "."
+        print(f"\n📁 並行分析項目: {project_root}")
+        for analysis in analyzer.analyze_project(project_root):
+            pass
+        stats = analyzer.last_project_stats
+        print(f"   分析檔案: {stats['analyzed_files']}/{stats['total_files']}")
+        print(f"   速度: {stats['files_per_second']} 檔案/秒")
+    
+    # 監聽模式: 檔案變更後重新分析，緩存保持最新
+    if '--watch' in sys.argv:
+        arg_index = sys.argv.index('--watch') + 1
+        watch_root = sys.argv[arg_index] if arg_index < len(sys.argv) and not sys.argv[arg_index].startswith('--') else "."
+        print(f"\n👀 監聽項目檔案變更: {watch_root} (Ctrl+C 停止)")
+        watch_project(watch_root, analyzer.refresh_files, exclude_dirs=PROJECT_EXCLUDE_DIRS)
+    
+    analyzer.close()
 
 if __name__ == "__main__":
     main()
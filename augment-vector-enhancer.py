@@ -5,27 +5,370 @@ Augment 向量數據庫增強器
 """
 
 import os
+import sys
 import json
+import math
+import array
 import hashlib
 import sqlite3
+import zlib
+import time
+import heapq
+import random
+import itertools
+import concurrent.futures
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
-# import numpy as np  # 不使用 numpy，使用純 Python 實現
+from collections import defaultdict, Counter
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Set
 from datetime import datetime
 import logging
 import re
 
+from augment_file_digest import FileDigestCache
+from augment_index_watcher import watch_project
+from augment_tree_walker import DEFAULT_EXCLUDE_DIRS, walk_files
+
+# 嘗試導入 numpy (如果可用)，否則使用純 Python 實現
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 # 設置日誌
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 數據庫結構版本 (PRAGMA user_version)
+# 1: vector_data 由 JSON 文本改為 float32 BLOB
+# 2: 語義索引詞彙正規化為小寫，新增詞彙表和三元組倒排索引
+# 3: 新增 BM25 統計 (詞頻、文檔頻率、文檔長度)
+VECTOR_SCHEMA_VERSION = 3
+
+# BM25 參數
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 編程關鍵詞 (按子字串計數)
+PROGRAMMING_KEYWORDS = (
+    'function', 'class', 'interface', 'type', 'const', 'let', 'var',
+    'import', 'export', 'default', 'async', 'await', 'promise',
+    'react', 'component', 'hook', 'state', 'props', 'jsx', 'tsx',
+    'typescript', 'javascript', 'node', 'express', 'api', 'database',
+    'test', 'jest', 'playwright', 'cypress', 'mock', 'spec'
+)
+
+# 項目索引的檔案類型
+INDEXED_EXTENSIONS = ('.py', '.js', '.ts', '.tsx', '.jsx')
+
+# SQLite 單條語句的參數數量上限 (保守值)
+SQLITE_MAX_PARAMS = 900
+
+def term_trigrams(term: str) -> Set[str]:
+    """詞彙的三元組集合 (用於子字串查找)"""
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+def pack_vector(vector: List[float]) -> bytes:
+    """將向量打包為小端 float32 二進制"""
+    packed = array.array('f', vector)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+def unpack_vector(data) -> Any:
+    """解包 float32 二進制向量 (小端機器上零拷貝)，兼容舊的 JSON 文本"""
+    if isinstance(data, str):
+        return json.loads(data)
+    if sys.byteorder == 'big':
+        unpacked = array.array('f')
+        unpacked.frombytes(data)
+        unpacked.byteswap()
+        return unpacked
+    return memoryview(data).cast('f')
+
+class LSHIndex:
+    """隨機超平面 LSH 近似最近鄰索引 (需要 numpy)
+    
+    每個表用 num_bits 個隨機超平面把向量哈希成一個桶編號。查詢時除了
+    自身的桶，還會探測 probes 個最接近超平面的位元翻轉後的鄰近桶
+    (multi-probe)。num_tables 和 probes 越大召回率越高，延遲也越高。
+    """
+    
+    def __init__(self, dimension: int = 128, num_tables: int = 8, num_bits: int = 12,
+                 probes: int = 4, seed: int = 42):
+        self.dimension = dimension
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+        self.probes = probes
+        self.seed = seed
+        
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((num_tables * num_bits, dimension)).astype(np.float32)
+        self.bit_weights = (1 << np.arange(num_bits, dtype=np.int64))
+        
+        self.buckets: List[Dict[int, Set[str]]] = [defaultdict(set) for _ in range(num_tables)]
+        self.codes: Dict[str, List[int]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.codes)
+    
+    def hash_matrix(self, matrix) -> Any:
+        """計算一批向量在每個表中的桶編號，返回 (n, num_tables)"""
+        projections = np.asarray(matrix, dtype=np.float32) @ self.planes.T
+        bits = (projections > 0).reshape(-1, self.num_tables, self.num_bits).astype(np.int64)
+        return bits @ self.bit_weights
+    
+    def add(self, file_path: str, vector):
+        """添加或更新向量"""
+        self.add_codes(file_path, self.hash_matrix([vector])[0].tolist())
+    
+    def add_codes(self, file_path: str, codes: List[int]):
+        """使用已計算好的桶編號添加向量"""
+        self.remove(file_path)
+        self.codes[file_path] = codes
+        for table, code in enumerate(codes):
+            self.buckets[table][code].add(file_path)
+    
+    def remove(self, file_path: str):
+        """移除向量"""
+        codes = self.codes.pop(file_path, None)
+        if codes is None:
+            return
+        for table, code in enumerate(codes):
+            bucket = self.buckets[table].get(code)
+            if bucket is not None:
+                bucket.discard(file_path)
+                if not bucket:
+                    del self.buckets[table][code]
+    
+    def candidates(self, query_vector) -> Set[str]:
+        """收集查詢向量的候選路徑 (自身桶 + 多探測鄰近桶)"""
+        
+        projections = (self.planes @ np.asarray(query_vector, dtype=np.float32)).reshape(
+            self.num_tables, self.num_bits)
+        codes = (projections > 0).astype(np.int64) @ self.bit_weights
+        
+        # 最接近超平面的位元最有可能被翻轉
+        probe_count = min(self.probes, self.num_bits)
+        probe_bits = np.argsort(np.abs(projections), axis=1)[:, :probe_count]
+        
+        result: Set[str] = set()
+        for table in range(self.num_tables):
+            buckets = self.buckets[table]
+            code = int(codes[table])
+            result.update(buckets.get(code, ()))
+            for bit in probe_bits[table]:
+                result.update(buckets.get(code ^ (1 << int(bit)), ()))
+        
+        return result
+    
+    def config(self) -> Dict[str, int]:
+        return {
+            'dimension': self.dimension,
+            'num_tables': self.num_tables,
+            'num_bits': self.num_bits,
+            'seed': self.seed
+        }
+    
+    def save(self, index_path: str, stamp: str):
+        """保存索引 (stamp 用於判斷數據庫是否已變更)"""
+        paths = list(self.codes)
+        codes = np.array([self.codes[path] for path in paths], dtype=np.int64).reshape(-1, self.num_tables)
+        with open(index_path, 'wb') as f:
+            np.savez(f, paths=np.array(paths, dtype=str), codes=codes,
+                     config=json.dumps(self.config()), stamp=stamp)
+    
+    def load(self, index_path: str, stamp: str) -> bool:
+        """載入索引，配置或 stamp 不符時返回 False"""
+        try:
+            with np.load(index_path, allow_pickle=False) as data:
+                if str(data['config']) != json.dumps(self.config()) or str(data['stamp']) != stamp:
+                    return False
+                for file_path, codes in zip(data['paths'].tolist(), data['codes'].tolist()):
+                    self.add_codes(file_path, codes)
+            return True
+        except (OSError, KeyError, ValueError):
+            return False
+
+class VectorIndex:
+    """記憶體向量索引
+    
+    所有向量保存在一個連續的 float32 矩陣中，並維護行號到路徑的映射。
+    向量已經 L2 正規化，因此餘弦相似度就是一次矩陣-向量點積。
+    沒有 numpy 時退回純 Python 實現。
+    """
+    
+    def __init__(self, dimension: int = 128, initial_capacity: int = 1024):
+        self.dimension = dimension
+        self.paths: List[str] = []
+        self.path_to_row: Dict[str, int] = {}
+        
+        if NUMPY_AVAILABLE:
+            self.matrix = np.zeros((initial_capacity, dimension), dtype=np.float32)
+        else:
+            self.rows: List[Any] = []
+        
+        # 可選的近似最近鄰索引，向量數量達到 ann_min_vectors 後才使用
+        self.ann: Optional[LSHIndex] = None
+        self.ann_min_vectors = 1000
+    
+    def __len__(self) -> int:
+        return len(self.paths)
+    
+    def __contains__(self, file_path: str) -> bool:
+        return file_path in self.path_to_row
+    
+    def add(self, file_path: str, vector) -> bool:
+        """添加或更新向量，維度不符時忽略"""
+        
+        if len(vector) != self.dimension:
+            return False
+        
+        row = self.path_to_row.get(file_path)
+        if row is None:
+            row = len(self.paths)
+            self.paths.append(file_path)
+            self.path_to_row[file_path] = row
+            
+            if NUMPY_AVAILABLE:
+                if row >= self.matrix.shape[0]:
+                    grown = np.zeros((self.matrix.shape[0] * 2, self.dimension), dtype=np.float32)
+                    grown[:row] = self.matrix[:row]
+                    self.matrix = grown
+            else:
+                self.rows.append(None)
+        
+        if NUMPY_AVAILABLE:
+            self.matrix[row] = np.asarray(vector, dtype=np.float32)
+        else:
+            self.rows[row] = array.array('f', vector)
+        
+        if self.ann is not None:
+            self.ann.add(file_path, self.matrix[row])
+        return True
+    
+    def remove(self, file_path: str) -> bool:
+        """移除向量 (用最後一行填補空位)"""
+        
+        row = self.path_to_row.pop(file_path, None)
+        if row is None:
+            return False
+        
+        if self.ann is not None:
+            self.ann.remove(file_path)
+        
+        last_row = len(self.paths) - 1
+        last_path = self.paths.pop()
+        
+        if row != last_row:
+            self.paths[row] = last_path
+            self.path_to_row[last_path] = row
+            if NUMPY_AVAILABLE:
+                self.matrix[row] = self.matrix[last_row]
+            else:
+                self.rows[row] = self.rows[last_row]
+        
+        if not NUMPY_AVAILABLE:
+            self.rows.pop()
+        return True
+    
+    def get(self, file_path: str) -> Optional[List[float]]:
+        """獲取向量"""
+        
+        row = self.path_to_row.get(file_path)
+        if row is None:
+            return None
+        if NUMPY_AVAILABLE:
+            return self.matrix[row].tolist()
+        return list(self.rows[row])
+    
+    def attach_ann(self, ann: LSHIndex):
+        """掛載近似最近鄰索引，補上尚未哈希的向量"""
+        
+        missing = [path for path in self.paths if path not in ann.codes]
+        if missing:
+            rows = [self.path_to_row[path] for path in missing]
+            for path, codes in zip(missing, ann.hash_matrix(self.matrix[rows]).tolist()):
+                ann.add_codes(path, codes)
+        
+        for stale_path in [path for path in ann.codes if path not in self.path_to_row]:
+            ann.remove(stale_path)
+        
+        self.ann = ann
+    
+    def search(self, query_vector, limit: int = 10, exclude: Optional[str] = None,
+               min_score: float = 0.1, exact: bool = False) -> List[Tuple[str, float]]:
+        """Top-k 相似度搜索 (點積 + argpartition)
+        
+        掛載了 ANN 索引且向量數量足夠時，只對 LSH 候選集重新排序。
+        """
+        
+        count = len(self.paths)
+        if count == 0 or limit <= 0 or len(query_vector) != self.dimension:
+            return []
+        
+        if not exact and self.ann is not None and count >= self.ann_min_vectors:
+            candidates = self.ann.candidates(query_vector)
+            candidates.discard(exclude)
+            if len(candidates) >= limit:
+                return self.rerank(query_vector, candidates, limit, min_score)
+        
+        exclude_row = self.path_to_row.get(exclude) if exclude else None
+        
+        if not NUMPY_AVAILABLE:
+            scored = (
+                (sum(a * b for a, b in zip(query_vector, vector)), row)
+                for row, vector in enumerate(self.rows) if row != exclude_row
+            )
+            top = heapq.nlargest(limit, scored)
+            return [(self.paths[row], score) for score, row in top if score > min_score]
+        
+        scores = self.matrix[:count] @ np.asarray(query_vector, dtype=np.float32)
+        if exclude_row is not None:
+            scores[exclude_row] = -np.inf
+        
+        k = min(limit, count)
+        top_rows = np.argpartition(-scores, k - 1)[:k]
+        top_rows = top_rows[np.argsort(-scores[top_rows])]
+        
+        return [
+            (self.paths[row], float(scores[row]))
+            for row in top_rows if scores[row] > min_score
+        ]
+    
+    def rerank(self, query_vector, candidates: Set[str], limit: int,
+               min_score: float) -> List[Tuple[str, float]]:
+        """對候選集計算精確相似度並取 top-k"""
+        
+        rows = np.fromiter((self.path_to_row[path] for path in candidates), dtype=np.int64)
+        scores = self.matrix[rows] @ np.asarray(query_vector, dtype=np.float32)
+        
+        k = min(limit, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        
+        return [
+            (self.paths[rows[i]], float(scores[i]))
+            for i in top if scores[i] > min_score
+        ]
+
 class SimpleVectorDatabase:
     """簡化版向量數據庫 (不依賴外部庫)"""
     
-    def __init__(self, db_path: str = "augment_vectors.db"):
+    def __init__(self, db_path: str = "augment_vectors.db", use_ann: bool = False,
+                 ann_tables: int = 8, ann_bits: int = 12, ann_probes: int = 4):
         self.db_path = db_path
         self.init_database()
         self.vector_cache = {}  # 記憶體緩存
+        self.vector_index: Optional[VectorIndex] = None  # 首次相似度查詢時載入
+        
+        # 近似最近鄰索引配置 (保存在數據庫旁邊)
+        if use_ann and not NUMPY_AVAILABLE:
+            logger.warning("numpy 不可用，停用近似最近鄰索引")
+            use_ann = False
+        self.use_ann = use_ann
+        self.ann_config = {'num_tables': ann_tables, 'num_bits': ann_bits, 'probes': ann_probes}
+        self.ann_index_path = f"{db_path}.lsh.npz"
         
     def init_database(self):
         """初始化向量數據庫"""
@@ -39,7 +382,7 @@ class SimpleVectorDatabase:
                 file_path TEXT NOT NULL,
                 content_hash TEXT NOT NULL,
                 content_text TEXT NOT NULL,
-                vector_data TEXT NOT NULL,
+                vector_data BLOB NOT NULL,
                 metadata TEXT,
                 created_at TEXT,
                 updated_at TEXT
@@ -54,7 +397,8 @@ class SimpleVectorDatabase:
                 file_path TEXT NOT NULL,
                 relevance_score REAL DEFAULT 1.0,
                 context TEXT,
-                created_at TEXT
+                created_at TEXT,
+                term_frequency INTEGER DEFAULT 1
             )
         ''')
         
@@ -70,18 +414,167 @@ class SimpleVectorDatabase:
             )
         ''')
         
+        # 詞彙表 (倒排索引的詞典)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS semantic_terms (
+                term TEXT PRIMARY KEY,
+                doc_freq INTEGER DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        
+        # BM25 文檔長度
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS document_stats (
+                file_path TEXT PRIMARY KEY,
+                doc_length INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        
+        # BM25 全局統計 (document_count, total_length)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS index_stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        
+        # 三元組到詞彙的映射 (子字串查找)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS term_trigrams (
+                trigram TEXT NOT NULL,
+                term TEXT NOT NULL,
+                PRIMARY KEY (trigram, term)
+            ) WITHOUT ROWID
+        ''')
+        
+        # 索引清單 (上次索引時的檔案狀態，用於增量重新索引)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS index_manifest (
+                file_path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        
         # 創建索引
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_vectors_file ON code_vectors(file_path)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_semantic_term ON semantic_index(term)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_semantic_file ON semantic_index(file_path)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_similarity_source ON code_similarity(source_file)')
         
         conn.commit()
         conn.close()
         
+        self.migrate_database()
+        
         logger.info("🔍 向量數據庫初始化完成")
     
-    def simple_text_to_vector(self, text: str, vector_size: int = 128) -> List[float]:
-        """簡單的文本向量化 (基於字符頻率和 n-gram)"""
+    def migrate_database(self):
+        """一次性遷移舊數據庫到當前結構版本"""
+        
+        conn = self.connect()
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version >= VECTOR_SCHEMA_VERSION:
+                return
+            
+            # 版本 1: JSON 文本向量轉換為 float32 BLOB
+            if version < 1:
+                rows = conn.execute(
+                    "SELECT id, vector_data FROM code_vectors WHERE typeof(vector_data) = 'text'"
+                ).fetchall()
+                
+                with conn:
+                    conn.executemany(
+                        'UPDATE code_vectors SET vector_data = ? WHERE id = ?',
+                        [(pack_vector(json.loads(vector_data)), vector_id) for vector_id, vector_data in rows]
+                    )
+                    conn.execute('PRAGMA user_version = 1')
+                
+                if rows:
+                    conn.execute('VACUUM')
+                    logger.info(f"🔄 已將 {len(rows)} 個向量遷移為 float32 二進制格式")
+            
+            # 版本 2: 正規化詞彙並建立詞彙表和三元組索引
+            if version < 2:
+                with conn:
+                    conn.execute('UPDATE semantic_index SET term = lower(term) WHERE term != lower(term)')
+                    terms = [row[0] for row in conn.execute('SELECT DISTINCT term FROM semantic_index')]
+                    self.register_terms(conn, terms)
+                    conn.execute('PRAGMA user_version = 2')
+                
+                if terms:
+                    logger.info(f"🔄 已為 {len(terms)} 個詞彙建立倒排索引")
+            
+            # 版本 3: 補充 BM25 統計 (舊數據的詞頻由相關性分數估算)
+            if version < 3:
+                with conn:
+                    columns = {row[1] for row in conn.execute('PRAGMA table_info(semantic_index)')}
+                    if 'term_frequency' not in columns:
+                        conn.execute('ALTER TABLE semantic_index ADD COLUMN term_frequency INTEGER DEFAULT 1')
+                    columns = {row[1] for row in conn.execute('PRAGMA table_info(semantic_terms)')}
+                    if 'doc_freq' not in columns:
+                        conn.execute('ALTER TABLE semantic_terms ADD COLUMN doc_freq INTEGER DEFAULT 0')
+                    
+                    conn.execute('''
+                        UPDATE semantic_index
+                        SET term_frequency = MAX(1, CAST(ROUND(relevance_score * 10) AS INTEGER))
+                    ''')
+                    conn.execute('''
+                        UPDATE semantic_terms SET doc_freq = (
+                            SELECT COUNT(DISTINCT file_path) FROM semantic_index
+                            WHERE semantic_index.term = semantic_terms.term
+                        )
+                    ''')
+                    conn.execute('''
+                        INSERT OR REPLACE INTO document_stats (file_path, doc_length)
+                        SELECT file_path, SUM(term_frequency) FROM semantic_index GROUP BY file_path
+                    ''')
+                    conn.execute('DELETE FROM index_stats')
+                    conn.execute('''
+                        INSERT INTO index_stats (key, value)
+                        SELECT 'document_count', COUNT(*) FROM document_stats
+                        UNION ALL
+                        SELECT 'total_length', COALESCE(SUM(doc_length), 0) FROM document_stats
+                    ''')
+                    conn.execute('PRAGMA user_version = 3')
+        finally:
+            conn.close()
+    
+    def register_terms(self, conn: sqlite3.Connection, terms: Iterable[str]):
+        """把新詞彙加入詞彙表和三元組索引"""
+        
+        terms = list(set(terms))
+        existing = set()
+        for i in range(0, len(terms), SQLITE_MAX_PARAMS):
+            chunk = terms[i:i + SQLITE_MAX_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            existing.update(row[0] for row in conn.execute(
+                f'SELECT term FROM semantic_terms WHERE term IN ({placeholders})', chunk))
+        
+        new_terms = [term for term in terms if term not in existing]
+        if not new_terms:
+            return
+        
+        conn.executemany('INSERT OR IGNORE INTO semantic_terms (term) VALUES (?)',
+                         [(term,) for term in new_terms])
+        conn.executemany('INSERT OR IGNORE INTO term_trigrams (trigram, term) VALUES (?, ?)',
+                         [(trigram, term) for term in new_terms for trigram in term_trigrams(term)])
+    
+    def connect(self) -> sqlite3.Connection:
+        """創建寫入用連接 (WAL 日誌，減少 fsync)"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+    
+    @staticmethod
+    def simple_text_to_vector(text: str, vector_size: int = 128) -> List[float]:
+        """簡單的文本向量化 (基於字符頻率和 n-gram)
+        
+        使用 crc32 而不是內建 hash()，確保不同進程和不同次執行得到相同的向量。
+        """
         
         # 清理文本
         text = re.sub(r'[^\w\s]', ' ', text.lower())
@@ -92,13 +585,13 @@ class SimpleVectorDatabase:
         
         # 基於單詞哈希的向量化
         for i, word in enumerate(words[:vector_size//2]):
-            hash_val = hash(word) % vector_size
+            hash_val = zlib.crc32(word.encode()) % vector_size
             vector[hash_val] += 1.0
         
         # 基於 2-gram 的向量化
         for i in range(len(words) - 1):
             bigram = f"{words[i]}_{words[i+1]}"
-            hash_val = hash(bigram) % vector_size
+            hash_val = zlib.crc32(bigram.encode()) % vector_size
             vector[hash_val] += 0.5
         
         # 基於代碼特徵的向量化
@@ -130,105 +623,272 @@ class SimpleVectorDatabase:
     def add_code_vector(self, file_path: str, content: str, metadata: Dict[str, Any] = None):
         """添加代碼向量"""
         
-        if metadata is None:
-            metadata = {}
-        
-        # 生成向量
-        vector = self.simple_text_to_vector(content)
-        content_hash = hashlib.md5(content.encode()).hexdigest()
-        vector_id = hashlib.md5(f"{file_path}{content_hash}".encode()).hexdigest()
+        record = prepare_code_vector((file_path, content, metadata))
+        self.write_vector_records([record])
         
-        # 存儲到數據庫
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        logger.info(f"📊 添加代碼向量: {file_path}")
+        return record[0]
+    
+    def add_code_vectors_bulk(self, files: Iterable[Tuple], batch_size: int = 500,
+                              max_workers: Optional[int] = None) -> int:
+        """批量添加代碼向量
         
-        now = datetime.now().isoformat()
+        files 為 (file_path, content) 或 (file_path, content, metadata) 的可迭代對象。
+        向量和關鍵詞在進程池中計算，每批在一個交易中用 executemany 寫入。
+        """
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO code_vectors 
-            (id, file_path, content_hash, content_text, vector_data, metadata, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            vector_id, file_path, content_hash, content[:1000],  # 只存前1000字符
-            json.dumps(vector), json.dumps(metadata), now, now
-        ))
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
         
-        conn.commit()
-        conn.close()
+        total = 0
+        iterator = iter(files)
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
         
-        # 緩存向量
-        self.vector_cache[vector_id] = vector
+        try:
+            while True:
+                batch = list(itertools.islice(iterator, batch_size))
+                if not batch:
+                    break
+                
+                if pool:
+                    chunksize = max(1, len(batch) // (max_workers * 4))
+                    records = list(pool.map(prepare_code_vector, batch, chunksize=chunksize))
+                else:
+                    records = [prepare_code_vector(item) for item in batch]
+                
+                self.write_vector_records(records)
+                total += len(records)
+                logger.info(f"📊 已批量添加 {total} 個代碼向量...")
+        finally:
+            if pool:
+                pool.shutdown()
         
-        # 建立語義索引
-        self.build_semantic_index(file_path, content)
+        self.save_ann_index()
         
-        logger.info(f"📊 添加代碼向量: {file_path}")
-        return vector_id
+        return total
     
-    def build_semantic_index(self, file_path: str, content: str):
-        """建立語義索引"""
+    def write_vector_records(self, records: List[Tuple]):
+        """在一個交易中寫入向量記錄和語義索引"""
         
-        # 提取關鍵詞
-        keywords = self.extract_keywords(content)
+        # 同一批中重複的路徑以最後一個為準
+        records = list({record[1]: record for record in records}.values())
+        now = datetime.now().isoformat()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        vector_rows = [
+            (vector_id, file_path, content_hash, content_text,
+             pack_vector(vector), json.dumps(metadata), now, now)
+            for vector_id, file_path, content_hash, content_text, vector, metadata, _, _ in records
+        ]
         
-        now = datetime.now().isoformat()
+        conn = self.connect()
+        try:
+            with conn:
+                # 檔案內容變化後舊版本的向量不再保留
+                conn.executemany('DELETE FROM code_vectors WHERE file_path = ? AND id != ?',
+                                 [(record[1], record[0]) for record in records])
+                conn.executemany('''
+                    INSERT OR REPLACE INTO code_vectors 
+                    (id, file_path, content_hash, content_text, vector_data, metadata, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', vector_rows)
+                
+                self.replace_postings(conn, [(record[1], record[7], record[6]) for record in records], now)
+        finally:
+            conn.close()
+        
+        # 緩存向量並增量更新索引
+        for record in records:
+            self.vector_cache[record[0]] = record[4]
+            if self.vector_index is not None:
+                self.vector_index.add(record[1], record[4])
+    
+    def replace_postings(self, conn: sqlite3.Connection, documents: List[Tuple], now: str):
+        """替換檔案的倒排列表並增量維護 BM25 統計
+        
+        documents 為 (file_path, doc_length, [(term, score, term_frequency, context)]) 列表。
+        """
+        
+        paths = [file_path for file_path, _, _ in documents]
+        replaced_documents, replaced_length = self.remove_postings(conn, paths)
+        
+        conn.executemany('''
+            INSERT INTO semantic_index (term, file_path, relevance_score, term_frequency, context, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (term, file_path, score, term_frequency, context, now)
+            for file_path, _, keywords in documents
+            for term, score, term_frequency, context in keywords
+        ])
+        
+        new_doc_freq = Counter(term for _, _, keywords in documents for term, _, _, _ in keywords)
+        self.register_terms(conn, new_doc_freq)
+        conn.executemany('UPDATE semantic_terms SET doc_freq = doc_freq + ? WHERE term = ?',
+                         [(count, term) for term, count in new_doc_freq.items()])
+        
+        conn.executemany('INSERT OR REPLACE INTO document_stats (file_path, doc_length) VALUES (?, ?)',
+                         [(file_path, doc_length) for file_path, doc_length, _ in documents])
+        
+        self.bump_index_stat(conn, 'document_count', len(documents) - replaced_documents)
+        self.bump_index_stat(conn, 'total_length',
+                             sum(doc_length for _, doc_length, _ in documents) - replaced_length)
+    
+    def remove_postings(self, conn: sqlite3.Connection, paths: List[str]) -> Tuple[int, int]:
+        """刪除檔案的倒排列表並扣除詞彙的文檔頻率
+        
+        返回被刪除的 (文檔數, 文檔總長度)，由調用方更新全局統計。
+        """
+        
+        old_doc_freq = Counter()
+        replaced_documents = 0
+        replaced_length = 0
+        for i in range(0, len(paths), SQLITE_MAX_PARAMS):
+            chunk = paths[i:i + SQLITE_MAX_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            for term, count in conn.execute(f'''
+                SELECT term, COUNT(DISTINCT file_path) FROM semantic_index
+                WHERE file_path IN ({placeholders}) GROUP BY term
+            ''', chunk):
+                old_doc_freq[term] += count
+            for (doc_length,) in conn.execute(
+                    f'SELECT doc_length FROM document_stats WHERE file_path IN ({placeholders})', chunk):
+                replaced_documents += 1
+                replaced_length += doc_length
+        
+        conn.executemany('UPDATE semantic_terms SET doc_freq = doc_freq - ? WHERE term = ?',
+                         [(count, term) for term, count in old_doc_freq.items()])
+        
+        path_rows = [(path,) for path in paths]
+        conn.executemany('DELETE FROM semantic_index WHERE file_path = ?', path_rows)
+        conn.executemany('DELETE FROM document_stats WHERE file_path = ?', path_rows)
+        
+        return replaced_documents, replaced_length
+    
+    def remove_files(self, paths: List[str]) -> int:
+        """從向量表、倒排索引和索引清單中移除檔案 (已刪除的檔案)"""
         
-        # 清除舊索引
-        cursor.execute('DELETE FROM semantic_index WHERE file_path = ?', (file_path,))
+        if not paths:
+            return 0
         
-        # 添加新索引
-        for keyword, score in keywords.items():
-            cursor.execute('''
-                INSERT INTO semantic_index (term, file_path, relevance_score, context, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (keyword, file_path, score, self.get_keyword_context(content, keyword), now))
+        conn = self.connect()
+        try:
+            with conn:
+                removed_documents, removed_length = self.remove_postings(conn, paths)
+                self.bump_index_stat(conn, 'document_count', -removed_documents)
+                self.bump_index_stat(conn, 'total_length', -removed_length)
+                
+                vector_ids = []
+                for i in range(0, len(paths), SQLITE_MAX_PARAMS):
+                    chunk = paths[i:i + SQLITE_MAX_PARAMS]
+                    placeholders = ','.join('?' * len(chunk))
+                    vector_ids.extend(row[0] for row in conn.execute(
+                        f'SELECT id FROM code_vectors WHERE file_path IN ({placeholders})', chunk))
+                
+                path_rows = [(path,) for path in paths]
+                conn.executemany('DELETE FROM code_vectors WHERE file_path = ?', path_rows)
+                conn.executemany('DELETE FROM index_manifest WHERE file_path = ?', path_rows)
+        finally:
+            conn.close()
+        
+        for vector_id in vector_ids:
+            self.vector_cache.pop(vector_id, None)
+        if self.vector_index is not None:
+            for path in paths:
+                self.vector_index.remove(path)
+            self.save_ann_index()
+        
+        logger.info(f"🗑️ 已移除 {len(paths)} 個已刪除檔案的索引")
+        return len(paths)
+    
+    def load_manifest(self) -> FileDigestCache:
+        """載入索引清單 (上次索引時每個檔案的大小、修改時間和內容摘要)"""
         
-        conn.commit()
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute('SELECT file_path, size, mtime_ns, content_hash FROM index_manifest').fetchall()
         conn.close()
+        
+        return FileDigestCache(rows)
     
-    def extract_keywords(self, content: str) -> Dict[str, float]:
-        """提取關鍵詞和相關性分數"""
+    def save_manifest(self, rows: List[Tuple[str, int, int, str]]):
+        """寫入索引清單的新增或變更行"""
         
-        keywords = {}
+        if not rows:
+            return
         
-        # 編程關鍵詞
-        programming_keywords = [
-            'function', 'class', 'interface', 'type', 'const', 'let', 'var',
-            'import', 'export', 'default', 'async', 'await', 'promise',
-            'react', 'component', 'hook', 'state', 'props', 'jsx', 'tsx',
-            'typescript', 'javascript', 'node', 'express', 'api', 'database',
-            'test', 'jest', 'playwright', 'cypress', 'mock', 'spec'
-        ]
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO index_manifest (file_path, size, mtime_ns, content_hash)
+                    VALUES (?, ?, ?, ?)
+                ''', rows)
+        finally:
+            conn.close()
+    
+    def bump_index_stat(self, conn: sqlite3.Connection, key: str, delta: int):
+        """增量更新全局統計"""
+        conn.execute('''
+            INSERT INTO index_stats (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = value + excluded.value
+        ''', (key, delta))
+    
+    def build_semantic_index(self, file_path: str, content: str):
+        """建立語義索引"""
+        
+        conn = self.connect()
+        try:
+            with conn:
+                self.replace_postings(conn, [prepare_postings(file_path, content)],
+                                      datetime.now().isoformat())
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def extract_term_frequencies(content: str) -> Tuple[Dict[str, int], int]:
+        """提取詞頻和文檔長度 (標識符數量)"""
         
+        frequencies = {}
         content_lower = content.lower()
         
-        for keyword in programming_keywords:
+        for keyword in PROGRAMMING_KEYWORDS:
             count = content_lower.count(keyword)
             if count > 0:
-                # 計算相關性分數 (基於頻率和位置)
-                score = min(count / 10.0, 1.0)  # 最大分數為 1.0
-                keywords[keyword] = score
+                frequencies[keyword] = count
         
         # 提取自定義標識符
         identifiers = re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', content)
         identifier_counts = {}
         
         for identifier in identifiers:
-            if len(identifier) > 2 and identifier not in programming_keywords:
+            identifier = identifier.lower()
+            if len(identifier) > 2 and identifier not in PROGRAMMING_KEYWORDS:
                 identifier_counts[identifier] = identifier_counts.get(identifier, 0) + 1
         
-        # 添加高頻標識符
+        # 添加高頻標識符 (出現3次以上)
         for identifier, count in identifier_counts.items():
-            if count >= 3:  # 出現3次以上的標識符
-                score = min(count / 20.0, 0.8)  # 自定義標識符最大分數為 0.8
-                keywords[identifier] = score
+            if count >= 3:
+                frequencies[identifier] = count
         
-        return keywords
+        return frequencies, len(identifiers)
     
-    def get_keyword_context(self, content: str, keyword: str) -> str:
+    @staticmethod
+    def extract_keywords(content: str) -> Dict[str, float]:
+        """提取關鍵詞和相關性分數 (詞彙統一為小寫)"""
+        
+        frequencies, _ = SimpleVectorDatabase.extract_term_frequencies(content)
+        return {
+            term: SimpleVectorDatabase.relevance_score(term, count)
+            for term, count in frequencies.items()
+        }
+    
+    @staticmethod
+    def relevance_score(term: str, count: int) -> float:
+        """原始相關性分數: 編程關鍵詞最大 1.0，自定義標識符最大 0.8"""
+        if term in PROGRAMMING_KEYWORDS:
+            return min(count / 10.0, 1.0)
+        return min(count / 20.0, 0.8)
+    
+    @staticmethod
+    def get_keyword_context(content: str, keyword: str) -> str:
         """獲取關鍵詞上下文"""
         
         lines = content.split('\n')
@@ -242,29 +902,78 @@ class SimpleVectorDatabase:
         
         return ' | '.join(context_lines)
     
-    def semantic_search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
-        """語義搜索"""
+    def lookup_terms(self, conn: sqlite3.Connection, word: str, mode: str = 'substring') -> List[str]:
+        """在詞彙表中查找匹配的詞彙
+        
+        mode: 'exact' 精確匹配，'prefix' 前綴範圍掃描，'substring' 三元組交集後驗證。
+        少於 3 個字符的詞無法用三元組，子字串模式退回前綴查找。
+        """
+        
+        word = word.lower()
         
-        query_lower = query.lower()
-        query_keywords = query_lower.split()
+        if mode == 'exact':
+            row = conn.execute('SELECT term FROM semantic_terms WHERE term = ?', (word,)).fetchone()
+            return [row[0]] if row else []
+        
+        if mode == 'prefix' or len(word) < 3:
+            return [row[0] for row in conn.execute(
+                'SELECT term FROM semantic_terms WHERE term >= ? AND term < ?',
+                (word, word + '\U0010ffff'))]
+        
+        trigrams = sorted(term_trigrams(word))
+        placeholders = ','.join('?' * len(trigrams))
+        candidates = conn.execute(f'''
+            SELECT term FROM term_trigrams
+            WHERE trigram IN ({placeholders})
+            GROUP BY term HAVING COUNT(*) = ?
+        ''', (*trigrams, len(trigrams)))
+        
+        return [row[0] for row in candidates if word in row[0]]
+    
+    def semantic_search(self, query: str, limit: int = 20, mode: str = 'substring') -> List[Dict[str, Any]]:
+        """語義搜索 (倒排索引查找，一次合併所有詞彙的倒排列表，BM25 排序)"""
+        
+        query_keywords = query.lower().split()
         
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        # 搜索匹配的關鍵詞
+        # 查詢詞展開為索引中的詞彙
+        term_to_keywords = defaultdict(list)
+        for keyword in query_keywords:
+            for term in self.lookup_terms(conn, keyword, mode):
+                term_to_keywords[term].append(keyword)
+        
+        # BM25 全局統計
+        stats = dict(cursor.execute('SELECT key, value FROM index_stats'))
+        document_count = stats.get('document_count', 0)
+        avg_doc_length = stats.get('total_length', 0) / document_count if document_count else 1.0
+        
+        # 合併倒排列表
         results = {}
+        terms = list(term_to_keywords)
         
-        for keyword in query_keywords:
-            cursor.execute('''
-                SELECT file_path, relevance_score, context
-                FROM semantic_index 
-                WHERE term LIKE ? 
-                ORDER BY relevance_score DESC
-            ''', (f'%{keyword}%',))
+        for i in range(0, len(terms), SQLITE_MAX_PARAMS):
+            chunk = terms[i:i + SQLITE_MAX_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            
+            idf = {}
+            for term, doc_freq in cursor.execute(
+                    f'SELECT term, doc_freq FROM semantic_terms WHERE term IN ({placeholders})', chunk):
+                idf[term] = math.log(1 + (document_count - doc_freq + 0.5) / (doc_freq + 0.5))
             
-            rows = cursor.fetchall()
+            cursor.execute(f'''
+                SELECT s.term, s.file_path, s.term_frequency, s.context, d.doc_length
+                FROM semantic_index s
+                LEFT JOIN document_stats d ON d.file_path = s.file_path
+                WHERE s.term IN ({placeholders})
+            ''', chunk)
             
-            for file_path, score, context in rows:
+            for term, file_path, term_frequency, context, doc_length in cursor:
+                length_norm = 1 - BM25_B + BM25_B * (doc_length or avg_doc_length) / (avg_doc_length or 1.0)
+                score = idf.get(term, 0.0) * term_frequency * (BM25_K1 + 1) / (
+                    term_frequency + BM25_K1 * length_norm)
+                
                 if file_path not in results:
                     results[file_path] = {
                         'file_path': file_path,
@@ -273,55 +982,132 @@ class SimpleVectorDatabase:
                         'contexts': []
                     }
                 
-                results[file_path]['total_score'] += score
-                results[file_path]['matched_terms'].append(keyword)
-                results[file_path]['contexts'].append(context)
+                for keyword in term_to_keywords[term]:
+                    results[file_path]['total_score'] += score
+                    results[file_path]['matched_terms'].append(keyword)
+                    results[file_path]['contexts'].append(context)
         
         conn.close()
         
-        # 排序結果
-        sorted_results = sorted(results.values(), key=lambda x: x['total_score'], reverse=True)
+        # 用堆取 top-k，不對所有匹配檔案排序
+        return heapq.nlargest(limit, results.values(), key=lambda x: x['total_score'])
+    
+    def get_vector_index(self) -> VectorIndex:
+        """獲取記憶體向量索引 (首次調用時從數據庫載入)"""
+        
+        if self.vector_index is None:
+            index = VectorIndex()
+            
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            # 同一路徑有多個版本時，以最後更新的為準
+            cursor.execute('SELECT file_path, vector_data FROM code_vectors ORDER BY updated_at')
+            for file_path, vector_data in cursor:
+                try:
+                    index.add(file_path, unpack_vector(vector_data))
+                except:
+                    continue
+            
+            conn.close()
+            
+            if self.use_ann:
+                self.load_ann_index(index)
+            
+            self.vector_index = index
+            logger.info(f"🧮 向量索引載入完成: {len(index)} 個向量")
         
-        return sorted_results[:limit]
+        return self.vector_index
+    
+    def get_ann_stamp(self) -> str:
+        """數據庫內容標記，用於判斷保存的 ANN 索引是否過期"""
+        
+        conn = sqlite3.connect(self.db_path)
+        count, last_updated = conn.execute('SELECT COUNT(*), MAX(updated_at) FROM code_vectors').fetchone()
+        conn.close()
+        
+        return f"{count}:{last_updated}"
+    
+    def load_ann_index(self, index: VectorIndex):
+        """從磁碟載入 ANN 索引，過期時重新哈希並保存"""
+        
+        ann = LSHIndex(dimension=index.dimension, **self.ann_config)
+        stamp = self.get_ann_stamp()
+        
+        if os.path.exists(self.ann_index_path) and ann.load(self.ann_index_path, stamp):
+            index.attach_ann(ann)
+            logger.info(f"⚡ 載入 ANN 索引: {self.ann_index_path}")
+        else:
+            index.attach_ann(ann)
+            ann.save(self.ann_index_path, stamp)
+            logger.info(f"⚡ 重建 ANN 索引: {len(ann)} 個向量")
+    
+    def save_ann_index(self):
+        """保存當前 ANN 索引到磁碟"""
+        
+        if self.vector_index is not None and self.vector_index.ann is not None:
+            self.vector_index.ann.save(self.ann_index_path, self.get_ann_stamp())
     
     def find_similar_code(self, file_path: str, limit: int = 10) -> List[Dict[str, Any]]:
         """找到相似的代碼"""
         
+        index = self.get_vector_index()
+        
         # 獲取目標檔案的向量
-        target_vector = self.get_file_vector(file_path)
+        target_vector = index.get(file_path) or self.get_file_vector(file_path)
         if not target_vector:
             return []
         
-        # 獲取所有其他向量
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # 只返回相似度 > 0.1 的結果
+        return [
+            {'file_path': other_file, 'similarity': similarity}
+            for other_file, similarity in index.search(target_vector, limit, exclude=file_path)
+        ]
+    
+    def benchmark_ann(self, k: int = 10, sample_size: int = 100) -> Dict[str, Any]:
+        """比較 ANN 與精確搜索的 recall@k 和延遲"""
         
-        cursor.execute('''
-            SELECT file_path, vector_data FROM code_vectors 
-            WHERE file_path != ?
-        ''', (file_path,))
+        index = self.get_vector_index()
+        if index.ann is None:
+            return {'error': 'ANN 索引未啟用 (需要 use_ann=True 和 numpy)'}
         
-        rows = cursor.fetchall()
-        conn.close()
+        sample = random.sample(index.paths, min(sample_size, len(index.paths)))
         
-        similarities = []
+        # 基準測試時不限制最小向量數量
+        ann_min_vectors = index.ann_min_vectors
+        index.ann_min_vectors = 0
         
-        for other_file, vector_data in rows:
-            try:
-                other_vector = json.loads(vector_data)
-                similarity = self.cosine_similarity(target_vector, other_vector)
+        exact_time = 0.0
+        ann_time = 0.0
+        recalls = []
+        
+        try:
+            for file_path in sample:
+                query = index.matrix[index.path_to_row[file_path]]
                 
-                if similarity > 0.1:  # 只返回相似度 > 0.1 的結果
-                    similarities.append({
-                        'file_path': other_file,
-                        'similarity': similarity
-                    })
-            except:
-                continue
+                start = time.perf_counter()
+                exact = index.search(query, k, exclude=file_path, min_score=-1.0, exact=True)
+                exact_time += time.perf_counter() - start
+                
+                start = time.perf_counter()
+                approximate = index.search(query, k, exclude=file_path, min_score=-1.0)
+                ann_time += time.perf_counter() - start
+                
+                expected = {path for path, _ in exact}
+                if expected:
+                    recalls.append(len(expected & {path for path, _ in approximate}) / len(expected))
+        finally:
+            index.ann_min_vectors = ann_min_vectors
         
-        # 排序並返回
-        similarities.sort(key=lambda x: x['similarity'], reverse=True)
-        return similarities[:limit]
+        queries = max(len(sample), 1)
+        return {
+            'vectors': len(index),
+            'queries': len(sample),
+            f'recall@{k}': round(sum(recalls) / len(recalls), 4) if recalls else 0.0,
+            'exact_ms': round(exact_time / queries * 1000, 3),
+            'ann_ms': round(ann_time / queries * 1000, 3),
+            'ann_config': self.ann_config
+        }
     
     def get_file_vector(self, file_path: str) -> Optional[List[float]]:
         """獲取檔案向量"""
@@ -335,7 +1121,7 @@ class SimpleVectorDatabase:
         
         if row:
             try:
-                return json.loads(row[0])
+                return list(unpack_vector(row[0]))
             except:
                 pass
         
@@ -381,66 +1167,172 @@ class SimpleVectorDatabase:
             'database_path': self.db_path
         }
 
+def prepare_postings(file_path: str, content: str) -> Tuple[str, int, List[Tuple]]:
+    """計算檔案的倒排列表條目: (file_path, doc_length, [(term, score, tf, context)])"""
+    
+    frequencies, doc_length = SimpleVectorDatabase.extract_term_frequencies(content)
+    keywords = [
+        (term, SimpleVectorDatabase.relevance_score(term, count), count,
+         SimpleVectorDatabase.get_keyword_context(content, term))
+        for term, count in frequencies.items()
+    ]
+    return file_path, doc_length, keywords
+
+def prepare_code_vector(item: Tuple) -> Tuple:
+    """計算單個檔案的向量和關鍵詞 (可在工作進程中執行)"""
+    
+    file_path, content = item[0], item[1]
+    metadata = item[2] if len(item) > 2 and item[2] is not None else {}
+    
+    vector = SimpleVectorDatabase.simple_text_to_vector(content)
+    content_hash = hashlib.md5(content.encode()).hexdigest()
+    vector_id = hashlib.md5(f"{file_path}{content_hash}".encode()).hexdigest()
+    
+    _, doc_length, keywords = prepare_postings(file_path, content)
+    
+    # 只存前1000字符
+    return (vector_id, file_path, content_hash, content[:1000], vector, metadata, keywords, doc_length)
+
 class AugmentVectorEnhancer:
     """Augment 向量增強器"""
     
-    def __init__(self):
-        self.vector_db = SimpleVectorDatabase()
+    def __init__(self, use_ann: bool = False):
+        self.vector_db = SimpleVectorDatabase(use_ann=use_ann)
         self.indexed_files = set()
+        self.manifest: Optional[FileDigestCache] = None  # 索引清單，首次索引時載入
+        
+    def index_project_files(self, project_root: str = ".", incremental: bool = True):
+        """索引項目檔案
+        
+        增量模式下與索引清單比對 (stat 相同直接跳過，stat 變化時比對內容摘要)，
+        只重新索引新增或修改的檔案，並移除已刪除檔案的索引。
+        incremental=False 時重新索引所有檔案。
+        """
+        
+        manifest = self.get_manifest()
+        previous_digests = {file_path: entry[2] for file_path, entry in manifest.entries.items()}
+        
+        seen = set()
+        changed = []
+        # 一次遍歷匹配所有副檔名，排除目錄和 .gitignore 忽略的目錄不會進入
+        for path, entry in walk_files(project_root, extensions=INDEXED_EXTENSIONS):
+            file_path = Path(path)
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if not self.should_index_file(file_path, stat):
+                continue
+            
+            seen.add(path)
+            try:
+                digest = manifest.digest(path, stat)
+            except OSError as e:
+                logger.warning(f"讀取檔案失敗 {file_path}: {e}")
+                continue
+            
+            self.indexed_files.add(path)
+            if not incremental or digest != previous_digests.get(path):
+                changed.append(file_path)
         
-    def index_project_files(self, project_root: str = "."):
-        """索引項目檔案"""
+        # 清單中已不存在的檔案 (只處理確實已刪除的，其他根目錄的記錄保留)
+        removed = [path for path in previous_digests if path not in seen and not os.path.exists(path)]
+        indexed_count = self.apply_index_changes(manifest, changed, removed)
         
-        project_path = Path(project_root)
+        logger.info(f"✅ 項目索引完成，重新索引 {indexed_count} 個檔案，"
+                    f"{len(seen) - len(changed)} 個未變更，移除 {len(removed)} 個")
+        return indexed_count
+    
+    def update_files(self, changed_paths: Iterable[str], removed_paths: Iterable[str]) -> int:
+        """增量更新指定的檔案 (監聽模式的批次回調)"""
         
-        # 要索引的檔案類型
-        file_patterns = ["**/*.py", "**/*.js", "**/*.ts", "**/*.tsx", "**/*.jsx"]
+        manifest = self.get_manifest()
+        removed = [path for path in removed_paths if path in manifest.entries]
+        changed = []
+        
+        for path in changed_paths:
+            file_path = Path(path)
+            if self.detect_language(file_path) == 'unknown':
+                continue
+            try:
+                stat = file_path.stat()
+            except OSError:
+                if path in manifest.entries:
+                    removed.append(path)
+                continue
+            if not self.should_index_file(file_path, stat):
+                continue
+            
+            previous = manifest.entries.get(path)
+            try:
+                digest = manifest.digest(path, stat)
+            except OSError as e:
+                logger.warning(f"讀取檔案失敗 {file_path}: {e}")
+                continue
+            
+            self.indexed_files.add(path)
+            if previous is None or digest != previous[2]:
+                changed.append(file_path)
+        
+        return self.apply_index_changes(manifest, changed, removed)
+    
+    def get_manifest(self) -> FileDigestCache:
+        """獲取索引清單 (首次調用時從數據庫載入)"""
+        if self.manifest is None:
+            self.manifest = self.vector_db.load_manifest()
+        return self.manifest
+    
+    def apply_index_changes(self, manifest: FileDigestCache, changed: List[Path], removed: List[str]) -> int:
+        """移除已刪除檔案的索引、重新索引變更的檔案，然後寫入清單"""
+        
+        for path in removed:
+            manifest.forget(path)
+            self.indexed_files.discard(path)
+        self.vector_db.remove_files(removed)
+        
+        def iter_files():
+            for file_path in changed:
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                except Exception as e:
+                    logger.warning(f"索引檔案失敗 {file_path}: {e}")
+                    # 不記入清單，下次重新嘗試
+                    manifest.forget(str(file_path))
+                    self.indexed_files.discard(str(file_path))
+                    continue
+                
+                yield (
+                    str(file_path),
+                    content,
+                    {
+                        'language': self.detect_language(file_path),
+                        'size': len(content),
+                        'lines': len(content.split('\n'))
+                    }
+                )
         
         indexed_count = 0
+        if changed:
+            # 少量變更時進程池的啟動開銷大於收益
+            max_workers = 1 if len(changed) < 64 else None
+            indexed_count = self.vector_db.add_code_vectors_bulk(iter_files(), max_workers=max_workers)
+        
+        # 向量寫入後才更新清單，中途失敗時下次會重新索引
+        self.vector_db.save_manifest(manifest.take_dirty_rows())
         
-        for pattern in file_patterns:
-            for file_path in project_path.glob(pattern):
-                if self.should_index_file(file_path):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                        
-                        # 添加到向量數據庫
-                        self.vector_db.add_code_vector(
-                            str(file_path),
-                            content,
-                            {
-                                'language': self.detect_language(file_path),
-                                'size': len(content),
-                                'lines': len(content.split('\n'))
-                            }
-                        )
-                        
-                        self.indexed_files.add(str(file_path))
-                        indexed_count += 1
-                        
-                        if indexed_count % 10 == 0:
-                            logger.info(f"已索引 {indexed_count} 個檔案...")
-                            
-                    except Exception as e:
-                        logger.warning(f"索引檔案失敗 {file_path}: {e}")
-        
-        logger.info(f"✅ 項目索引完成，共索引 {indexed_count} 個檔案")
         return indexed_count
     
-    def should_index_file(self, file_path: Path) -> bool:
+    def should_index_file(self, file_path: Path, stat: Optional[os.stat_result] = None) -> bool:
         """判斷是否應該索引檔案"""
         
-        # 排除目錄
-        exclude_dirs = ['node_modules', '.git', 'dist', 'build', '.next', 'coverage']
-        
-        for exclude_dir in exclude_dirs:
-            if exclude_dir in str(file_path):
-                return False
+        # 排除目錄 (按目錄名匹配，避免誤排除 rebuild.ts 之類的檔案)
+        if any(part in DEFAULT_EXCLUDE_DIRS for part in file_path.parts[:-1]):
+            return False
         
         # 檔案大小限制 (最大 1MB)
         try:
-            if file_path.stat().st_size > 1024 * 1024:
+            if (stat or file_path.stat()).st_size > 1024 * 1024:
                 return False
         except:
             return False
@@ -466,13 +1358,14 @@ class AugmentVectorEnhancer:
         
         results = self.vector_db.semantic_search(query, limit)
         
-        # 增強結果信息
+        # 增強結果信息 (BM25 分數沒有上限，相關性以最高分為 100%)
         enhanced_results = []
+        top_score = results[0]['total_score'] if results else 0.0
         
         for result in results:
             enhanced_result = result.copy()
             enhanced_result['search_query'] = query
-            enhanced_result['relevance_percentage'] = min(100, int(result['total_score'] * 100))
+            enhanced_result['relevance_percentage'] = int(result['total_score'] / top_score * 100) if top_score > 0 else 0
             enhanced_results.append(enhanced_result)
         
         return enhanced_results
@@ -515,11 +1408,11 @@ def main():
     
     print("🔍 初始化 Augment 向量增強器...")
     
-    enhancer = AugmentVectorEnhancer()
+    enhancer = AugmentVectorEnhancer(use_ann='--ann' in sys.argv or '--benchmark-ann' in sys.argv)
     
     # 索引當前項目
     print("📊 開始索引項目檔案...")
-    indexed_count = enhancer.index_project_files()
+    indexed_count = enhancer.index_project_files(incremental='--full' not in sys.argv)
     
     # 測試搜索
     print("\n🔍 測試語義搜索...")
@@ -536,6 +1429,16 @@ def main():
     print(f"  向量數量: {stats['vector_database']['total_vectors']}")
     print(f"  索引詞彙: {stats['vector_database']['unique_terms']}")
     
+    # ANN 召回率基準測試
+    if '--benchmark-ann' in sys.argv:
+        benchmark = enhancer.vector_db.benchmark_ann()
+        print(f"\n⚡ ANN 基準測試: {benchmark}")
+    
+    # 監聽模式: 檔案變更後增量更新索引，搜索結果保持最新
+    if '--watch' in sys.argv:
+        print("\n👀 監聽項目檔案變更 (Ctrl+C 停止)...")
+        watch_project(".", enhancer.update_files, extensions=INDEXED_EXTENSIONS)
+    
     print("✅ 向量增強器測試完成！")
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+檔案內容摘要
+stat (大小 + 修改時間) 作為快速預檢，變化時才讀取內容計算摘要 (xxhash 或 blake2b over mmap)，
+內容相同的檔案在切換分支、重新檢出或換路徑後仍得到同一個緩存鍵
+"""
+
+import hashlib
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# 摘要帶算法前綴，換算法後舊摘要自然失效而不會誤命中
+DIGEST_ALGORITHM = "xxh3" if XXHASH_AVAILABLE else "b2"
+
+
+# 回退讀取時每次讀取的字節數
+READ_CHUNK_SIZE = 1 << 20
+
+
+def content_digest(path: Union[str, Path]) -> str:
+    """計算檔案內容摘要"""
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size > 0:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return _digest_bytes(mapped)
+            except ValueError:
+                # stat 之後檔案被清空 (正在重寫)，mmap 不接受空檔案，改為分塊讀取
+                pass
+        return _digest_stream(f)
+
+
+def _new_hasher():
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+def _digest_bytes(data) -> str:
+    hasher = _new_hasher()
+    hasher.update(data)
+    return f"{DIGEST_ALGORITHM}:{hasher.hexdigest()}"
+
+
+def _digest_stream(f) -> str:
+    hasher = _new_hasher()
+    for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+        hasher.update(chunk)
+    return f"{DIGEST_ALGORITHM}:{hasher.hexdigest()}"
+
+
+class FileDigestCache:
+    """記住每個路徑的 (size, mtime_ns) -> 摘要；stat 未變時不重新讀取內容"""
+
+    def __init__(self, rows: Optional[Iterable[Tuple[str, int, int, str]]] = None):
+        # file_path -> (size, mtime_ns, digest)
+        self.entries: Dict[str, Tuple[int, int, str]] = {}
+        # 新計算、尚未持久化的路徑
+        self.dirty: set = set()
+        self.stat_hits = 0
+        self.digests_computed = 0
+
+        if rows:
+            for file_path, size, mtime_ns, digest in rows:
+                if digest.startswith(f"{DIGEST_ALGORITHM}:"):
+                    self.entries[file_path] = (size, mtime_ns, digest)
+
+    def digest(self, path: Union[str, Path], stat: Optional[os.stat_result] = None) -> str:
+        """返回檔案內容摘要 (stat 命中時直接返回記住的值)"""
+
+        file_path = str(path)
+        if stat is None:
+            stat = os.stat(file_path)
+
+        entry = self.entries.get(file_path)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            self.stat_hits += 1
+            return entry[2]
+
+        digest = content_digest(file_path)
+        self.entries[file_path] = (stat.st_size, stat.st_mtime_ns, digest)
+        self.dirty.add(file_path)
+        self.digests_computed += 1
+        return digest
+
+    def forget(self, file_path: str):
+        """移除已刪除檔案的記錄"""
+        self.entries.pop(file_path, None)
+        self.dirty.discard(file_path)
+
+    def take_dirty_rows(self) -> List[Tuple[str, int, int, str]]:
+        """取出待持久化的行 (file_path, size, mtime_ns, digest)"""
+
+        rows = []
+        for file_path in self.dirty:
+            entry = self.entries.get(file_path)
+            if entry is not None:
+                rows.append((file_path, *entry))
+        self.dirty = set()
+        return rows
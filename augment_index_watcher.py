@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+項目檔案監聽
+watchdog (inotify / FSEvents / ReadDirectoryChangesW) 可用時使用事件通知，否則退回定時比對 stat。
+變更在安靜 debounce 秒後按小批次交給索引回調，保存檔案時的一連串事件只觸發一次更新。
+"""
+
+import os
+import time
+import threading
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from augment_tree_walker import DEFAULT_EXCLUDE_DIRS, GitignoreMatcher, walk_files
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 視為內容變更的 watchdog 事件類型
+WATCHDOG_CHANGE_EVENTS = {'created', 'modified', 'deleted', 'moved', 'closed'}
+
+# 回調參數: (變更或新增的路徑, 已刪除的路徑)
+ChangeHandler = Callable[[List[str], List[str]], object]
+
+
+class IndexWatcher:
+    """監聽項目目錄並把變更批次交給索引回調"""
+
+    def __init__(self, root: str, on_changes: ChangeHandler,
+                 extensions: Optional[Iterable[str]] = None,
+                 exclude_dirs: Optional[Iterable[str]] = None,
+                 debounce: float = 0.3, poll_interval: float = 0.5,
+                 batch_size: int = 64, use_watchdog: bool = True, use_gitignore: bool = True):
+        self.root = root
+        self.absolute_root = os.path.abspath(root)
+        self.on_changes = on_changes
+        self.extensions = {extension.lower() for extension in extensions} if extensions else None
+        self.exclude_dirs = set(exclude_dirs) if exclude_dirs is not None else set(DEFAULT_EXCLUDE_DIRS)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.use_watchdog = use_watchdog and WATCHDOG_AVAILABLE
+        self.use_gitignore = use_gitignore
+        self.gitignore = GitignoreMatcher(self.absolute_root) if use_gitignore else None
+
+        # 待處理的絕對路徑，最後一次事件之後安靜 debounce 秒才處理
+        self.pending: Set[str] = set()
+        self.last_event_time = 0.0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+        # 已索引檔案的快照: 路徑 -> (size, mtime_ns)
+        # 輪詢模式用它比對變更；事件模式用它找出整個目錄被移走或刪除時其下的檔案
+        self.snapshot: Dict[str, Tuple[int, int]] = {}
+
+        self.batches = 0
+        self.paths_dispatched = 0
+
+    @property
+    def mode(self) -> str:
+        return "watchdog" if self.use_watchdog else "polling"
+
+    def should_watch(self, path: str) -> bool:
+        """檔案類型和排除目錄過濾"""
+
+        if self.extensions is not None and os.path.splitext(path)[1].lower() not in self.extensions:
+            return False
+        parts = Path(os.path.relpath(path, self.absolute_root)).parts
+        if any(part in self.exclude_dirs for part in parts[:-1]):
+            return False
+        return self.gitignore is None or not self.gitignore.is_ignored('/'.join(parts))
+
+    def record(self, path: str):
+        """記錄一個變更路徑 (事件線程或輪詢調用)"""
+
+        path = os.path.abspath(path)
+        if not self.should_watch(path):
+            return
+        with self.lock:
+            self.pending.add(path)
+            self.last_event_time = time.monotonic()
+
+    def record_directory_removed(self, directory: str):
+        """目錄被刪除或移走: watchdog 只發送一個目錄事件，其下已索引的檔案逐個記錄為變更"""
+        
+        prefix = os.path.join(os.path.abspath(directory), '')
+        with self.lock:
+            paths = [path for path in self.snapshot if path.startswith(prefix)]
+        for path in paths:
+            self.record(path)
+    
+    def record_directory(self, directory: str):
+        """目錄被移入或創建: 重新掃描其下的檔案 (忽略規則由 should_watch 按項目根目錄判斷)"""
+        
+        directory = os.path.abspath(directory)
+        try:
+            inside = os.path.commonpath([directory, self.absolute_root]) == self.absolute_root
+        except ValueError:
+            inside = False  # 不同磁碟機
+        if not inside:
+            return
+        for path, _ in walk_files(directory, self.extensions, self.exclude_dirs, use_gitignore=False):
+            self.record(path)
+    
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """遍歷項目目錄收集檔案 stat (與索引器使用同一個遍歷器)"""
+
+        snapshot = {}
+        for path, entry in walk_files(self.absolute_root, self.extensions, self.exclude_dirs, self.use_gitignore):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def poll(self):
+        """比對快照，記錄新增、修改和刪除的檔案"""
+
+        snapshot = self.scan()
+        for path, state in snapshot.items():
+            if self.snapshot.get(path) != state:
+                self.record(path)
+        for path in self.snapshot.keys() - snapshot.keys():
+            self.record(path)
+        with self.lock:
+            self.snapshot = snapshot
+
+    def take_batch(self) -> List[str]:
+        """安靜期已過時取出一批待處理路徑"""
+
+        with self.lock:
+            if not self.pending or time.monotonic() - self.last_event_time < self.debounce:
+                return []
+            batch = sorted(self.pending)[:self.batch_size]
+            self.pending.difference_update(batch)
+            return batch
+
+    def index_path(self, path: str) -> str:
+        """絕對路徑轉換為與索引器一致的路徑 (相對於傳入的 root)"""
+        return str(Path(self.root) / os.path.relpath(path, self.absolute_root))
+
+    def dispatch(self, batch: List[str]):
+        """按檔案是否存在拆分為變更和刪除，交給索引回調"""
+
+        changed_paths = [path for path in batch if os.path.isfile(path)]
+        removed_paths = [path for path in batch if not os.path.exists(path)]
+        if not changed_paths and not removed_paths:
+            return
+        
+        # 事件模式下快照隨批次更新 (輪詢模式由 poll 整體替換)
+        with self.lock:
+            for path in changed_paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                self.snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+            for path in removed_paths:
+                self.snapshot.pop(path, None)
+        
+        changed = [self.index_path(path) for path in changed_paths]
+        removed = [self.index_path(path) for path in removed_paths]
+
+        start = time.perf_counter()
+        try:
+            self.on_changes(changed, removed)
+        except Exception as e:
+            logger.warning(f"索引更新失敗: {e}")
+            return
+
+        self.batches += 1
+        self.paths_dispatched += len(changed) + len(removed)
+        logger.info(f"🔄 已更新 {len(changed)} 個變更、{len(removed)} 個刪除的檔案 "
+                    f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    def run(self):
+        """監聽直到 stop() 被調用"""
+
+        # 兩種模式都需要初始快照 (事件模式用於處理目錄移走和刪除)
+        self.snapshot = self.scan()
+        
+        observer = None
+        if self.use_watchdog:
+            observer = Observer()
+            observer.schedule(WatchdogEventHandler(self), self.absolute_root, recursive=True)
+            observer.start()
+
+        logger.info(f"👀 開始監聽 {self.absolute_root} ({self.mode})")
+        next_poll = time.monotonic() + self.poll_interval
+
+        try:
+            while not self.stop_event.is_set():
+                if observer is None and time.monotonic() >= next_poll:
+                    self.poll()
+                    next_poll = time.monotonic() + self.poll_interval
+
+                batch = self.take_batch()
+                if batch:
+                    self.dispatch(batch)
+                    continue
+
+                self.stop_event.wait(min(self.debounce, self.poll_interval) / 3)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def get_statistics(self) -> Dict[str, object]:
+        with self.lock:
+            pending = len(self.pending)
+        return {
+            'mode': self.mode,
+            'batches': self.batches,
+            'paths_dispatched': self.paths_dispatched,
+            'pending': pending
+        }
+
+
+if WATCHDOG_AVAILABLE:
+    class WatchdogEventHandler(FileSystemEventHandler):
+        """把 watchdog 事件轉交給 IndexWatcher"""
+
+        def __init__(self, watcher: IndexWatcher):
+            super().__init__()
+            self.watcher = watcher
+
+        def on_any_event(self, event):
+            # 索引器讀取檔案產生的 opened / closed_no_write 事件不算變更
+            if event.event_type not in WATCHDOG_CHANGE_EVENTS:
+                return
+            if event.is_directory:
+                self.on_directory_event(event)
+                return
+            self.watcher.record(event.src_path)
+            # 移動事件: 原路徑視為刪除，目標路徑視為新增
+            dest_path = getattr(event, 'dest_path', None)
+            if dest_path:
+                self.watcher.record(dest_path)
+        
+        def on_directory_event(self, event):
+            # 整個目錄被移走或刪除時不會有逐個檔案的事件
+            if event.event_type in ('deleted', 'moved'):
+                self.watcher.record_directory_removed(event.src_path)
+            if event.event_type == 'moved' and getattr(event, 'dest_path', None):
+                self.watcher.record_directory(event.dest_path)
+            elif event.event_type == 'created':
+                # 從項目外移入的目錄只產生一個創建事件
+                self.watcher.record_directory(event.src_path)
+
+
+def watch_project(root: str, on_changes: ChangeHandler, **kwargs) -> IndexWatcher:
+    """在前台監聽項目直到 Ctrl+C"""
+
+    watcher = IndexWatcher(root, on_changes, **kwargs)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    logger.info(f"👋 停止監聽: {watcher.get_statistics()}")
+    return watcher
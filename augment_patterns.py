@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+分析器共用的正則表
+所有靜態模式在導入時編譯一次並按名稱登記，每個模式記錄調用次數、命中次數和匹配耗時，
+用於找出主導 analyze_file_deep 耗時的正則並集中調整
+"""
+
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class TimedPattern:
+    """預編譯正則的包裝，接口與 re.Pattern 的常用方法一致"""
+
+    __slots__ = ('name', 'regex', 'registry', 'calls', 'hits', 'seconds')
+
+    def __init__(self, name: str, regex: 're.Pattern', registry: 'PatternRegistry'):
+        self.name = name
+        self.regex = regex
+        self.registry = registry
+        self.calls = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+    @property
+    def pattern(self) -> str:
+        return self.regex.pattern
+
+    def record(self, start: float, hits: int):
+        self.calls += 1
+        self.hits += hits
+        self.seconds += time.perf_counter() - start
+
+    def search(self, string: str, *args) -> Optional['re.Match']:
+        if not self.registry.timing:
+            return self.regex.search(string, *args)
+        start = time.perf_counter()
+        match = self.regex.search(string, *args)
+        self.record(start, match is not None)
+        return match
+
+    def match(self, string: str, *args) -> Optional['re.Match']:
+        if not self.registry.timing:
+            return self.regex.match(string, *args)
+        start = time.perf_counter()
+        match = self.regex.match(string, *args)
+        self.record(start, match is not None)
+        return match
+
+    def findall(self, string: str, *args) -> List[Any]:
+        if not self.registry.timing:
+            return self.regex.findall(string, *args)
+        start = time.perf_counter()
+        matches = self.regex.findall(string, *args)
+        self.record(start, len(matches))
+        return matches
+
+    def finditer(self, string: str, *args) -> Iterator['re.Match']:
+        # 計時時一次取出所有匹配，耗時才包含整個掃描
+        if not self.registry.timing:
+            return self.regex.finditer(string, *args)
+        start = time.perf_counter()
+        matches = list(self.regex.finditer(string, *args))
+        self.record(start, len(matches))
+        return iter(matches)
+
+    def __repr__(self) -> str:
+        return f"TimedPattern({self.name!r}, {self.regex.pattern!r})"
+
+
+class PatternRegistry:
+    """按名稱登記的預編譯正則"""
+
+    def __init__(self, timing: bool = True):
+        self.patterns: Dict[str, TimedPattern] = {}
+        self.timing = timing
+
+    def register(self, name: str, pattern: str, flags: int = 0) -> TimedPattern:
+        """編譯並登記模式 (同名重複登記時模式必須相同)"""
+
+        existing = self.patterns.get(name)
+        if existing is not None:
+            if existing.regex.pattern != pattern:
+                raise ValueError(f"模式名稱重複: {name}")
+            return existing
+
+        timed = TimedPattern(name, re.compile(pattern, flags), self)
+        self.patterns[name] = timed
+        return timed
+
+    def __getitem__(self, name: str) -> TimedPattern:
+        return self.patterns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.patterns
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def reset_statistics(self):
+        for timed in self.patterns.values():
+            timed.calls = 0
+            timed.hits = 0
+            timed.seconds = 0.0
+
+    def get_statistics(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按累計耗時從高到低返回各模式的統計"""
+
+        total = sum(timed.seconds for timed in self.patterns.values())
+        rows = [
+            {
+                'name': timed.name,
+                'calls': timed.calls,
+                'hits': timed.hits,
+                'total_ms': round(timed.seconds * 1000, 3),
+                'mean_us': round(timed.seconds / timed.calls * 1e6, 2) if timed.calls else 0.0,
+                'share': round(timed.seconds / total, 4) if total else 0.0
+            }
+            for timed in sorted(self.patterns.values(), key=lambda timed: timed.seconds, reverse=True)
+            if timed.calls
+        ]
+        return rows[:limit] if limit else rows
+
+
+# 進程內共用的表 (進程池的工作進程各自計數)
+PATTERNS = PatternRegistry()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Python 源碼結構分析
+一次 ast.parse + 一次樹遍歷，提取函數、方法、類別、imports 和 McCabe 複雜度
+"""
+
+import ast
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class PythonSourceInfo:
+    """Python 檔案的結構信息"""
+    functions: List[Dict[str, Any]] = field(default_factory=list)  # 包含方法和嵌套函數
+    classes: List[Dict[str, Any]] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)
+
+
+class PythonStructureVisitor(ast.NodeVisitor):
+    """單次遍歷收集結構信息；決策點計入最內層的函數 (McCabe 複雜度)"""
+
+    def __init__(self):
+        self.info = PythonSourceInfo()
+        self.current_function: Optional[Dict[str, Any]] = None
+        self.current_class: Optional[Dict[str, Any]] = None
+
+    # imports
+
+    def visit_Import(self, node: ast.Import):
+        self.info.imports.extend(alias.name for alias in node.names)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        self.info.imports.append('.' * node.level + (node.module or ''))
+
+    # 定義
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        record = {
+            'name': node.name,
+            'lineno': node.lineno,
+            'bases': [ast.unparse(base) for base in node.bases],
+            'methods': [],
+            'top_level': self.current_class is None and self.current_function is None
+        }
+        self.info.classes.append(record)
+
+        outer_class, outer_function = self.current_class, self.current_function
+        self.current_class, self.current_function = record, None
+        self.generic_visit(node)
+        self.current_class, self.current_function = outer_class, outer_function
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        self.visit_function(node, is_async=False)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        self.visit_function(node, is_async=True)
+
+    def visit_function(self, node, is_async: bool):
+        is_method = self.current_function is None and self.current_class is not None
+        record = {
+            'name': node.name,
+            'lineno': node.lineno,
+            'end_lineno': getattr(node, 'end_lineno', node.lineno),
+            'async': is_async,
+            'parameters': self.parameter_names(node.args, is_method),
+            'complexity': 1,
+            'class_name': self.current_class['name'] if is_method else None,
+            'top_level': self.current_class is None and self.current_function is None
+        }
+        self.info.functions.append(record)
+        if is_method:
+            self.current_class['methods'].append(node.name)
+
+        outer_class, outer_function = self.current_class, self.current_function
+        self.current_class, self.current_function = None, record
+        self.generic_visit(node)
+        self.current_class, self.current_function = outer_class, outer_function
+
+    @staticmethod
+    def parameter_names(args: ast.arguments, is_method: bool) -> List[str]:
+        positional = [arg.arg for arg in args.posonlyargs + args.args]
+        if is_method and positional and positional[0] in ('self', 'cls'):
+            positional = positional[1:]
+
+        names = positional
+        if args.vararg:
+            names.append(f"*{args.vararg.arg}")
+        names.extend(arg.arg for arg in args.kwonlyargs)
+        if args.kwarg:
+            names.append(f"**{args.kwarg.arg}")
+        return names
+
+    # 決策點
+
+    def add_complexity(self, amount: int = 1):
+        if self.current_function is not None:
+            self.current_function['complexity'] += amount
+
+    def visit_decision(self, node: ast.AST):
+        self.add_complexity()
+        self.generic_visit(node)
+
+    visit_If = visit_IfExp = visit_For = visit_AsyncFor = visit_While = visit_decision
+    visit_ExceptHandler = visit_match_case = visit_decision
+
+    def visit_BoolOp(self, node: ast.BoolOp):
+        self.add_complexity(len(node.values) - 1)
+        self.generic_visit(node)
+
+    def visit_comprehension(self, node: ast.comprehension):
+        self.add_complexity(1 + len(node.ifs))
+        self.generic_visit(node)
+
+
+def analyze_python_source(content: str, filename: str = '<unknown>') -> PythonSourceInfo:
+    """解析 Python 源碼並提取結構信息
+
+    語法錯誤時拋出 SyntaxError (源碼含空字節時為 ValueError)，
+    嵌套過深時 ast.parse 或遍歷拋出 RecursionError，調用方可回退到正則分析。
+    """
+    try:
+        tree = ast.parse(content, filename=filename)
+    except MemoryError as e:
+        # 解析器棧溢出 (如上萬層一元運算) 也是嵌套過深
+        raise RecursionError(f"源碼嵌套過深: {filename}") from e
+    visitor = PythonStructureVisitor()
+    visitor.visit(tree)
+    return visitor.info
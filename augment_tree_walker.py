@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+項目檔案遍歷
+基於 os.scandir 的單次遍歷：在下降前剪掉排除目錄和 .gitignore 忽略的目錄，
+一次匹配所有副檔名，並返回 DirEntry (stat 結果由 DirEntry 緩存，調用方無需再次 stat)
+"""
+
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 默認排除的目錄 (按目錄名匹配，任何深度)
+DEFAULT_EXCLUDE_DIRS = frozenset({'node_modules', '.git', 'dist', 'build', '.next', 'coverage'})
+
+# (所在目錄的相對路徑, 正則, 是否取反, 是否只匹配目錄)
+GitignoreRule = Tuple[str, 're.Pattern', bool, bool]
+
+
+def translate_gitignore_pattern(pattern: str) -> 're.Pattern':
+    """把 .gitignore 的 glob 轉換為匹配相對路徑 (以 / 分隔) 的正則"""
+
+    # 含有中間斜線的模式相對於 .gitignore 所在目錄，否則匹配任何深度的名稱
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append(f"[{body}]")
+                i = end
+        elif char == '\\' and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+
+    prefix = '' if anchored else '(?:.*/)?'
+    return re.compile(f"^{prefix}{''.join(parts)}$")
+
+
+def parse_gitignore(file_path: str, base: str) -> List[GitignoreRule]:
+    """讀取一個 .gitignore，base 為其所在目錄相對於根目錄的路徑"""
+
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\'):
+            line = line[1:]
+
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+
+        rules.append((base, translate_gitignore_pattern(line), negate, dir_only))
+    return rules
+
+
+def rules_match(rules: Iterable[GitignoreRule], rel_path: str, is_dir: bool) -> bool:
+    """按順序應用規則，最後一條匹配的規則決定是否忽略"""
+
+    ignored = False
+    for base, regex, negate, dir_only in rules:
+        if dir_only and not is_dir:
+            continue
+        if base:
+            if not rel_path.startswith(base + '/'):
+                continue
+            candidate = rel_path[len(base) + 1:]
+        else:
+            candidate = rel_path
+        if regex.match(candidate):
+            ignored = not negate
+    return ignored
+
+
+class GitignoreMatcher:
+    """按目錄緩存累積的 .gitignore 規則 (上層目錄的規則在前)"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.rules_by_dir: Dict[str, Tuple[GitignoreRule, ...]] = {}
+
+    def rules_for(self, rel_dir: str) -> Tuple[GitignoreRule, ...]:
+        """目錄 rel_dir ('' 為根目錄) 下的檔案適用的規則"""
+
+        rules = self.rules_by_dir.get(rel_dir)
+        if rules is None:
+            inherited = self.rules_for(rel_dir.rpartition('/')[0]) if rel_dir else ()
+            own = parse_gitignore(os.path.join(self.root, rel_dir, '.gitignore'), rel_dir)
+            rules = inherited + tuple(own) if own else inherited
+            self.rules_by_dir[rel_dir] = rules
+        return rules
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """路徑本身或任一上層目錄被忽略時返回 True (用於不經過遍歷的單個路徑)"""
+
+        parts = rel_path.split('/')
+        for depth in range(1, len(parts)):
+            if rules_match(self.rules_for('/'.join(parts[:depth - 1])), '/'.join(parts[:depth]), True):
+                return True
+        return rules_match(self.rules_for('/'.join(parts[:-1])), rel_path, is_dir)
+
+
+def walk_order_key(rel_path: str) -> Tuple[Tuple[int, str], ...]:
+    """sort_entries=True 時 walk_files 的輸出順序的排序鍵 (相對路徑)
+
+    同一目錄下先輸出檔案再進入子目錄，兩者各自按名稱排序 (深度優先)。
+    """
+
+    parts = rel_path.replace(os.sep, '/').split('/')
+    return tuple((1, part) for part in parts[:-1]) + ((0, parts[-1]),)
+
+
+def walk_files(root: str = ".", extensions: Optional[Iterable[str]] = None,
+               exclude_dirs: Iterable[str] = DEFAULT_EXCLUDE_DIRS,
+               use_gitignore: bool = True, sort_entries: bool = False) -> Iterator[Tuple[str, os.DirEntry]]:
+    """遍歷項目檔案，返回 (路徑, DirEntry)
+
+    路徑格式與 pathlib 一致 (root 為 "." 時不帶 "./" 前綴)，
+    因此與 Path(root).glob() 得到的路徑可以互相比對。
+    符號連結的目錄不會進入，避免循環。
+    sort_entries=True 時每個目錄按名稱排序，輸出順序與 walk_order_key 一致。
+    """
+
+    root = os.path.normpath(root)
+    extensions = {extension.lower() for extension in extensions} if extensions else None
+    exclude_dirs = frozenset(exclude_dirs)
+    matcher = GitignoreMatcher(root) if use_gitignore else None
+
+    # (相對路徑, 實際路徑)
+    stack = [('', root)]
+    while stack:
+        rel_dir, dir_path = stack.pop()
+        rules = matcher.rules_for(rel_dir) if matcher is not None else ()
+
+        try:
+            iterator = os.scandir(dir_path)
+        except OSError:
+            continue
+
+        subdirs = []
+        with iterator:
+            entries = sorted(iterator, key=lambda entry: entry.name) if sort_entries else iterator
+            for entry in entries:
+                name = entry.name
+                rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                path = name if dir_path == os.curdir else entry.path
+
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+
+                if is_dir:
+                    if name in exclude_dirs or (rules and rules_match(rules, rel_path, True)):
+                        continue
+                    subdirs.append((rel_path, path))
+                    continue
+
+                if extensions is not None and os.path.splitext(name)[1].lower() not in extensions:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                if rules and rules_match(rules, rel_path, False):
+                    continue
+
+                yield path, entry
+
+        stack.extend(reversed(subdirs))
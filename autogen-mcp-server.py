@@ -11,6 +11,8 @@ from typing import Any, Dict, List, Optional
 from dataclasses import dataclass
 import logging
 
+from mcp_serialization import write_response
+
 # 嘗試導入 AutoGen 組件 (如果可用)
 try:
     from autogen_core import Agent, MessageContext, TopicId
@@ -39,6 +41,14 @@ class AugmentAutoGenMCP:
         self.agents: Dict[str, AgentConfig] = {}
         self.active_sessions: Dict[str, Any] = {}
         self.setup_default_agents()
+        
+        # 方法分發表
+        self.methods = {
+            "create_agent_team": self.handle_create_agent_team,
+            "execute_collaborative_task": self.handle_execute_collaborative_task,
+            "get_available_agents": self.handle_get_available_agents,
+            "get_agent_capabilities": self.handle_get_agent_capabilities,
+        }
     
     def setup_default_agents(self):
         """設置預設的專業代理"""
@@ -184,63 +194,95 @@ class AugmentAutoGenMCP:
             "timestamp": asyncio.get_event_loop().time()
         }
 
-    async def handle_mcp_request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        """處理 MCP 請求"""
+    async def handle_create_agent_team(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        task_type = params.get("task_type", "full_stack_development")
+        requirements = params.get("requirements", {})
+        team = await self.create_agent_team(task_type, requirements)
         
-        if method == "create_agent_team":
-            task_type = params.get("task_type", "full_stack_development")
-            requirements = params.get("requirements", {})
-            team = await self.create_agent_team(task_type, requirements)
-            
+        return {
+            "success": True,
+            "team": team,
+            "agents": {agent_id: self.agents[agent_id].__dict__ for agent_id in team}
+        }
+    
+    async def handle_execute_collaborative_task(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        session_id = params.get("session_id", "default")
+        task = params.get("task", "")
+        team = params.get("team", [])
+        
+        if not team:
+            team = await self.create_agent_team("full_stack_development", {})
+        
+        results = await self.coordinate_agents(session_id, task, team)
+        
+        return {
+            "success": True,
+            "session_id": session_id,
+            "task": task,
+            "results": results,
+            "summary": f"協作任務完成，{len(team)} 個代理參與"
+        }
+    
+    async def handle_get_available_agents(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "agents": {agent_id: agent.__dict__ for agent_id, agent in self.agents.items()}
+        }
+    
+    async def handle_get_agent_capabilities(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        agent_id = params.get("agent_id")
+        if agent_id in self.agents:
             return {
                 "success": True,
-                "team": team,
-                "agents": {agent_id: self.agents[agent_id].__dict__ for agent_id in team}
+                "agent": self.agents[agent_id].__dict__
             }
-        
-        elif method == "execute_collaborative_task":
-            session_id = params.get("session_id", "default")
-            task = params.get("task", "")
-            team = params.get("team", [])
-            
-            if not team:
-                team = await self.create_agent_team("full_stack_development", {})
-            
-            results = await self.coordinate_agents(session_id, task, team)
-            
+        else:
             return {
-                "success": True,
-                "session_id": session_id,
-                "task": task,
-                "results": results,
-                "summary": f"協作任務完成，{len(team)} 個代理參與"
+                "success": False,
+                "error": f"Agent {agent_id} not found"
             }
+
+    async def handle_mcp_request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """處理 MCP 請求"""
         
-        elif method == "get_available_agents":
+        handler = self.methods.get(method)
+        if handler is None:
             return {
-                "success": True,
-                "agents": {agent_id: agent.__dict__ for agent_id, agent in self.agents.items()}
+                "success": False,
+                "error": f"Unknown method: {method}"
             }
         
-        elif method == "get_agent_capabilities":
-            agent_id = params.get("agent_id")
-            if agent_id in self.agents:
-                return {
-                    "success": True,
-                    "agent": self.agents[agent_id].__dict__
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"Agent {agent_id} not found"
-                }
-        
-        else:
+        try:
+            return await handler(params)
+        except Exception as e:
+            logger.error(f"❌ Error handling {method}: {e}")
             return {
                 "success": False,
-                "error": f"Unknown method: {method}"
+                "error": str(e)
             }
 
+    async def handle_request(self, request: Any) -> Dict[str, Any]:
+        """處理單個請求對象，響應帶回請求 ID"""
+        
+        if not isinstance(request, dict):
+            return {"success": False, "error": "Invalid request object"}
+        
+        response = await self.handle_mcp_request(request.get("method"), request.get("params") or {})
+        
+        request_id = request.get("id")
+        if request_id is not None:
+            response = {"id": request_id, **response}
+        return response
+
+    async def handle_message(self, message: Any) -> Any:
+        """處理一行輸入: 單個請求或 JSON-RPC 批量數組"""
+        
+        if isinstance(message, list):
+            if not message:
+                return {"success": False, "error": "Empty batch request"}
+            return list(await asyncio.gather(*(self.handle_request(request) for request in message)))
+        return await self.handle_request(message)
+
 async def main():
     """主函數 - MCP 服務器入口點"""
     
@@ -259,22 +301,18 @@ async def main():
             
             try:
                 request = json.loads(line.strip())
-                method = request.get("method")
-                params = request.get("params", {})
                 
-                response = await mcp_server.handle_mcp_request(method, params)
+                response = await mcp_server.handle_message(request)
                 
                 # 輸出響應
-                print(json.dumps(response))
-                sys.stdout.flush()
+                write_response(response)
                 
             except json.JSONDecodeError:
                 error_response = {
                     "success": False,
                     "error": "Invalid JSON request"
                 }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+                write_response(error_response)
                 
         except KeyboardInterrupt:
             logger.info("🛑 AutoGen MCP Server stopped")
@@ -5,154 +5,112 @@
 """
 
 import asyncio
+import importlib.util
 import json
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Dict, Any, List
 import logging
-# 導入本地記憶系統
-try:
-    from local_memory_system import AugmentMemoryIntegration, LocalMemorySystem
-except ImportError:
-    # 如果導入失敗，創建簡化版本
-    import sqlite3
-    import hashlib
-    import time
-    from datetime import datetime
 
-    class LocalMemorySystem:
-        def __init__(self, db_path="augment_memory.db"):
-            self.db_path = db_path
-            self.init_database()
+from mcp_serialization import write_response
 
-        def init_database(self):
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS memories (
-                    id TEXT PRIMARY KEY,
-                    content TEXT NOT NULL,
-                    memory_type TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    importance INTEGER DEFAULT 5,
-                    created_at TEXT NOT NULL
-                )
-            ''')
-            conn.commit()
-            conn.close()
+# 導入本地記憶系統 (檔名含連字號，按路徑載入)
+def load_local_memory_system():
+    module_path = Path(__file__).with_name("local-memory-system.py")
+    spec = importlib.util.spec_from_file_location("local_memory_system", module_path)
+    module = importlib.util.module_from_spec(spec)
+    # dataclass 按模組名查找 sys.modules，執行前先登記
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
 
-        def add_memory(self, content, memory_type, category, importance=5, tags=None, metadata=None):
-            memory_id = hashlib.md5(f"{content}{time.time()}".encode()).hexdigest()
-            now = datetime.now().isoformat()
+local_memory_system = load_local_memory_system()
+AugmentMemoryIntegration = local_memory_system.AugmentMemoryIntegration
+LocalMemorySystem = local_memory_system.LocalMemorySystem
 
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO memories (id, content, memory_type, category, importance, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (memory_id, content, memory_type, category, importance, now))
-            conn.commit()
-            conn.close()
-            return memory_id
-
-        def search_memories(self, query, limit=20):
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM memories WHERE content LIKE ? LIMIT ?
-            ''', (f"%{query}%", limit))
-            rows = cursor.fetchall()
-            conn.close()
-            return [{"id": row[0], "content": row[1], "type": row[2], "category": row[3]} for row in rows]
-
-        def get_statistics(self):
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM memories')
-            total = cursor.fetchone()[0]
-            conn.close()
-            return {"total_memories": total, "database_path": self.db_path}
+# 設置日誌
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
-    class AugmentMemoryIntegration:
-        def __init__(self):
-            self.memory_system = LocalMemorySystem()
+# 同時處理的最大請求數 (超過時暫停讀取標準輸入)
+MAX_PENDING_REQUESTS = 64
 
-        def get_relevant_memories(self, query, limit=10):
-            return self.memory_system.search_memories(query, limit)
+# 搜索產生的訪問記錄由後台線程按此間隔 (秒) 批量寫入，讀請求本身不寫數據庫
+ACCESS_FLUSH_INTERVAL = float(os.getenv("AUGMENT_MEMORY_ACCESS_FLUSH_INTERVAL", "5.0"))
 
-        def learn_from_conversation(self, user_input, ai_response):
-            self.memory_system.add_memory(
-                content=f"對話: {user_input}",
-                memory_type="conversation",
-                category="general",
-                importance=5
-            )
+# JSON-RPC 內部錯誤碼
+JSONRPC_INTERNAL_ERROR = -32603
 
-        def get_user_context(self):
-            stats = self.memory_system.get_statistics()
-            return {
-                "recent_memories": [],
-                "user_preferences": {},
-                "project_knowledge": [],
-                "statistics": stats
-            }
+def internal_error_response(response: Any, error: Exception) -> Any:
+    """響應無法寫出時替代它的 JSON-RPC 內部錯誤 (帶回原請求 ID，批量響應逐項替換)"""
+    
+    if isinstance(response, list):
+        return [internal_error_response(item, error) for item in response]
+    
+    error_response = {
+        "jsonrpc": "2.0",
+        "success": False,
+        "error": {"code": JSONRPC_INTERNAL_ERROR, "message": f"響應序列化失敗: {error}"}
+    }
+    if isinstance(response, dict) and response.get("id") is not None:
+        error_response = {"id": response["id"], **error_response}
+    return error_response
 
-# 設置日誌
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+class BatchRollback(Exception):
+    """批量請求中有請求失敗，用於觸發事務回滾"""
+    
+    def __init__(self, responses: List[Dict[str, Any]]):
+        super().__init__("批量請求失敗")
+        self.responses = responses
 
 class LocalMemoryMCPServer:
     """本地記憶 MCP 服務器"""
     
-    def __init__(self):
-        self.memory_integration = AugmentMemoryIntegration()
+    def __init__(self, max_workers: int = 4, access_flush_interval: float = ACCESS_FLUSH_INTERVAL):
+        self.memory_integration = AugmentMemoryIntegration(access_flush_interval=access_flush_interval)
+        # 阻塞的 SQLite 調用在線程池中執行，不佔用事件循環
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="memory-mcp")
+        
+        # 方法分發表
+        self.methods = {
+            "add_memory": self.add_memory,
+            "search_memories": self.search_memories,
+            "get_user_context": self.get_user_context,
+            "learn_from_conversation": self.learn_from_conversation,
+            "add_user_preference": self.add_user_preference,
+            "get_user_preference": self.get_user_preference,
+            "add_project_knowledge": self.add_project_knowledge,
+            "get_project_knowledge": self.get_project_knowledge,
+            "get_statistics": self.get_statistics,
+            "cleanup_memories": self.cleanup_memories,
+        }
+        # 會寫入數據庫的方法，批量請求中出現時整批放進一個事務
+        self.write_methods = {
+            "add_memory", "learn_from_conversation", "add_user_preference",
+            "add_project_knowledge", "cleanup_memories",
+        }
         logger.info("🧠 本地記憶 MCP 服務器初始化完成")
     
-    async def handle_mcp_request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        """處理 MCP 請求"""
+    async def run_blocking(self, func, *args):
+        """在線程池中執行阻塞調用"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+    
+    def call_method(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """按分發表調用方法 (阻塞)"""
         
-        try:
-            if method == "add_memory":
-                return await self.add_memory(params)
-            
-            elif method == "search_memories":
-                return await self.search_memories(params)
-            
-            elif method == "get_user_context":
-                return await self.get_user_context(params)
-            
-            elif method == "learn_from_conversation":
-                return await self.learn_from_conversation(params)
-            
-            elif method == "add_user_preference":
-                return await self.add_user_preference(params)
-            
-            elif method == "get_user_preference":
-                return await self.get_user_preference(params)
-            
-            elif method == "add_project_knowledge":
-                return await self.add_project_knowledge(params)
-            
-            elif method == "get_project_knowledge":
-                return await self.get_project_knowledge(params)
-            
-            elif method == "get_statistics":
-                return await self.get_statistics(params)
-            
-            elif method == "cleanup_memories":
-                return await self.cleanup_memories(params)
-            
-            else:
-                return {
-                    "success": False,
-                    "error": f"未知方法: {method}",
-                    "available_methods": [
-                        "add_memory", "search_memories", "get_user_context",
-                        "learn_from_conversation", "add_user_preference", 
-                        "get_user_preference", "add_project_knowledge",
-                        "get_project_knowledge", "get_statistics", "cleanup_memories"
-                    ]
-                }
+        handler = self.methods.get(method)
+        if handler is None:
+            return {
+                "success": False,
+                "error": f"未知方法: {method}",
+                "available_methods": list(self.methods)
+            }
         
+        try:
+            return handler(params)
         except Exception as e:
             logger.error(f"處理請求時發生錯誤: {e}")
             return {
@@ -160,7 +118,67 @@ class LocalMemoryMCPServer:
                 "error": str(e)
             }
     
-    async def add_memory(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def call_request(self, request: Any) -> Dict[str, Any]:
+        """執行單個請求對象，響應帶回請求 ID"""
+        
+        if not isinstance(request, dict):
+            return {"success": False, "error": "無效的請求對象"}
+        
+        response = self.call_method(request.get("method"), request.get("params") or {})
+        
+        # 帶回請求 ID，客戶端據此匹配亂序返回的響應
+        request_id = request.get("id")
+        if request_id is not None:
+            response = {"id": request_id, **response}
+        return response
+    
+    async def handle_mcp_request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """處理 MCP 請求"""
+        return await self.run_blocking(self.call_method, method, params)
+    
+    def execute_batch(self, requests: List[Any]) -> List[Dict[str, Any]]:
+        """在一個事務中順序執行整批請求；任一請求失敗時整批回滾"""
+        
+        try:
+            with self.memory_integration.memory_system.transaction():
+                responses = [self.call_request(request) for request in requests]
+                if not all(response.get("success") for response in responses):
+                    raise BatchRollback(responses)
+                return responses
+        except BatchRollback as rollback:
+            return [
+                response if not response.get("success") else {
+                    **{key: response[key] for key in ("id",) if key in response},
+                    "success": False,
+                    "error": "批量請求中有請求失敗，整批已回滾"
+                }
+                for response in rollback.responses
+            ]
+    
+    async def handle_mcp_batch(self, requests: List[Any]) -> Any:
+        """處理 JSON-RPC 批量請求，返回合併的響應數組"""
+        
+        if not requests:
+            return {"success": False, "error": "批量請求不能為空"}
+        
+        if any(isinstance(request, dict) and request.get("method") in self.write_methods
+               for request in requests):
+            # 含寫操作: 整批在同一線程、同一事務中執行，只提交一次
+            return await self.run_blocking(self.execute_batch, requests)
+        
+        # 只讀批量: 各請求並發執行
+        return list(await asyncio.gather(
+            *(self.run_blocking(self.call_request, request) for request in requests)
+        ))
+    
+    async def handle_message(self, message: Any) -> Any:
+        """處理一行輸入: 單個請求或批量數組"""
+        
+        if isinstance(message, list):
+            return await self.handle_mcp_batch(message)
+        return await self.run_blocking(self.call_request, message)
+    
+    def add_memory(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """添加記憶"""
         
         content = params.get("content", "")
@@ -188,7 +206,7 @@ class LocalMemoryMCPServer:
             "message": f"成功添加記憶: {memory_type}/{category}"
         }
     
-    async def search_memories(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def search_memories(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """搜索記憶"""
         
         query = params.get("query", "")
@@ -212,13 +230,14 @@ class LocalMemoryMCPServer:
                     "importance": memory.importance,
                     "tags": memory.tags,
                     "created_at": memory.created_at,
-                    "access_count": memory.access_count
+                    "access_count": memory.access_count,
+                    "snippet": memory.snippet
                 }
                 for memory in memories
             ]
         }
     
-    async def get_user_context(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def get_user_context(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """獲取用戶上下文"""
         
         context = self.memory_integration.get_user_context()
@@ -233,7 +252,7 @@ class LocalMemoryMCPServer:
             }
         }
     
-    async def learn_from_conversation(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def learn_from_conversation(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """從對話中學習"""
         
         user_input = params.get("user_input", "")
@@ -249,7 +268,7 @@ class LocalMemoryMCPServer:
             "message": "已從對話中學習並更新記憶"
         }
     
-    async def add_user_preference(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def add_user_preference(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """添加用戶偏好"""
         
         key = params.get("key", "")
@@ -265,7 +284,7 @@ class LocalMemoryMCPServer:
             "message": f"已更新用戶偏好: {key}"
         }
     
-    async def get_user_preference(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def get_user_preference(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """獲取用戶偏好"""
         
         key = params.get("key", "")
@@ -282,7 +301,7 @@ class LocalMemoryMCPServer:
             "value": value
         }
     
-    async def add_project_knowledge(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def add_project_knowledge(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """添加項目知識"""
         
         file_path = params.get("file_path", "")
@@ -306,24 +325,29 @@ class LocalMemoryMCPServer:
             "message": f"已添加項目知識: {knowledge_type}"
         }
     
-    async def get_project_knowledge(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def get_project_knowledge(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """獲取項目知識"""
         
         file_path = params.get("file_path")
         knowledge_type = params.get("knowledge_type")
+        limit = params.get("limit", 100)
+        page_token = params.get("page_token")
         
-        knowledge = self.memory_integration.memory_system.get_project_knowledge(
+        knowledge, next_page_token = self.memory_integration.memory_system.get_project_knowledge_page(
             file_path=file_path,
-            knowledge_type=knowledge_type
+            knowledge_type=knowledge_type,
+            limit=limit,
+            page_token=page_token
         )
         
         return {
             "success": True,
             "count": len(knowledge),
-            "knowledge": knowledge
+            "knowledge": knowledge,
+            "next_page_token": next_page_token
         }
     
-    async def get_statistics(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def get_statistics(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """獲取統計信息"""
         
         stats = self.memory_integration.memory_system.get_statistics()
@@ -333,7 +357,7 @@ class LocalMemoryMCPServer:
             "statistics": stats
         }
     
-    async def cleanup_memories(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def cleanup_memories(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """清理舊記憶"""
         
         days = params.get("days", 30)
@@ -368,38 +392,77 @@ async def main():
     logger.info("   - get_statistics: 獲取統計信息")
     logger.info("   - cleanup_memories: 清理舊記憶")
     
+    loop = asyncio.get_running_loop()
+    
+    # 單一寫出任務: 響應按完成順序逐行輸出，避免並發請求交錯寫入
+    responses: asyncio.Queue = asyncio.Queue()
+    
+    async def write_responses():
+        while True:
+            response = await responses.get()
+            if response is None:
+                break
+            try:
+                write_response(response)
+            except Exception as e:
+                # 單個響應寫出失敗不能終止寫出任務，否則之後的響應全部丟失
+                logger.error(f"❌ 寫出響應失敗: {e}")
+                try:
+                    write_response(internal_error_response(response, e))
+                except Exception as e:
+                    logger.error(f"❌ 寫出錯誤響應失敗: {e}")
+    
+    writer = asyncio.create_task(write_responses())
+    pending = set()
+    slots = asyncio.Semaphore(MAX_PENDING_REQUESTS)
+    
+    async def process_request(request: Any):
+        try:
+            response = await mcp_server.handle_message(request)
+        except Exception as e:
+            logger.error(f"❌ 錯誤: {e}")
+            response = {"success": False, "error": str(e)}
+        finally:
+            slots.release()
+        await responses.put(response)
+    
     # 模擬 MCP 協議處理
     while True:
         try:
             # 讀取標準輸入 (MCP 協議)
-            line = await asyncio.get_event_loop().run_in_executor(None, sys.stdin.readline)
+            line = await loop.run_in_executor(None, sys.stdin.readline)
             if not line:
                 break
             
             try:
                 request = json.loads(line.strip())
-                method = request.get("method")
-                params = request.get("params", {})
-                
-                response = await mcp_server.handle_mcp_request(method, params)
-                
-                # 輸出響應
-                print(json.dumps(response, ensure_ascii=False))
-                sys.stdout.flush()
-                
             except json.JSONDecodeError:
                 error_response = {
                     "success": False,
                     "error": "無效的 JSON 請求"
                 }
-                print(json.dumps(error_response, ensure_ascii=False))
-                sys.stdout.flush()
+                await responses.put(error_response)
+                continue
+            
+            await slots.acquire()
+            task = asyncio.create_task(process_request(request))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
                 
         except KeyboardInterrupt:
             logger.info("🛑 本地記憶 MCP 服務器停止")
             break
         except Exception as e:
             logger.error(f"❌ 錯誤: {e}")
+    
+    # 輸入結束後等待未完成的請求並輸出全部響應
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    await responses.put(None)
+    await writer
+    mcp_server.executor.shutdown(wait=True)
+    # 停止後台線程並寫入剩餘的訪問記錄
+    mcp_server.memory_integration.memory_system.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
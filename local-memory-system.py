@@ -6,10 +6,14 @@
 
 import sqlite3
 import json
+import base64
 import hashlib
 import time
+import threading
+import atexit
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 from pathlib import Path
 import re
 from dataclasses import dataclass, asdict
@@ -19,6 +23,20 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 全文搜索排序時重要性的權重 (bm25 分數越小越相關)
+FTS_IMPORTANCE_WEIGHT = 0.5
+
+# trigram 分詞器的最短查詢長度
+FTS_MIN_QUERY_LENGTH = 3
+
+# 項目知識分頁的默認/最大頁大小
+KNOWLEDGE_PAGE_SIZE = 100
+KNOWLEDGE_MAX_PAGE_SIZE = 1000
+
+# 內置 EduCreate 知識的版本，修改種子內容時遞增
+EDUCREAT_SEED_VERSION = 1
+EDUCREAT_SEED_VERSION_KEY = "educreat_seed_version"
+
 @dataclass
 class Memory:
     """記憶項目"""
@@ -32,23 +50,68 @@ class Memory:
     access_count: int
     tags: List[str]
     metadata: Dict[str, Any]
+    snippet: Optional[str] = None  # 全文搜索命中的高亮片段
+
+class TransactionConnection:
+    """事務期間共享的連接: commit/close 推遲到事務結束時統一執行"""
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+    
+    def commit(self):
+        pass
+    
+    def close(self):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+    
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
 
 class LocalMemorySystem:
     """本地記憶系統"""
     
-    def __init__(self, db_path: str = "augment_memory.db"):
+    def __init__(self, db_path: str = "augment_memory.db", access_flush_interval: float = 0.0):
+        """access_flush_interval: 訪問記錄的寫入間隔 (秒)。
+        0 表示每次搜索後批量寫入一次；大於 0 時由後台線程定時寫入。
+        """
         self.db_path = db_path
+        self.fts_enabled = False
+        self.local = threading.local()
         self.init_database()
         
+        # 待寫入的訪問記錄: memory_id -> [訪問次數, 最後訪問時間]
+        self.pending_access: Dict[str, List[Any]] = {}
+        self.access_lock = threading.Lock()
+        self.access_flush_interval = access_flush_interval
+        self.access_flush_stop = threading.Event()
+        
+        if access_flush_interval > 0:
+            threading.Thread(target=self.access_flush_loop, daemon=True).start()
+        atexit.register(self.flush_access_updates)
+        
     def init_database(self):
         """初始化數據庫"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        # WAL 模式: 並發讀取不會被寫入阻塞 (設置會持久化到數據庫文件)
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
+        # 遷移: 舊表沒有 doc_id 時先改名，建新表後複製
+        legacy = self.rename_legacy_memories(cursor)
+        
         # 創建記憶表
+        # doc_id 是 rowid 的別名，VACUUM 不會重新編號，全文索引以它為鍵
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS memories (
-                id TEXT PRIMARY KEY,
+                doc_id INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
                 content TEXT NOT NULL,
                 memory_type TEXT NOT NULL,
                 category TEXT NOT NULL,
@@ -61,6 +124,16 @@ class LocalMemorySystem:
             )
         ''')
         
+        if legacy:
+            cursor.execute('''
+                INSERT INTO memories
+                (id, content, memory_type, category, importance, created_at, last_accessed, access_count, tags, metadata)
+                SELECT id, content, memory_type, category, importance, created_at, last_accessed, access_count, tags, metadata
+                FROM memories_legacy ORDER BY rowid
+            ''')
+            cursor.execute('DROP TABLE memories_legacy')
+            logger.info("🔄 記憶表已遷移到 doc_id 主鍵")
+        
         # 創建索引
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_memory_type ON memories(memory_type)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_category ON memories(category)')
@@ -89,14 +162,121 @@ class LocalMemorySystem:
             )
         ''')
         
+        # 與分頁排序一致的索引，翻頁時直接從上一頁末尾定位
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_knowledge_order
+            ON project_knowledge(confidence DESC, updated_at DESC, id DESC)
+        ''')
+        
         conn.commit()
+        
+        self.init_fts(conn)
         conn.close()
         
         logger.info(f"✅ 本地記憶系統初始化完成: {self.db_path}")
     
+    @staticmethod
+    def rename_legacy_memories(cursor: sqlite3.Cursor) -> bool:
+        """舊版記憶表 (TEXT 主鍵、無 doc_id) 改名為 memories_legacy，返回是否需要複製
+        
+        舊全文索引以隱式 rowid 為鍵，VACUUM 後可能錯位，連同觸發器一起刪除後重建。
+        """
+        
+        cursor.execute('PRAGMA table_info(memories)')
+        columns = [row[1] for row in cursor.fetchall()]
+        if not columns or 'doc_id' in columns:
+            return False
+        
+        # 改名、複製和刪除在同一事務中完成 (由 init_database 提交)
+        cursor.execute('BEGIN')
+        for trigger in ('memories_fts_insert', 'memories_fts_delete', 'memories_fts_update'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        cursor.execute('DROP TABLE IF EXISTS memories_fts')
+        
+        # 舊索引隨表改名，先刪除以便在新表上以同名重建
+        for index in ('idx_memory_type', 'idx_category', 'idx_importance', 'idx_created_at'):
+            cursor.execute(f'DROP INDEX IF EXISTS {index}')
+        cursor.execute('ALTER TABLE memories RENAME TO memories_legacy')
+        return True
+    
+    def connect(self):
+        """獲取數據庫連接；在 transaction() 中返回該線程共享的事務連接"""
+        conn = getattr(self.local, 'transaction_conn', None)
+        if conn is not None:
+            return conn
+        return sqlite3.connect(self.db_path)
+    
+    @contextmanager
+    def transaction(self):
+        """把當前線程內的多次寫入合併為一個事務，只提交 (fsync) 一次"""
+        
+        if getattr(self.local, 'transaction_conn', None) is not None:
+            # 嵌套調用併入外層事務
+            yield self.local.transaction_conn
+            return
+        
+        conn = sqlite3.connect(self.db_path)
+        self.local.transaction_conn = TransactionConnection(conn)
+        try:
+            yield self.local.transaction_conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.local.transaction_conn = None
+            conn.close()
+    
+    def init_fts(self, conn: sqlite3.Connection):
+        """初始化 FTS5 全文索引 (用觸發器與 memories 表同步)"""
+        
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memories_fts'")
+        fts_exists = cursor.fetchone() is not None
+        
+        try:
+            # trigram 分詞器支持中文和子字串匹配
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+                    content, tags,
+                    content='memories', content_rowid='doc_id',
+                    tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite 不支持 FTS5 trigram，使用 LIKE 搜索: {e}")
+            return
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS memories_fts_insert AFTER INSERT ON memories BEGIN
+                INSERT INTO memories_fts (rowid, content, tags) VALUES (new.doc_id, new.content, new.tags);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS memories_fts_delete AFTER DELETE ON memories BEGIN
+                INSERT INTO memories_fts (memories_fts, rowid, content, tags)
+                VALUES ('delete', old.doc_id, old.content, old.tags);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS memories_fts_update AFTER UPDATE OF content, tags ON memories BEGIN
+                INSERT INTO memories_fts (memories_fts, rowid, content, tags)
+                VALUES ('delete', old.doc_id, old.content, old.tags);
+                INSERT INTO memories_fts (rowid, content, tags) VALUES (new.doc_id, new.content, new.tags);
+            END
+        ''')
+        
+        # 遷移: 為已有的記憶建立索引
+        if not fts_exists:
+            cursor.execute("INSERT INTO memories_fts (memories_fts) VALUES ('rebuild')")
+            logger.info("🔄 已為現有記憶建立全文索引")
+        
+        conn.commit()
+        self.fts_enabled = True
+    
     def add_memory(self, content: str, memory_type: str, category: str, 
                    importance: int = 5, tags: List[str] = None, 
-                   metadata: Dict[str, Any] = None) -> str:
+                   metadata: Dict[str, Any] = None, memory_id: str = None) -> str:
         """添加記憶"""
         
         if tags is None:
@@ -105,11 +285,12 @@ class LocalMemorySystem:
             metadata = {}
         
         # 生成唯一 ID
-        memory_id = hashlib.md5(f"{content}{time.time()}".encode()).hexdigest()
+        if memory_id is None:
+            memory_id = hashlib.md5(f"{content}{time.time()}".encode()).hexdigest()
         
         now = datetime.now().isoformat()
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -127,11 +308,76 @@ class LocalMemorySystem:
         logger.info(f"📝 添加記憶: {memory_type}/{category} - {content[:50]}...")
         return memory_id
     
+    @staticmethod
+    def content_memory_id(content: str, memory_type: str, category: str) -> str:
+        """按內容生成確定性 ID，同一內容總是得到同一 ID"""
+        return hashlib.md5(f"seed:{memory_type}:{category}:{content}".encode()).hexdigest()
+    
+    def ensure_memory(self, content: str, memory_type: str, category: str,
+                      importance: int = 5, tags: List[str] = None) -> Tuple[str, bool]:
+        """內容尋址地添加記憶；已存在相同內容時不寫入。返回 (記憶 ID, 是否新增)"""
+        
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id FROM memories
+            WHERE content = ? AND memory_type = ? AND category = ?
+            LIMIT 1
+        ''', (content, memory_type, category))
+        row = cursor.fetchone()
+        conn.close()
+        
+        if row:
+            return row[0], False
+        
+        memory_id = self.content_memory_id(content, memory_type, category)
+        self.add_memory(content, memory_type, category, importance, tags, memory_id=memory_id)
+        return memory_id, True
+    
+    def compact_duplicate_memories(self, seeds: Iterable[Tuple[str, str, str]]) -> int:
+        """合併種子記憶的重複行: 每組保留一條，累加訪問次數。返回刪除的行數
+        
+        seeds 為內置種子的 (內容, 類型, 分類)。只合併這些組，
+        用戶寫入的記憶即使內容相同也保持不變。
+        """
+        
+        self.flush_access_updates()
+        
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        updates = []
+        deletions = []
+        for content, memory_type, category in seeds:
+            # 保留最重要、最早創建的一條
+            cursor.execute('''
+                SELECT id, access_count, last_accessed FROM memories
+                WHERE content = ? AND memory_type = ? AND category = ?
+                ORDER BY importance DESC, created_at ASC
+            ''', (content, memory_type, category))
+            rows = cursor.fetchall()
+            if len(rows) < 2:
+                continue
+            updates.append((sum(row[1] for row in rows), max(row[2] for row in rows), rows[0][0]))
+            deletions.extend((row[0],) for row in rows[1:])
+        
+        if deletions:
+            with conn:
+                conn.executemany(
+                    'UPDATE memories SET access_count = ?, last_accessed = ? WHERE id = ?',
+                    updates
+                )
+                conn.executemany('DELETE FROM memories WHERE id = ?', deletions)
+            logger.info(f"🧹 合併重複的種子記憶: {len(updates)} 組，刪除 {len(deletions)} 條")
+        
+        conn.close()
+        return len(deletions)
+    
     def get_memories(self, memory_type: str = None, category: str = None, 
                      limit: int = 50, min_importance: int = 1) -> List[Memory]:
         """獲取記憶"""
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         query = '''
@@ -176,22 +422,36 @@ class LocalMemorySystem:
         return memories
     
     def search_memories(self, query: str, limit: int = 20) -> List[Memory]:
-        """搜索記憶"""
+        """搜索記憶 (FTS5 bm25 排序並結合重要性，短查詢退回 LIKE)"""
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
-        # 簡單的文本搜索 (可以升級為 FTS)
-        search_query = f"%{query}%"
-        
-        cursor.execute('''
-            SELECT id, content, memory_type, category, importance, 
-                   created_at, last_accessed, access_count, tags, metadata
-            FROM memories 
-            WHERE content LIKE ? OR tags LIKE ?
-            ORDER BY importance DESC, access_count DESC
-            LIMIT ?
-        ''', (search_query, search_query, limit))
+        if self.fts_enabled and len(query.strip()) >= FTS_MIN_QUERY_LENGTH:
+            # 整個查詢作為短語匹配，與原本的子字串語義一致
+            fts_query = '"' + query.strip().replace('"', '""') + '"'
+            
+            cursor.execute('''
+                SELECT m.id, m.content, m.memory_type, m.category, m.importance, 
+                       m.created_at, m.last_accessed, m.access_count, m.tags, m.metadata,
+                       snippet(memories_fts, 0, '**', '**', '…', 64)
+                FROM memories_fts
+                JOIN memories m ON m.doc_id = memories_fts.rowid
+                WHERE memories_fts MATCH ?
+                ORDER BY bm25(memories_fts) - m.importance * ?, m.access_count DESC
+                LIMIT ?
+            ''', (fts_query, FTS_IMPORTANCE_WEIGHT, limit))
+        else:
+            search_query = f"%{query}%"
+            
+            cursor.execute('''
+                SELECT id, content, memory_type, category, importance, 
+                       created_at, last_accessed, access_count, tags, metadata, NULL
+                FROM memories 
+                WHERE content LIKE ? OR tags LIKE ?
+                ORDER BY importance DESC, access_count DESC
+                LIMIT ?
+            ''', (search_query, search_query, limit))
         
         rows = cursor.fetchall()
         
@@ -207,37 +467,89 @@ class LocalMemorySystem:
                 last_accessed=row[6],
                 access_count=row[7],
                 tags=json.loads(row[8]) if row[8] else [],
-                metadata=json.loads(row[9]) if row[9] else {}
+                metadata=json.loads(row[9]) if row[9] else {},
+                snippet=row[10]
             )
             memories.append(memory)
-            
-            # 更新訪問記錄
-            self.update_access(row[0])
         
         conn.close()
+        
+        # 更新訪問記錄 (批量)
+        self.record_access(memory.id for memory in memories)
+        if self.access_flush_interval <= 0:
+            self.flush_access_updates()
+        
         return memories
     
     def update_access(self, memory_id: str):
         """更新訪問記錄"""
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self.record_access([memory_id])
+        if self.access_flush_interval <= 0:
+            self.flush_access_updates()
+    
+    def record_access(self, memory_ids):
+        """在記憶體中累積訪問記錄，稍後批量寫入"""
         
         now = datetime.now().isoformat()
         
-        cursor.execute('''
-            UPDATE memories 
-            SET last_accessed = ?, access_count = access_count + 1
-            WHERE id = ?
-        ''', (now, memory_id))
+        with self.access_lock:
+            for memory_id in memory_ids:
+                entry = self.pending_access.setdefault(memory_id, [0, now])
+                entry[0] += 1
+                entry[1] = now
+    
+    def flush_access_updates(self) -> int:
+        """用一條 executemany UPDATE 寫入所有累積的訪問記錄"""
         
-        conn.commit()
-        conn.close()
+        with self.access_lock:
+            if not self.pending_access:
+                return 0
+            pending = self.pending_access
+            self.pending_access = {}
+        
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany('''
+                UPDATE memories 
+                SET last_accessed = ?, access_count = access_count + ?
+                WHERE id = ?
+            ''', [(last_accessed, count, memory_id) for memory_id, (count, last_accessed) in pending.items()])
+            conn.commit()
+        except sqlite3.Error:
+            # 寫入失敗 (如數據庫被其他事務鎖定) 時放回緩衝區，下次再寫
+            with self.access_lock:
+                for memory_id, (count, last_accessed) in pending.items():
+                    entry = self.pending_access.setdefault(memory_id, [0, last_accessed])
+                    entry[0] += count
+                    entry[1] = max(entry[1], last_accessed)
+            raise
+        finally:
+            conn.close()
+        
+        return len(pending)
+    
+    def access_flush_loop(self):
+        """後台線程: 定時寫入訪問記錄"""
+        
+        while not self.access_flush_stop.wait(self.access_flush_interval):
+            try:
+                self.flush_access_updates()
+            except sqlite3.Error as e:
+                logger.warning(f"寫入訪問記錄失敗: {e}")
+    
+    def close(self):
+        """停止後台寫入並提交剩餘的訪問記錄"""
+        
+        self.access_flush_stop.set()
+        self.flush_access_updates()
     
     def add_user_preference(self, key: str, value: Any):
         """添加用戶偏好"""
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         now = datetime.now().isoformat()
@@ -255,7 +567,7 @@ class LocalMemorySystem:
     def get_user_preference(self, key: str, default: Any = None) -> Any:
         """獲取用戶偏好"""
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute('SELECT value FROM user_preferences WHERE key = ?', (key,))
@@ -274,7 +586,7 @@ class LocalMemorySystem:
         knowledge_id = hashlib.md5(f"{file_path}{knowledge_type}{content}".encode()).hexdigest()
         now = datetime.now().isoformat()
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -289,11 +601,25 @@ class LocalMemorySystem:
         logger.info(f"🧠 添加項目知識: {file_path} - {knowledge_type}")
         return knowledge_id
     
-    def get_project_knowledge(self, file_path: str = None, 
-                             knowledge_type: str = None) -> List[Dict[str, Any]]:
-        """獲取項目知識"""
+    @staticmethod
+    def encode_page_token(row: Dict[str, Any]) -> str:
+        """把一行的排序鍵編碼為不透明的分頁令牌"""
+        key = [row['confidence'], row['updated_at'], row['id']]
+        return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+    
+    @staticmethod
+    def decode_page_token(page_token: str) -> Tuple[float, str, str]:
+        """解碼分頁令牌為 (confidence, updated_at, id)"""
+        try:
+            confidence, updated_at, knowledge_id = json.loads(base64.urlsafe_b64decode(page_token.encode()))
+            return float(confidence), str(updated_at), str(knowledge_id)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"無效的分頁令牌: {page_token}") from e
+    
+    def query_project_knowledge(self, conn, file_path: str = None, knowledge_type: str = None,
+                                limit: int = None, after_key: Tuple = None) -> List[Dict[str, Any]]:
+        """按 (confidence, updated_at, id) 降序查詢一頁項目知識 (keyset 分頁)"""
         
-        conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         query = 'SELECT * FROM project_knowledge WHERE 1=1'
@@ -307,14 +633,20 @@ class LocalMemorySystem:
             query += ' AND knowledge_type = ?'
             params.append(knowledge_type)
         
-        query += ' ORDER BY confidence DESC, updated_at DESC'
+        if after_key is not None:
+            query += ' AND (confidence, updated_at, id) < (?, ?, ?)'
+            params.extend(after_key)
+        
+        query += ' ORDER BY confidence DESC, updated_at DESC, id DESC'
+        
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
         
         cursor.execute(query, params)
-        rows = cursor.fetchall()
         
-        knowledge = []
-        for row in rows:
-            knowledge.append({
+        return [
+            {
                 'id': row[0],
                 'file_path': row[1],
                 'knowledge_type': row[2],
@@ -322,17 +654,76 @@ class LocalMemorySystem:
                 'confidence': row[4],
                 'created_at': row[5],
                 'updated_at': row[6]
-            })
+            }
+            for row in cursor.fetchall()
+        ]
+    
+    def get_project_knowledge(self, file_path: str = None, 
+                             knowledge_type: str = None, limit: int = None,
+                             after_id: str = None) -> List[Dict[str, Any]]:
+        """獲取項目知識 (limit/after_id 用於分頁，after_id 為上一頁最後一條的 ID)"""
+        
+        conn = self.connect()
+        
+        after_key = None
+        if after_id is not None:
+            row = conn.execute(
+                'SELECT confidence, updated_at, id FROM project_knowledge WHERE id = ?', (after_id,)
+            ).fetchone()
+            if row is None:
+                conn.close()
+                raise ValueError(f"項目知識不存在: {after_id}")
+            after_key = tuple(row)
+        
+        knowledge = self.query_project_knowledge(conn, file_path, knowledge_type, limit, after_key)
         
         conn.close()
         return knowledge
     
+    def get_project_knowledge_page(self, file_path: str = None, knowledge_type: str = None,
+                                   limit: int = KNOWLEDGE_PAGE_SIZE,
+                                   page_token: str = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """獲取一頁項目知識，返回 (本頁知識, 下一頁令牌)；沒有下一頁時令牌為 None"""
+        
+        limit = max(1, min(limit, KNOWLEDGE_MAX_PAGE_SIZE))
+        after_key = self.decode_page_token(page_token) if page_token else None
+        
+        conn = self.connect()
+        # 多取一條用於判斷是否還有下一頁
+        knowledge = self.query_project_knowledge(conn, file_path, knowledge_type, limit + 1, after_key)
+        conn.close()
+        
+        if len(knowledge) > limit:
+            knowledge = knowledge[:limit]
+            return knowledge, self.encode_page_token(knowledge[-1])
+        return knowledge, None
+    
+    def iter_project_knowledge(self, file_path: str = None, knowledge_type: str = None,
+                               batch_size: int = 500):
+        """逐條遍歷項目知識，按頁從數據庫讀取，不一次性載入整張表"""
+        
+        after_key = None
+        while True:
+            conn = self.connect()
+            batch = self.query_project_knowledge(conn, file_path, knowledge_type, batch_size, after_key)
+            conn.close()
+            
+            yield from batch
+            
+            if len(batch) < batch_size:
+                return
+            last = batch[-1]
+            after_key = (last['confidence'], last['updated_at'], last['id'])
+    
     def cleanup_old_memories(self, days: int = 30, min_importance: int = 3):
         """清理舊記憶"""
         
         cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
         
-        conn = sqlite3.connect(self.db_path)
+        # 清理依賴訪問次數，先寫入累積的訪問記錄
+        self.flush_access_updates()
+        
+        conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -350,7 +741,7 @@ class LocalMemorySystem:
     def get_statistics(self) -> Dict[str, Any]:
         """獲取統計信息"""
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
         cursor = conn.cursor()
         
         # 記憶統計
@@ -389,32 +780,28 @@ class LocalMemorySystem:
 class AugmentMemoryIntegration:
     """Augment 記憶系統整合"""
     
-    def __init__(self):
-        self.memory_system = LocalMemorySystem()
+    def __init__(self, db_path: str = "augment_memory.db", access_flush_interval: float = 0.0):
+        """access_flush_interval 傳給 LocalMemorySystem；長期運行的服務應大於 0，由後台線程定時寫入訪問記錄"""
+        self.memory_system = LocalMemorySystem(db_path, access_flush_interval=access_flush_interval)
         self.init_educreat_knowledge()
     
     def init_educreat_knowledge(self):
-        """初始化 EduCreate 項目知識"""
-        
-        # 添加項目基本信息
-        self.memory_system.add_memory(
-            content="EduCreate 是一個記憶科學驅動的智能教育遊戲 SaaS 平台",
-            memory_type="knowledge",
-            category="educreat",
-            importance=10,
-            tags=["educreat", "project", "memory_science", "education"]
-        )
-        
-        # 添加技術棧信息
-        self.memory_system.add_memory(
-            content="技術棧: Next.js + React + TypeScript + Tailwind CSS + Node.js + PostgreSQL",
-            memory_type="knowledge",
-            category="educreat",
-            importance=9,
-            tags=["tech_stack", "nextjs", "react", "typescript"]
-        )
+        """初始化 EduCreate 項目知識 (冪等: 種子已是最新版本時不寫入)"""
+        
+        if self.memory_system.get_user_preference(EDUCREAT_SEED_VERSION_KEY) == EDUCREAT_SEED_VERSION:
+            logger.debug("🎓 EduCreate 項目知識已是最新版本")
+            return
+        
+        seed_memories = [
+            # 項目基本信息
+            ("EduCreate 是一個記憶科學驅動的智能教育遊戲 SaaS 平台", 10,
+             ["educreat", "project", "memory_science", "education"]),
+            # 技術棧信息
+            ("技術棧: Next.js + React + TypeScript + Tailwind CSS + Node.js + PostgreSQL", 9,
+             ["tech_stack", "nextjs", "react", "typescript"]),
+        ]
         
-        # 添加核心概念
+        # 核心概念
         concepts = [
             "間隔重複算法 - 基於遺忘曲線的學習優化",
             "主動回憶技術 - 提升記憶鞏固效果",
@@ -423,23 +810,38 @@ class AugmentMemoryIntegration:
             "25 種記憶遊戲模式 - 多樣化學習體驗",
             "防止功能孤立工作流程 - 確保功能完整整合"
         ]
+        seed_memories.extend((concept, 8, ["memory_science", "core_concept"]) for concept in concepts)
         
-        for concept in concepts:
-            self.memory_system.add_memory(
-                content=concept,
+        # 清理舊版本每次啟動重複寫入的種子記憶
+        self.memory_system.compact_duplicate_memories(
+            (content, "knowledge", "educreat") for content, _, _ in seed_memories
+        )
+        
+        added = 0
+        for content, importance, tags in seed_memories:
+            _, created = self.memory_system.ensure_memory(
+                content=content,
                 memory_type="knowledge",
                 category="educreat",
-                importance=8,
-                tags=["memory_science", "core_concept"]
+                importance=importance,
+                tags=tags
             )
+            added += created
+        
+        # 設置用戶偏好 (不覆蓋用戶已有的設置)
+        default_preferences = {
+            "coding_style": "typescript_strict",
+            "test_framework": "playwright_jest",
+            "ui_framework": "tailwind_css",
+            "project_type": "educreat_platform",
+        }
+        for key, value in default_preferences.items():
+            if self.memory_system.get_user_preference(key) is None:
+                self.memory_system.add_user_preference(key, value)
         
-        # 設置用戶偏好
-        self.memory_system.add_user_preference("coding_style", "typescript_strict")
-        self.memory_system.add_user_preference("test_framework", "playwright_jest")
-        self.memory_system.add_user_preference("ui_framework", "tailwind_css")
-        self.memory_system.add_user_preference("project_type", "educreat_platform")
+        self.memory_system.add_user_preference(EDUCREAT_SEED_VERSION_KEY, EDUCREAT_SEED_VERSION)
         
-        logger.info("🎓 EduCreate 項目知識初始化完成")
+        logger.info(f"🎓 EduCreate 項目知識初始化完成 (新增 {added} 條)")
     
     def learn_from_conversation(self, user_input: str, ai_response: str):
         """從對話中學習"""
@@ -492,13 +894,13 @@ class AugmentMemoryIntegration:
             'project_type': self.memory_system.get_user_preference('project_type')
         }
         
-        # 獲取項目知識
-        project_knowledge = self.memory_system.get_project_knowledge()
+        # 獲取項目知識 (最相關的 10 個)
+        project_knowledge = self.memory_system.get_project_knowledge(limit=10)
         
         return {
             'recent_memories': [asdict(memory) for memory in recent_memories],
             'user_preferences': preferences,
-            'project_knowledge': project_knowledge[:10],  # 最相關的 10 個
+            'project_knowledge': project_knowledge,
             'statistics': self.memory_system.get_statistics()
         }
 
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+MCP 響應序列化
+優先使用 orjson / msgspec 編碼 JSON，未安裝時回退到標準庫 json
+響應以 UTF-8 字節直接寫入 sys.stdout.buffer
+"""
+
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+
+def stdlib_dumps(obj: Any) -> bytes:
+    """標準庫編碼 (與原來的 json.dumps(..., ensure_ascii=False) 輸出一致)"""
+    return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def available_serializers() -> Dict[str, Callable[[Any], bytes]]:
+    """返回已安裝的編碼器，按優先級排列"""
+
+    serializers: Dict[str, Callable[[Any], bytes]] = {}
+
+    if ORJSON_AVAILABLE:
+        # 記憶 ID 等字典鍵可能不是字符串，OPT_NON_STR_KEYS 與標準庫行為保持一致
+        serializers["orjson"] = lambda obj: orjson.dumps(
+            obj, default=str, option=orjson.OPT_NON_STR_KEYS
+        )
+
+    if MSGSPEC_AVAILABLE:
+        serializers["msgspec"] = msgspec.json.Encoder(enc_hook=str).encode
+
+    serializers["json"] = stdlib_dumps
+    return serializers
+
+
+SERIALIZER_NAME, dumps_bytes = next(iter(available_serializers().items()))
+
+# 快速編碼器不支持、標準庫可以處理的值 (如超過 64 位的整數) 拋出的錯誤
+ENCODE_ERRORS = (TypeError, OverflowError) + ((msgspec.EncodeError,) if MSGSPEC_AVAILABLE else ())
+
+
+def encode_response(response: Any) -> bytes:
+    """用首選編碼器編碼，失敗時用標準庫重新編碼"""
+
+    try:
+        return dumps_bytes(response)
+    except ENCODE_ERRORS:
+        if dumps_bytes is stdlib_dumps:
+            raise
+        return stdlib_dumps(response)
+
+
+def write_response(response: Any, stream: Optional[Any] = None):
+    """把響應編碼為一行 JSON 並寫入標準輸出"""
+
+    if stream is None:
+        stream = sys.stdout.buffer
+    stream.write(encode_response(response) + b"\n")
+    stream.flush()
+
+
+def build_sample_context(memories: int = 20, knowledge: int = 2000) -> Dict[str, Any]:
+    """構造與 get_user_context / get_project_knowledge 相近的大響應"""
+
+    return {
+        "success": True,
+        "context": {
+            "recent_memories": [
+                {
+                    "id": f"{i:032x}",
+                    "content": f"記憶內容 {i}: 間隔重複算法 - 基於遺忘曲線的學習優化" * 3,
+                    "type": "knowledge",
+                    "category": "educreat",
+                    "importance": i % 10,
+                    "tags": ["memory_science", "core_concept", f"tag_{i}"],
+                    "created_at": "2025-01-01T00:00:00",
+                    "access_count": i,
+                }
+                for i in range(memories)
+            ],
+            "user_preferences": {
+                "coding_style": "typescript_strict",
+                "test_framework": "playwright_jest",
+                "ui_framework": "tailwind_css",
+                "project_type": "educreat_platform",
+            },
+            "project_knowledge": [
+                {
+                    "id": f"{i:032x}",
+                    "file_path": f"components/games/Game{i}.tsx",
+                    "knowledge_type": "pattern",
+                    "content": f"組件 Game{i} 使用 useState 與 useEffect 管理遊戲狀態",
+                    "confidence": 0.5 + (i % 50) / 100,
+                    "created_at": "2025-01-01T00:00:00",
+                    "updated_at": "2025-01-02T00:00:00",
+                }
+                for i in range(knowledge)
+            ],
+            "statistics": {
+                "total_memories": memories,
+                "memory_types": {"knowledge": memories},
+                "categories": {"educreat": memories},
+                "total_preferences": 4,
+                "total_knowledge": knowledge,
+                "database_path": "augment_memory.db",
+            },
+        },
+    }
+
+
+def benchmark_serializers(payload: Optional[Any] = None, rounds: int = 200) -> Dict[str, Dict[str, float]]:
+    """比較各編碼器的編碼耗時"""
+
+    if payload is None:
+        payload = build_sample_context()
+
+    results = {}
+    for name, encode in available_serializers().items():
+        size = len(encode(payload))
+        start = time.perf_counter()
+        for _ in range(rounds):
+            encode(payload)
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "ms_per_encode": elapsed / rounds * 1000,
+            "bytes": size,
+        }
+
+    baseline = results["json"]["ms_per_encode"]
+    for stats in results.values():
+        stats["speedup"] = baseline / stats["ms_per_encode"] if stats["ms_per_encode"] else 0.0
+
+    return results
+
+
+def main():
+    """運行編碼基準測試"""
+
+    print(f"🚀 MCP 響應編碼基準測試 (當前使用: {SERIALIZER_NAME})")
+    for name, stats in benchmark_serializers().items():
+        print(f"   {name:8s} {stats['ms_per_encode']:.3f} ms/次  "
+              f"{stats['bytes'] / 1024:.0f} KB  x{stats['speedup']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
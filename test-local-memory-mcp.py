@@ -6,15 +6,19 @@
 
 import json
 import subprocess
+import tempfile
 import time
 import sys
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, List
 
 class LocalMemoryMCPTester:
     """本地記憶 MCP 測試器"""
     
     def __init__(self):
         self.server_process = None
+        # 服務器在臨時目錄中運行，測試數據不寫入項目的記憶數據庫
+        self.work_dir = tempfile.TemporaryDirectory()
         
     def start_server(self):
         """啟動本地記憶 MCP 服務器"""
@@ -22,10 +26,11 @@ class LocalMemoryMCPTester:
         
         try:
             self.server_process = subprocess.Popen(
-                [sys.executable, "local-memory-mcp-server.py"],
+                [sys.executable, str(Path(__file__).with_name("local-memory-mcp-server.py"))],
+                cwd=self.work_dir.name,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 text=True,
                 bufsize=1
             )
@@ -71,6 +76,24 @@ class LocalMemoryMCPTester:
         except Exception as e:
             return {"success": False, "error": f"請求失敗: {e}"}
     
+    def send_batch(self, requests: List[Dict[str, Any]]) -> Any:
+        """發送 JSON-RPC 批量請求，返回響應數組"""
+        
+        if not self.server_process:
+            return {"success": False, "error": "服務器未啟動"}
+        
+        try:
+            self.server_process.stdin.write(json.dumps(requests, ensure_ascii=False) + "\n")
+            self.server_process.stdin.flush()
+            
+            response_line = self.server_process.stdout.readline()
+            if response_line:
+                return json.loads(response_line.strip())
+            return {"success": False, "error": "無響應"}
+        
+        except Exception as e:
+            return {"success": False, "error": f"請求失敗: {e}"}
+    
     def test_add_memory(self):
         """測試添加記憶"""
         print("\n🔍 測試 1: 添加記憶")
@@ -232,6 +255,151 @@ class LocalMemoryMCPTester:
         
         return response.get("success", False)
     
+    def test_batch_rollback(self):
+        """測試批量寫入的事務回滾"""
+        print("\n🔍 測試 8: 批量請求事務")
+        
+        marker = f"批量回滾測試 {time.time()}"
+        responses = self.send_batch([
+            {"id": 1, "method": "add_memory", "params": {"content": marker, "importance": 6}},
+            {"id": 2, "method": "add_memory", "params": {"content": ""}}
+        ])
+        
+        if not isinstance(responses, list) or len(responses) != 2:
+            print(f"❌ 批量響應格式錯誤: {responses}")
+            return False
+        if any(response.get("success") for response in responses):
+            print(f"❌ 含失敗請求的批量未整批失敗: {responses}")
+            return False
+        if [response.get("id") for response in responses] != [1, 2]:
+            print(f"❌ 批量響應未帶回請求 ID: {responses}")
+            return False
+        
+        search = self.send_request("search_memories", {"query": marker})
+        if not search.get("success") or search.get("count"):
+            print(f"❌ 失敗批量中的寫入未回滾: {search}")
+            return False
+        
+        # 全部成功的批量正常提交
+        responses = self.send_batch([
+            {"id": 3, "method": "add_memory", "params": {"content": marker, "importance": 6}},
+            {"id": 4, "method": "add_user_preference", "params": {"key": "batch_test", "value": marker}}
+        ])
+        if not all(response.get("success") for response in responses):
+            print(f"❌ 批量寫入失敗: {responses}")
+            return False
+        
+        search = self.send_request("search_memories", {"query": marker})
+        if search.get("count") != 1:
+            print(f"❌ 成功的批量未提交: {search}")
+            return False
+        
+        print("✅ 失敗的批量整批回滾，成功的批量正常提交")
+        return True
+    
+    def test_search_ranking(self):
+        """測試全文搜索的排序和高亮片段"""
+        print("\n🔍 測試 9: 全文搜索排序與片段")
+        
+        marker = f"fts{int(time.time() * 1000)}"
+        for content, importance in [
+            (f"低重要性的 {marker} 記錄", 2),
+            (f"高重要性的 {marker} 記錄", 9),
+        ]:
+            response = self.send_request("add_memory", {"content": content, "importance": importance})
+            if not response.get("success"):
+                print(f"❌ 添加記憶失敗: {response.get('error')}")
+                return False
+        
+        response = self.send_request("search_memories", {"query": marker})
+        if not response.get("success"):
+            print(f"❌ 搜索失敗: {response.get('error')}")
+            return False
+        
+        memories = response.get("memories", [])
+        if [memory["importance"] for memory in memories] != [9, 2]:
+            print(f"❌ 搜索結果排序錯誤: {memories}")
+            return False
+        if not all(f"**{marker}**" in (memory.get("snippet") or "") for memory in memories):
+            print(f"❌ 搜索結果缺少高亮片段: {memories}")
+            return False
+        
+        print(f"✅ 全文搜索按相關性和重要性排序，片段: {memories[0]['snippet']}")
+        return True
+    
+    def test_project_knowledge_pages(self):
+        """測試項目知識的分頁令牌"""
+        print("\n🔍 測試 10: 項目知識分頁")
+        
+        knowledge_type = f"page_test_{int(time.time() * 1000)}"
+        responses = self.send_batch([
+            {"id": i, "method": "add_project_knowledge", "params": {
+                "file_path": f"components/page-test/Item{i}.tsx",
+                "knowledge_type": knowledge_type,
+                "content": f"分頁測試知識 {i}",
+                "confidence": 0.5 + i / 100
+            }}
+            for i in range(5)
+        ])
+        if not isinstance(responses, list) or not all(response.get("success") for response in responses):
+            print(f"❌ 添加知識失敗: {responses}")
+            return False
+        
+        seen = []
+        page_token = None
+        pages = 0
+        while True:
+            params = {"knowledge_type": knowledge_type, "limit": 2}
+            if page_token:
+                params["page_token"] = page_token
+            response = self.send_request("get_project_knowledge", params)
+            if not response.get("success"):
+                print(f"❌ 獲取知識失敗: {response.get('error')}")
+                return False
+            
+            seen.extend(item["content"] for item in response["knowledge"])
+            pages += 1
+            page_token = response.get("next_page_token")
+            if not page_token or pages > 5:
+                break
+        
+        expected = [f"分頁測試知識 {i}" for i in reversed(range(5))]
+        if pages != 3 or seen != expected:
+            print(f"❌ 分頁結果錯誤: {pages} 頁, {seen}")
+            return False
+        
+        response = self.send_request("get_project_knowledge", {"page_token": "不是令牌"})
+        if response.get("success"):
+            print("❌ 無效的分頁令牌未被拒絕")
+            return False
+        
+        print(f"✅ 按置信度分 {pages} 頁取回全部 {len(seen)} 條知識，無重複和遺漏")
+        return True
+    
+    def test_large_integer_preference(self):
+        """測試超過 64 位的整數偏好值 (快速 JSON 編碼器不支持時回退到標準庫)"""
+        print("\n🔍 測試 11: 大整數偏好值")
+        
+        value = 123456789012345678901234567890
+        response = self.send_request("add_user_preference", {"key": "large_integer", "value": value})
+        if not response.get("success"):
+            print(f"❌ 添加偏好失敗: {response.get('error')}")
+            return False
+        
+        response = self.send_request("get_user_preference", {"key": "large_integer"})
+        if not response.get("success") or response.get("value") != value:
+            print(f"❌ 大整數偏好值讀取錯誤: {response}")
+            return False
+        
+        # 之後的響應仍然正常寫出
+        response = self.send_request("get_statistics", {})
+        if not response.get("success"):
+            print(f"❌ 大整數響應之後服務器無響應: {response}")
+            return False
+        
+        print(f"✅ 大整數偏好值原樣返回: {value}")
+        return True
+    
     def run_all_tests(self):
         """運行所有測試"""
         print("🧪 開始本地記憶 MCP 功能測試...")
@@ -247,7 +415,11 @@ class LocalMemoryMCPTester:
             self.test_project_knowledge,
             self.test_conversation_learning,
             self.test_get_user_context,
-            self.test_statistics
+            self.test_statistics,
+            self.test_batch_rollback,
+            self.test_search_ranking,
+            self.test_project_knowledge_pages,
+            self.test_large_integer_preference
         ]
         
         passed = 0
@@ -276,11 +448,13 @@ class LocalMemoryMCPTester:
             print("🧹 關閉本地記憶 MCP 服務器...")
             self.server_process.terminate()
             self.server_process.wait()
+        self.work_dir.cleanup()
 
 def main():
     """主函數"""
     tester = LocalMemoryMCPTester()
     
+    success = False
     try:
         success = tester.run_all_tests()
         
@@ -301,6 +475,8 @@ def main():
         print("\n⏹️ 測試被用戶中斷")
     finally:
         tester.cleanup()
+    
+    sys.exit(0 if success else 1)
 
 if __name__ == "__main__":
     main()